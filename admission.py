@@ -0,0 +1,250 @@
+"""
+Admission Control
+Per-client token-bucket rate limits and per-class concurrency limits with a
+bounded wait queue, so one client hammering /train or sending huge batches
+cannot starve everyone else. Requests are shed early (429 over a client's
+rate, 503 when the queue is full or would wait past its latency target) with
+a Retry-After hint, which keeps interactive /predict latency bounded under
+overload. Limits apply per worker process.
+"""
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+
+# Set to 0 to admit every request
+ADMISSION_ENABLED = os.environ.get('ADMISSION', '1') != '0'
+
+# Per-client token buckets: sustained tokens per second and burst size (rate 0 = unlimited).
+# A predict request costs one token plus one per PREDICT_TOKEN_BYTES of body, so
+# large batches and streams pay for their size.
+RATE_LIMIT_PREDICT = float(os.environ.get('RATE_LIMIT_PREDICT', '100'))
+RATE_LIMIT_PREDICT_BURST = float(os.environ.get('RATE_LIMIT_PREDICT_BURST', '200'))
+PREDICT_TOKEN_BYTES = int(os.environ.get('PREDICT_TOKEN_BYTES', '16384'))
+RATE_LIMIT_TRAIN_PER_HOUR = float(os.environ.get('RATE_LIMIT_TRAIN_PER_HOUR', '12'))
+RATE_LIMIT_TRAIN_BURST = float(os.environ.get('RATE_LIMIT_TRAIN_BURST', '3'))
+
+# Concurrency per endpoint class: requests running at once, requests allowed
+# to wait for a slot, and the longest a request may wait before it is shed.
+# Bulk scoring (batch/stream) gets its own few slots so it cannot crowd out /predict.
+PREDICT_CONCURRENCY = int(os.environ.get('PREDICT_CONCURRENCY', '8'))
+PREDICT_QUEUE = int(os.environ.get('PREDICT_QUEUE', '64'))
+PREDICT_QUEUE_TARGET_MS = float(os.environ.get('PREDICT_QUEUE_TARGET_MS', '50'))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '2'))
+BATCH_QUEUE = int(os.environ.get('BATCH_QUEUE', '8'))
+BATCH_QUEUE_TARGET_MS = float(os.environ.get('BATCH_QUEUE_TARGET_MS', '500'))
+TRAIN_CONCURRENCY = int(os.environ.get('TRAIN_CONCURRENCY', '1'))
+TRAIN_QUEUE = int(os.environ.get('TRAIN_QUEUE', '0'))
+TRAIN_QUEUE_TARGET_MS = float(os.environ.get('TRAIN_QUEUE_TARGET_MS', '0'))
+
+# Training jobs allowed to be queued or running before new ones are refused
+TRAIN_MAX_PENDING_JOBS = int(os.environ.get('TRAIN_MAX_PENDING_JOBS', '2'))
+TRAIN_BACKLOG_RETRY_SECONDS = 30
+
+# A shed request's body is read off (keeping the keep-alive connection usable)
+# only up to this size; a larger one is left unread and the connection closed
+REJECT_DRAIN_BYTES = int(os.environ.get('REJECT_DRAIN_BYTES', '65536'))
+
+# Header naming the client, set only by an authenticating gateway that has verified it
+# (empty: limit by address). Never point it at a header clients choose freely, such as
+# an unchecked X-API-Key: every new value would get a fresh bucket.
+CLIENT_ID_HEADER = os.environ.get('CLIENT_ID_HEADER', '')
+# Reverse proxies in front of the server. With N > 0 the client address is the
+# N-th X-Forwarded-For entry from the right, the one the outermost trusted proxy
+# added; entries further left are whatever the client sent.
+TRUST_PROXY = int(os.environ.get('TRUST_PROXY', '0'))
+
+# Clients tracked per limiter; the least recently seen are forgotten first
+MAX_TRACKED_CLIENTS = 100000
+
+# Allowed CORS origins: '*' or a comma-separated list
+CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
+
+
+def cors_origins():
+    """CORS_ORIGINS as flask-cors expects it"""
+    origins = [origin.strip() for origin in CORS_ORIGINS.split(',') if origin.strip()]
+    return '*' if not origins or '*' in origins else origins
+
+
+def client_id(headers, remote_addr):
+    """Key requests are rate-limited by: the verified client id header, else the client address"""
+    key = headers.get(CLIENT_ID_HEADER) if CLIENT_ID_HEADER else None
+    if key:
+        return f"key:{key}"
+    if TRUST_PROXY:
+        forwarded = [address.strip() for address in headers.get('X-Forwarded-For', '').split(',')]
+        # Fewer entries than proxies means the request skipped one; keep the peer address
+        if len(forwarded) >= TRUST_PROXY and forwarded[-TRUST_PROXY]:
+            return f"ip:{forwarded[-TRUST_PROXY]}"
+    return f"ip:{remote_addr}"
+
+
+def retry_after_header(seconds):
+    """Retry-After takes whole seconds; never suggest 0"""
+    return str(max(int(math.ceil(seconds)), 1))
+
+
+class Rejection(Exception):
+    """A request shed by admission control"""
+
+    def __init__(self, status, reason, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.message = message
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket per client: rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate, burst, max_clients=MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client, cost=1.0):
+        """
+        Spend cost tokens from client's bucket
+
+        Returns (allowed, retry_after_seconds). A cost above the burst is
+        capped at the burst, so any single request can eventually pass.
+        """
+        if self.rate <= 0:
+            return True, 0.0
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return True, 0.0
+            bucket[0] = tokens
+            return False, (cost - tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """
+    At most limit requests run at once; up to max_queue more wait for a slot
+
+    A request is shed instead of queued when the queue is full or the
+    expected wait (queue position x the moving-average service time / limit)
+    exceeds target_seconds, and a queued request gives up once it has
+    waited target_seconds. Admitted requests therefore never wait longer
+    than the target.
+    """
+
+    def __init__(self, limit, max_queue, target_seconds):
+        self.limit = max(limit, 1)
+        self.max_queue = max_queue
+        self.target_seconds = target_seconds
+        self.active = 0
+        self.waiting = 0
+        self._service_seconds = 0.01
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Take a slot; returns seconds waited, or raises Rejection"""
+        with self._cond:
+            if self.active < self.limit and self.waiting == 0:
+                self.active += 1
+                return 0.0
+            expected = self._service_seconds * (self.waiting + 1) / self.limit
+            if self.waiting >= self.max_queue:
+                raise Rejection(503, 'queue_full', 'Server is busy: request queue is full',
+                                max(expected, self._service_seconds))
+            if expected > self.target_seconds:
+                raise Rejection(503, 'queue_latency', 'Server is busy: expected queue wait is too long', expected)
+
+            started = time.monotonic()
+            deadline = started + self.target_seconds
+            self.waiting += 1
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejection(503, 'queue_latency', 'Server is busy: queue wait exceeded its target',
+                                        max(expected, self._service_seconds))
+                    self._cond.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+            return time.monotonic() - started
+
+    def release(self, service_seconds):
+        """Free a slot and fold the request's service time into the moving average"""
+        with self._cond:
+            self.active -= 1
+            self._service_seconds += 0.2 * (service_seconds - self._service_seconds)
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return {'active': self.active, 'waiting': self.waiting, 'limit': self.limit,
+                    'max_queue': self.max_queue, 'service_ms': round(self._service_seconds * 1000, 3)}
+
+
+class AdmissionClass:
+    """Rate limiter plus concurrency limiter for one endpoint class"""
+
+    def __init__(self, name, rate_limiter, concurrency, token_bytes=0):
+        self.name = name
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.token_bytes = token_bytes
+
+    def cost(self, content_length):
+        """Tokens a request costs: one, plus one per token_bytes of body"""
+        if not self.token_bytes or not content_length:
+            return 1.0
+        return 1.0 + content_length // self.token_bytes
+
+    def admit(self, client, content_length=None):
+        """Charge client and take a concurrency slot; returns seconds queued, or raises Rejection"""
+        allowed, retry_after = self.rate_limiter.take(client, self.cost(content_length))
+        if not allowed:
+            raise Rejection(429, 'rate_limit', f'Rate limit exceeded for {self.name} requests', retry_after)
+        return self.concurrency.acquire()
+
+    def release(self, service_seconds):
+        self.concurrency.release(service_seconds)
+
+
+def default_classes():
+    """
+    The endpoint classes from the settings: 'predict' (cheap, interactive),
+    'batch' (bulk scoring) and 'train' (expensive jobs)
+
+    predict and batch draw on the same per-client token budget.
+    """
+    scoring_rate = RateLimiter(RATE_LIMIT_PREDICT, RATE_LIMIT_PREDICT_BURST)
+    return {
+        'predict': AdmissionClass(
+            'predict', scoring_rate,
+            ConcurrencyLimiter(PREDICT_CONCURRENCY, PREDICT_QUEUE, PREDICT_QUEUE_TARGET_MS / 1000),
+            token_bytes=PREDICT_TOKEN_BYTES
+        ),
+        'batch': AdmissionClass(
+            'batch', scoring_rate,
+            ConcurrencyLimiter(BATCH_CONCURRENCY, BATCH_QUEUE, BATCH_QUEUE_TARGET_MS / 1000),
+            token_bytes=PREDICT_TOKEN_BYTES
+        ),
+        'train': AdmissionClass(
+            'train',
+            RateLimiter(RATE_LIMIT_TRAIN_PER_HOUR / 3600, RATE_LIMIT_TRAIN_BURST),
+            ConcurrencyLimiter(TRAIN_CONCURRENCY, TRAIN_QUEUE, TRAIN_QUEUE_TARGET_MS / 1000)
+        ),
+    }
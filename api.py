@@ -4,116 +4,543 @@ Flask backend with machine learning model for detecting fake social media accoun
 """
 
 import os
-import pandas as pd
+import json
+import time
+import queue
+import random
+import threading
+from datetime import datetime
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, url_for, g
 from flask_cors import CORS
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
-from sklearn.preprocessing import StandardScaler
-import joblib
 import logging
-from dataset_generator import generate_fake_account_dataset, save_dataset
+from logging.handlers import QueueHandler, QueueListener
+from scoring import (records_to_matrix, parse_csv_matrix, find_invalid_rows,
+                     format_predictions, format_explanations, first_error, get_validator,
+                     load_json_records, score_stream, csv_field, STREAM_CHUNK_ROWS)
+import fast_json
+from request_timing import StageTimer, SERVER_TIMING
+from metrics import Registry, SIZE_BUCKETS, render_samples
+from sampling_profiler import SamplingProfiler, PROFILE_MODE
+import model_registry
+from prediction_cache import create_cache, feature_key
+from micro_batcher import MicroBatcher, MICROBATCH_ENABLED
+from model_compaction import COMPACTION_ENABLED, DISTILL_MODELS
+import feedback_store
+from feature_pipeline import FEATURE_COLUMNS, INPUT_COLUMNS
+import online_updates
+import drift_monitor
+import admission
+from jobs import submit_job, get_job, list_jobs, wait_for_job, pending_jobs
+
+# Training-only dependencies (pandas, sklearn, the dataset generator) are
+# imported inside the functions that need them, so a serving process starts
+# with just numpy and Flask and maps the compiled model from disk
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fraction of /predict results written to the log (1 = every prediction)
+PREDICTION_LOG_SAMPLE = float(os.environ.get('PREDICTION_LOG_SAMPLE', '1'))
+
+# Set to 1 to hand log records to a background thread instead of writing
+# them (and blocking on the terminal or file) inside the request
+LOG_ASYNC = os.environ.get('LOG_ASYNC', '0') == '1'
+
+# 'full' (echo input_data and confidence) or 'compact'; ?compact=true|false overrides per request
+PREDICT_RESPONSE = os.environ.get('PREDICT_RESPONSE', 'full')
+
+_log_queue = queue.SimpleQueue()
+_log_listener = None
+
+def start_log_listener():
+    """Write queued log records to the original handlers from a background thread"""
+    global _log_listener
+    root = logging.getLogger()
+    handlers = [h for h in root.handlers if not isinstance(h, QueueHandler)]
+    if _log_listener is not None:
+        handlers = list(_log_listener.handlers)
+    _log_listener = QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    root.handlers = [QueueHandler(_log_queue)]
+
+if LOG_ASYNC:
+    start_log_listener()
+    # The listener thread does not survive fork(); pre-forked workers start their own
+    os.register_at_fork(after_in_child=start_log_listener)
+
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend communication
-
-# Global variables for model and scaler
-model = None
-scaler = None
-feature_columns = [
-    'username_length', 'num_posts', 'num_followers', 'num_following',
-    'account_age_days', 'has_profile_picture', 'has_bio', 
-    'engagement_ratio', 'is_verified'
-]
-
-def load_or_create_dataset():
-    """Load existing dataset or create a new one"""
-    dataset_path = 'fake_accounts_dataset.csv'
-    
-    if os.path.exists(dataset_path):
-        logger.info(f"Loading existing dataset from {dataset_path}")
-        df = pd.read_csv(dataset_path)
+# Enable CORS for the frontend (CORS_ORIGINS); expose the headers clients back off and debug with
+CORS(app, origins=admission.cors_origins(),
+     expose_headers=['Retry-After', 'X-Cache', 'Server-Timing', 'X-Profile'])
+fast_json.install(app)  # orjson for jsonify/get_json when installed
+
+# Largest accepted request body in megabytes (0 = unlimited); larger bodies get a 413
+MAX_REQUEST_MB = float(os.environ.get('MAX_REQUEST_MB', '0'))
+app.config['MAX_CONTENT_LENGTH'] = int(MAX_REQUEST_MB * 1024 * 1024) or None
+
+# How often (seconds) to check whether another process activated a different
+# model version; with several workers this keeps them all on the same version
+MODEL_RELOAD_SECONDS = float(os.environ.get('MODEL_RELOAD_SECONDS', '2'))
+
+# Metrics exposed at /metrics (per worker process)
+metrics_registry = Registry()
+REQUESTS = metrics_registry.counter(
+    'fakeacct_http_requests_total', 'HTTP requests by endpoint, method and status',
+    ('endpoint', 'method', 'status'))
+REQUEST_SECONDS = metrics_registry.histogram(
+    'fakeacct_http_request_duration_seconds', 'Handler latency by endpoint', ('endpoint',))
+STAGE_SECONDS = metrics_registry.histogram(
+    'fakeacct_request_stage_duration_seconds',
+    'Time spent per request stage (parse, validate, cache, scale, predict, serialize, log)',
+    ('endpoint', 'stage'))
+BATCH_ROWS = metrics_registry.histogram(
+    'fakeacct_model_batch_rows', 'Rows per model call by source', ('source',), SIZE_BUCKETS)
+TRAINING_RUNS = metrics_registry.counter(
+    'fakeacct_training_runs_total', 'Training runs by outcome', ('status',))
+TRAINING_STAGE_SECONDS = metrics_registry.histogram(
+    'fakeacct_training_stage_duration_seconds',
+    'Time spent per training phase (load, split, scale, fit, evaluate, register, activate)', ('stage',))
+FEEDBACK_ROWS = metrics_registry.counter(
+    'fakeacct_feedback_rows_total', 'Labeled feedback rows accepted')
+MODEL_UPDATES = metrics_registry.counter(
+    'fakeacct_model_updates_total', 'Feedback update jobs by action (update, rebuild, rejected, none)', ('action',))
+STARTUP_SECONDS = metrics_registry.gauge(
+    'fakeacct_startup_duration_seconds', 'Time initialize_app spent loading or training the model', ('stage',))
+DRIFT_PSI = metrics_registry.gauge(
+    'fakeacct_drift_psi', 'PSI of live traffic against the training profile, per feature and probability_fake',
+    ('feature',))
+SHED_REQUESTS = metrics_registry.counter(
+    'fakeacct_requests_shed_total',
+    'Requests refused by admission control by endpoint class and reason '
+    '(rate_limit, queue_full, queue_latency, train_backlog)', ('class', 'reason'))
+ADMISSION_WAIT_SECONDS = metrics_registry.histogram(
+    'fakeacct_admission_queue_wait_seconds', 'Time admitted requests waited for a concurrency slot', ('class',))
+
+# Active model bundle (model, scaler, feature list, compiled engine). It is
+# replaced with a single assignment, so a request never mixes two versions.
+bundle = None
+
+# Model columns for new training runs, and the raw fields clients send; the
+# derived features (engagement_ratio and friends) are computed server-side
+feature_columns = FEATURE_COLUMNS
+input_columns = INPUT_COLUMNS
+
+# Endpoint class of each rate-limited POST route: cheap interactive scoring,
+# bulk scoring and expensive jobs; other routes (health, metrics, polling) are not limited
+ENDPOINT_CLASSES = {
+    '/predict': 'predict',
+    '/predict/batch': 'batch',
+    '/predict/stream': 'batch',
+    '/feedback': 'predict',
+    '/train': 'train',
+    '/feedback/update': 'train',
+}
+
+# Per-client rate limiters and concurrency limits for each endpoint class
+admission_classes = admission.default_classes()
+
+# Upper bound on accounts accepted by a single /predict/batch request
+MAX_BATCH_ROWS = 100000
+
+DATASET_PATH = 'fake_accounts_dataset.csv'
+
+# Type and range checks for the request features, compiled once
+input_validator = get_validator(input_columns)
+
+# Probabilities of recently scored feature vectors, keyed by model version
+prediction_cache = create_cache()
+
+# Coalesces concurrent /predict calls into one predict_proba per batch (opt-in)
+micro_batcher = MicroBatcher() if MICROBATCH_ENABLED else None
+if micro_batcher is not None:
+    micro_batcher.on_batch = lambda rows: BATCH_ROWS.observe(rows, source='micro_batch')
+
+# Rolling sketches of live inputs and scores, compared against the training profile
+traffic_monitor = drift_monitor.DriftMonitor() if drift_monitor.DRIFT_ENABLED else None
+
+def ensure_dataset():
+    """Create the dataset CSV if it does not exist yet and return its path"""
+    if os.path.exists(DATASET_PATH):
+        logger.info(f"Using existing dataset at {DATASET_PATH}")
     else:
+        from dataset_generator import generate_fake_account_dataset, save_dataset
         logger.info("Creating new dataset...")
         df = generate_fake_account_dataset(10000)
-        save_dataset(df, dataset_path)
+        save_dataset(df, DATASET_PATH)
     
-    return df
+    return DATASET_PATH
 
-def train_model():
-    """Train the Random Forest model"""
-    global model, scaler
-    
-    logger.info("Starting model training...")
+def activate_bundle(new_bundle):
+    """Swap the serving bundle in one reference assignment"""
+    global bundle
+    bundle = new_bundle
+    # Keys carry the version, so this only frees entries of the old model
+    prediction_cache.invalidate(keep_version=new_bundle.version)
+    if traffic_monitor is not None:
+        traffic_monitor.reset(new_bundle)
+    logger.info(f"Serving model version {new_bundle.version} ({new_bundle.backend} backend)")
+
+def activate_version(version):
+    """Load a registered version, mark it active and start serving it"""
+    new_bundle = model_registry.load_bundle(version)
+    model_registry.set_active_version(version)
+    activate_bundle(new_bundle)
+    return new_bundle
+
+_active_checked_at = 0.0
+_active_mtime = None
+
+def sync_active_version(force=False):
+    """Start serving the registry's active version if another process changed it"""
+    global _active_checked_at, _active_mtime
+    now = time.monotonic()
+    if not force and (not MODEL_RELOAD_SECONDS or now - _active_checked_at < MODEL_RELOAD_SECONDS):
+        return
+    _active_checked_at = now
+
+    mtime = model_registry.active_mtime()
+    if mtime is None or mtime == _active_mtime:
+        return
+    _active_mtime = mtime
+    version = model_registry.get_active_version()
+    current = bundle
+    if version is not None and (current is None or current.version != version):
+        logger.info(f"Active version changed to {version} by another process")
+        activate_bundle(model_registry.load_bundle(version))
+
+@app.before_request
+def start_request():
+    """Note the start time and, if requested, start profiling this request"""
+    g.request_started = time.perf_counter()
+    if PROFILE_MODE == 'all' or (PROFILE_MODE == 'request' and
+                                 request.args.get('profile', '').lower() in ('1', 'true', 'yes')):
+        g.profiler = SamplingProfiler().start()
+
+@app.before_request
+def enforce_request_size():
+    """Reject bodies over MAX_REQUEST_MB before a handler starts reading them"""
+    limit = app.config['MAX_CONTENT_LENGTH']
+    if limit and request.content_length and request.content_length > limit:
+        return jsonify({'error': f'Request body too large (max {MAX_REQUEST_MB:g} MB)'}), 413
+
+@app.before_request
+def admit_request():
+    """Apply the client's rate limit and the endpoint class's concurrency limit (429/503 when shed)"""
+    if not admission.ADMISSION_ENABLED or request.method != 'POST' or request.url_rule is None:
+        return
+    endpoint_class = ENDPOINT_CLASSES.get(request.url_rule.rule)
+    if endpoint_class is None:
+        return
     
-    # Load dataset
-    df = load_or_create_dataset()
+    try:
+        if endpoint_class == 'train' and pending_jobs() >= admission.TRAIN_MAX_PENDING_JOBS:
+            raise admission.Rejection(503, 'train_backlog', 'Too many training jobs queued; retry later',
+                                      admission.TRAIN_BACKLOG_RETRY_SECONDS)
+        client = admission.client_id(request.headers, request.remote_addr)
+        waited = admission_classes[endpoint_class].admit(client, request.content_length)
+    except admission.Rejection as rejection:
+        SHED_REQUESTS.inc(**{'class': endpoint_class, 'reason': rejection.reason})
+        response = jsonify({'error': rejection.message, 'reason': rejection.reason,
+                            'retry_after': round(rejection.retry_after, 3)})
+        response.headers['Retry-After'] = admission.retry_after_header(rejection.retry_after)
+        # Read off a small unused body so the keep-alive connection stays usable;
+        # never spend a worker reading a large one
+        length = request.content_length
+        if length and length <= admission.REJECT_DRAIN_BYTES:
+            request.stream.read(length)
+        elif length or 'chunked' in request.headers.get('Transfer-Encoding', '').lower():
+            response.headers['Connection'] = 'close'
+        return response, rejection.status
     
-    # Prepare features and target
-    X = df[feature_columns]
-    y = df['is_fake']
+    ADMISSION_WAIT_SECONDS.observe(waited, **{'class': endpoint_class})
+    g.admission = (endpoint_class, time.perf_counter())
+
+@app.teardown_request
+def release_admission(exc):
+    """Give back the concurrency slot once the response (including a stream) is done"""
+    admitted = g.pop('admission', None)
+    if admitted is not None:
+        endpoint_class, started = admitted
+        admission_classes[endpoint_class].release(time.perf_counter() - started)
+
+@app.after_request
+def record_request(response):
+    """Record request metrics, report the stage breakdown and save any profile"""
+    # The URL rule (e.g. /train/<job_id>) keeps label cardinality bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+
+    timer = g.get('timer')
+    if timer is not None:
+        for stage, ms in timer.stages.items():
+            STAGE_SECONDS.observe(ms / 1000, endpoint=endpoint, stage=stage)
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = timer.header()
+
+    profiler = g.get('profiler')
+    if profiler is not None:
+        response.headers['X-Profile'] = profiler.stop().save(f"{request.method}{endpoint}")
+    return response
+
+@app.before_request
+def check_active_version():
+    """Pick up activations made by other worker processes"""
+    try:
+        sync_active_version()
+    except Exception as e:
+        logger.error(f"Error reloading active model version: {e}")
+
+def train_model(progress=None, n_jobs=None, activate=True, compaction=None, search=None):
+    """
+    Train the Random Forest model, register it as a new version and (optionally) serve it
     
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    compaction is a dict of model_compaction options ({} for the defaults),
+    False to skip it, or None to follow MODEL_COMPACTION. search (a dict of
+    hyperparameter_search.run_search options) first searches for the best
+    hyperparameters and trains the winner.
+    """
+    from training import fit_model
     
-    # Scale the features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    progress = progress or (lambda fraction, stage: None)
+    fit_progress = progress
+    if compaction is None:
+        compaction = {} if COMPACTION_ENABLED else False
+    compaction = None if compaction is False else compaction
+    logger.info("Starting model training...")
+    profiler = SamplingProfiler().start() if PROFILE_MODE == 'all' else None
+    timer = StageTimer()
     
-    # Train Random Forest model
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42,
-        class_weight='balanced'  # Handle class imbalance
-    )
+    try:
+        # Optionally search hyperparameters first (half of the progress bar)
+        rf_params = None
+        search_report = None
+        if search is not None:
+            from hyperparameter_search import run_search
+            search_report = run_search(ensure_dataset(), feature_columns,
+                                       progress=lambda fraction, stage: progress(0.5 * fraction, stage), **search)
+            rf_params = search_report['best_params']
+            fit_progress = lambda fraction, stage: progress(0.5 + 0.5 * fraction, stage)
+            timer.mark('search')
+        
+        # Load the dataset in chunks (plus all labeled feedback) and fit trees on all cores
+        X_feedback, y_feedback, _, feedback_offset, feedback_skipped = feedback_store.read_since(
+            0, columns=input_columns)
+        new_model, new_scaler, metrics = fit_model(
+            ensure_dataset(), feature_columns, n_jobs=n_jobs, rf_params=rf_params,
+            progress=fit_progress, compaction=compaction, extra_data=(X_feedback, y_feedback)
+        )
+        metrics['feedback_rows'] = int(len(y_feedback))
+        metrics['feedback_skipped_rows'] = feedback_skipped
+        metrics['feedback_offset'] = feedback_offset
+        if search_report is not None:
+            metrics['search'] = search_report
+        profile = metrics.pop('reference_profile', None)
+        timer.mark('fit_model')
+        
+        # Save model and scaler as an immutable registry version
+        progress(0.95, "registering version")
+        sync_active_version(force=True)  # jobs may run in another worker than the one serving the request
+        parent = bundle.version if bundle is not None else None
+        quantization = (metrics.get('compaction') or {}).get('quantization')
+        version = model_registry.save_version(new_model, new_scaler, feature_columns, metrics, parent=parent,
+                                              source='search' if search is not None else 'train',
+                                              quantization=quantization, profile=profile)
+        timer.mark('register')
+        
+        # Build the new bundle (mapping its compiled engine) before swapping it in
+        if activate:
+            new_bundle = model_registry.load_bundle(version, new_model, new_scaler)
+            model_registry.set_active_version(version)
+            activate_bundle(new_bundle)
+            timer.mark('activate')
+    except Exception:
+        TRAINING_RUNS.inc(status='failed')
+        raise
+    finally:
+        if profiler is not None:
+            logger.info(f"Training profile written to {profiler.stop().save('train')}")
     
-    model.fit(X_train_scaled, y_train)
+    TRAINING_RUNS.inc(status='succeeded')
+    stage_seconds = dict(metrics.get('stage_seconds', {}))
+    for stage in ('search', 'register', 'activate'):
+        if stage in timer.stages:
+            stage_seconds[stage] = round(timer.stages[stage] / 1000, 4)
+    for stage, seconds in stage_seconds.items():
+        TRAINING_STAGE_SECONDS.observe(seconds, stage=stage)
     
-    # Evaluate model
-    y_pred = model.predict(X_test_scaled)
-    accuracy = accuracy_score(y_test, y_pred)
+    return dict(metrics, version=version, activated=activate, stage_seconds=stage_seconds)
+
+def update_from_feedback(progress=None, mode=None, n_trees=None, rebuild=False):
+    """
+    Refresh the served forest from the feedback it has not seen yet
     
-    logger.info(f"Model trained successfully!")
-    logger.info(f"Accuracy: {accuracy:.4f}")
-    logger.info(f"Classification Report:\n{classification_report(y_test, y_pred)}")
+    The rebuild policy picks between an incremental update (new trees grown
+    on the pending rows only, registered as a new version), a full retrain
+    over the dataset plus all feedback, or nothing while too few rows are pending.
+    """
+    progress = progress or (lambda fraction, stage: None)
+    sync_active_version(force=True)  # jobs may run in another worker than the one serving the request
+    current = bundle
+    if current is None:
+        raise ValueError("No model loaded")
     
-    # Save model and scaler
-    joblib.dump(model, 'fake_account_model.pkl')
-    joblib.dump(scaler, 'scaler.pkl')
-    logger.info("Model and scaler saved to disk")
+    # Rows appended since the active version was built
+    progress(0.05, "reading feedback")
+    offset = current.metrics.get('feedback_offset', 0)
+    # Feedback stores the raw input fields; read the ones this version reads. A version
+    # that takes engagement_ratio as sent (saved before it was derived) can only be rebuilt
+    columns = current.input_columns
+    if not set(columns) <= set(input_columns):
+        columns, rebuild = input_columns, True
+    X_new, y_new, _, end_offset, _ = feedback_store.read_since(offset, columns=columns)
+    recent_accuracy = None
+    if len(y_new) and not rebuild:
+        predicted = current.classes_.take(np.argmax(current.predict_proba(X_new), axis=1))
+        recent_accuracy = float(np.mean(predicted == y_new))
+    total_trees = (current.model_params or {}).get('n_estimators')
+    action, reason = online_updates.decide(current.metrics, current.model_type, total_trees, len(y_new), y_new,
+                                           recent_accuracy, n_trees, force_rebuild=rebuild)
+    logger.info(f"Feedback update for {current.version}: {action} ({reason})")
     
-    # Feature importance
-    feature_importance = pd.DataFrame({
-        'feature': feature_columns,
-        'importance': model.feature_importances_
-    }).sort_values('importance', ascending=False)
+    if action == 'wait':
+        MODEL_UPDATES.inc(action='none')
+        return {'action': 'none', 'reason': reason, 'pending_rows': int(len(y_new)), 'version': current.version}
+    if action == 'rebuild':
+        result = train_model(progress=progress)
+        MODEL_UPDATES.inc(action='rebuild')
+        return dict(result, action='rebuild', reason=reason)
     
-    logger.info("Feature Importance:")
-    logger.info(feature_importance)
+    # Grow new trees on the pending rows and serve the result as a new version
+    progress(0.2, "growing trees on feedback")
+    X_model = current.pipeline.transform(X_new)
+    model, info = online_updates.update_forest(current.model, current.scaler, X_model, y_new, mode, n_trees)
+    info['recent_accuracy_served'] = round(recent_accuracy, 6)
+    if not info['accepted']:
+        # Keep serving the current version; the rows stay pending for the next update or rebuild
+        MODEL_UPDATES.inc(action='rejected')
+        reason = (f"holdout accuracy would drop from {info['recent_accuracy_before']:.3f} to "
+                  f"{info['recent_accuracy_after']:.3f} (tolerance {online_updates.UPDATE_ACCURACY_TOLERANCE})")
+        logger.warning(f"Feedback update for {current.version} rejected: {reason}")
+        return dict(info, action='rejected', reason=reason, version=current.version)
+    metrics = online_updates.incremental_metrics(current.metrics, info, current.version, end_offset)
+    progress(0.8, "registering version")
+    version = model_registry.save_version(model, current.scaler, current.feature_columns, metrics,
+                                          source='incremental', parent=current.version,
+                                          pipeline=current.pipeline, profile=current.reference_profile)
+    new_bundle = model_registry.load_bundle(version, model, current.scaler)
+    model_registry.set_active_version(version)
+    activate_bundle(new_bundle)
+    MODEL_UPDATES.inc(action='update')
+    return dict(metrics, action='update', reason=reason, version=version)
+
+_feedback_job = None
+_feedback_job_lock = threading.Lock()
+
+def maybe_schedule_update(pending):
+    """Queue a feedback update once FEEDBACK_UPDATE_ROWS rows are pending (one job at a time)"""
+    global _feedback_job
+    if not online_updates.FEEDBACK_UPDATE_ROWS or pending < online_updates.FEEDBACK_UPDATE_ROWS:
+        return None
+    # Concurrent /feedback requests must not both see no job and queue two
+    with _feedback_job_lock:
+        job = get_job(_feedback_job) if _feedback_job else None
+        if job is not None and job['status'] in ('queued', 'running'):
+            return _feedback_job
+        _feedback_job = submit_job(update_from_feedback, kind='feedback_update')
+        return _feedback_job
+
+_drift_retrain_job = None
+_drift_retrained_at = None
+
+def on_drift_flush(report):
+    """Publish fresh drift numbers and, with DRIFT_RETRAIN=1, retrain once traffic has drifted"""
+    global _drift_retrain_job, _drift_retrained_at
+    for name, result in report['features'].items():
+        DRIFT_PSI.set(result['psi'], feature=name)
+    if 'probability_fake' in report:
+        DRIFT_PSI.set(report['probability_fake']['psi'], feature='probability_fake')
     
-    return accuracy
+    if not drift_monitor.DRIFT_RETRAIN or report['status'] != 'drift':
+        return
+    now = time.monotonic()
+    if _drift_retrained_at is not None and now - _drift_retrained_at < drift_monitor.DRIFT_RETRAIN_COOLDOWN:
+        return
+    _drift_retrained_at = now
+    logger.warning(f"Drift detected ({', '.join(report['drifted_features']) or 'probability_fake'}); "
+                   f"starting a background retrain")
+    _drift_retrain_job = submit_job(train_model, kind='drift_retrain')
+
+if traffic_monitor is not None:
+    traffic_monitor.on_flush = on_drift_flush
+
+def parse_compaction(value):
+    """Validate the /train 'compaction' option: true, false or a dict of options"""
+    if value is None:
+        return None, None
+    if isinstance(value, bool):
+        return ({} if value else False), None
+    if not isinstance(value, dict):
+        return None, "compaction must be true, false or an object of options"
+    unknown = set(value) - {'tolerance', 'min_trees', 'distill'}
+    if unknown:
+        return None, f"Unknown compaction options: {', '.join(sorted(unknown))}"
+    tolerance = value.get('tolerance')
+    if tolerance is not None and (not isinstance(tolerance, (int, float)) or isinstance(tolerance, bool)
+                                  or not 0 <= tolerance < 1):
+        return None, "compaction.tolerance must be a number in [0, 1)"
+    min_trees = value.get('min_trees')
+    if min_trees is not None and (not isinstance(min_trees, int) or isinstance(min_trees, bool) or min_trees < 1):
+        return None, "compaction.min_trees must be a positive integer"
+    distill = value.get('distill')
+    if distill is not None and distill not in DISTILL_MODELS + ('',):
+        return None, f"compaction.distill must be one of: {', '.join(DISTILL_MODELS)}"
+    return dict(value), None
+
+# /train 'search' options: JSON name -> (run_search argument, type, minimum)
+SEARCH_OPTIONS = {
+    'candidates': ('n_candidates', int, 1),
+    'folds': ('n_folds', int, 2),
+    'eta': ('eta', int, 2),
+    'workers': ('n_workers', int, 1),
+    'max_rows': ('max_rows', int, 100),
+    'latency_weight': ('latency_weight', float, 0),
+}
+
+def parse_search(value):
+    """Validate the /train 'search' option: true, false or a dict of options"""
+    if value is None or value is False:
+        return None, None
+    if value is True:
+        return {}, None
+    if not isinstance(value, dict):
+        return None, "search must be true, false or an object of options"
+    unknown = set(value) - set(SEARCH_OPTIONS)
+    if unknown:
+        return None, f"Unknown search options: {', '.join(sorted(unknown))}"
+    options = {}
+    for name, raw in value.items():
+        argument, kind, minimum = SEARCH_OPTIONS[name]
+        valid_types = (int, float) if kind is float else (int,)
+        if not isinstance(raw, valid_types) or isinstance(raw, bool) or raw < minimum:
+            return None, f"search.{name} must be {'a number' if kind is float else 'an integer'} >= {minimum}"
+        options[argument] = kind(raw)
+    return options, None
 
 def load_model():
-    """Load trained model and scaler from disk"""
-    global model, scaler
-    
+    """Load the active model version from the registry"""
     try:
-        if os.path.exists('fake_account_model.pkl') and os.path.exists('scaler.pkl'):
-            model = joblib.load('fake_account_model.pkl')
-            scaler = joblib.load('scaler.pkl')
+        version = model_registry.get_active_version()
+        if version is None:
+            # First start after upgrading: adopt the pre-registry pickles
+            version = model_registry.import_legacy_model(feature_columns)
+        if version is not None:
+            activate_bundle(model_registry.load_bundle(version))
             logger.info("Model and scaler loaded from disk")
             return True
     except Exception as e:
@@ -123,49 +550,29 @@ def load_model():
 
 def validate_input_data(data):
     """Validate input data for prediction"""
-    required_fields = feature_columns
-    
-    # Check if all required fields are present
-    for field in required_fields:
-        if field not in data:
-            return False, f"Missing required field: {field}"
-    
-    # Validate data types and ranges
-    try:
-        # Username length should be positive integer
-        if not isinstance(data['username_length'], (int, float)) or data['username_length'] <= 0:
-            return False, "username_length must be a positive number"
-        
-        # Post count should be non-negative
-        if not isinstance(data['num_posts'], (int, float)) or data['num_posts'] < 0:
-            return False, "num_posts must be a non-negative number"
-        
-        # Follower count should be non-negative
-        if not isinstance(data['num_followers'], (int, float)) or data['num_followers'] < 0:
-            return False, "num_followers must be a non-negative number"
-        
-        # Following count should be non-negative
-        if not isinstance(data['num_following'], (int, float)) or data['num_following'] < 0:
-            return False, "num_following must be a non-negative number"
-        
-        # Account age should be positive
-        if not isinstance(data['account_age_days'], (int, float)) or data['account_age_days'] <= 0:
-            return False, "account_age_days must be a positive number"
-        
-        # Boolean fields should be 0 or 1
-        for bool_field in ['has_profile_picture', 'has_bio', 'is_verified']:
-            if data[bool_field] not in [0, 1, True, False]:
-                return False, f"{bool_field} must be 0 or 1"
-        
-        # Engagement ratio should be non-negative
-        if not isinstance(data['engagement_ratio'], (int, float)) or data['engagement_ratio'] < 0:
-            return False, "engagement_ratio must be a non-negative number"
-        
-    except (TypeError, ValueError) as e:
-        return False, f"Invalid data type: {str(e)}"
-    
+    values, message = input_validator.validate_record(data)
+    if values is None:
+        return False, message
     return True, "Valid"
 
+def compact_requested():
+    """True if this request asked for (or the server defaults to) compact responses"""
+    value = request.args.get('compact')
+    if value is None:
+        return PREDICT_RESPONSE == 'compact'
+    return value.lower() in ('1', 'true', 'yes')
+
+def explain_requested():
+    """True if this request asked for per-feature contributions (?explain=true)"""
+    return request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
+def should_log_prediction():
+    """Log only a sampled fraction of predictions, and only if INFO is enabled"""
+    if not logger.isEnabledFor(logging.INFO):
+        return False
+    return PREDICTION_LOG_SAMPLE >= 1 or random.random() < PREDICTION_LOG_SAMPLE
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Home endpoint with API information"""
@@ -174,102 +581,406 @@ def home():
         'version': '1.0',
         'endpoints': {
             '/predict': 'POST - Predict if an account is fake',
-            '/train': 'POST - Retrain the model',
-            '/model-info': 'GET - Get model information'
+            '/predict/batch': 'POST - Predict a JSON array or CSV of accounts in one call',
+            '/predict/stream': 'POST - Stream NDJSON or CSV accounts in, stream scored results out',
+            '/train': 'POST - Start a background retraining job',
+            '/train/<job_id>': 'GET - Poll training job status and progress',
+            '/feedback': 'POST - Submit labeled accounts; GET - pending feedback',
+            '/feedback/update': 'POST - Refresh the model from new feedback (incremental or full rebuild)',
+            '/drift': 'GET - Live traffic drift against the training profile (PSI/KS)',
+            '/model-info': 'GET - Get model information',
+            '/models': 'GET - List registered model versions',
+            '/models/<version>/activate': 'POST - Serve a registered model version',
+            '/models/rollback': 'POST - Roll back to the previously active version',
+            '/health': 'GET - Health check with cache and batching stats',
+            '/metrics': 'GET - Prometheus metrics (latency histograms, counters, model version)'
         }
     })
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Predict if an account is fake based on provided features"""
+    timer = g.timer = StageTimer()
     try:
         # Get JSON data from request
         data = request.get_json()
+        timer.mark('parse')
         
         if not data:
             return jsonify({'error': 'No JSON data provided'}), 400
         
-        # Validate input data
-        is_valid, message = validate_input_data(data)
-        if not is_valid:
-            return jsonify({'error': message}), 400
-        
-        # Check if model is loaded
-        if model is None or scaler is None:
+        # Take one reference to the active bundle for the whole request
+        current = bundle
+        if current is None:
             return jsonify({'error': 'Model not loaded. Please train the model first.'}), 500
         
-        # Prepare data for prediction
-        input_data = []
-        for feature in feature_columns:
-            value = data[feature]
-            # Convert boolean values to int
-            if isinstance(value, bool):
-                value = int(value)
-            input_data.append(value)
-        
-        # Convert to numpy array and reshape
-        input_array = np.array(input_data).reshape(1, -1)
-        
-        # Scale the input data
-        input_scaled = scaler.transform(input_array)
+        # Validate the raw input fields and collect their values in one pass;
+        # derived features are computed from them, never taken from the client
+        input_data, message = get_validator(current.input_columns).validate_record(data)
+        timer.mark('validate')
+        if input_data is None:
+            return jsonify({'error': message}), 400
         
-        # Make prediction
-        prediction = model.predict(input_scaled)[0]
-        probability = model.predict_proba(input_scaled)[0]
+        # Repeat lookups of the same account under the same model skip the forest
+        explain = explain_requested()
+        key = feature_key(input_data)
+        cached = prediction_cache.get(current.version, key) if prediction_cache.enabled and not explain else None
+        timer.mark('cache')
+        explanation = None
+        if cached is not None:
+            probability = np.array(cached)
+        elif explain:
+            # Contributions come from the same tree walk as the probabilities
+            input_array = np.array(input_data, dtype=np.float64).reshape(1, -1)
+            try:
+                proba, bias, contributions = current.explain(input_array)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            probability = proba[0]
+            explanation = format_explanations(bias, contributions, current.feature_columns)[0]
+            BATCH_ROWS.observe(1, source='predict')
+        elif micro_batcher is not None:
+            # Scored together with other requests arriving within the batching window
+            probability = micro_batcher.predict_proba(current, input_data)
+            prediction_cache.put(current.version, key, probability)
+        else:
+            # Convert to numpy array and reshape
+            input_array = np.array(input_data, dtype=np.float64).reshape(1, -1)
+            
+            # Scale and predict; the class is taken from the probabilities
+            probability = current.predict_proba(input_array, timer=timer)[0]
+            prediction_cache.put(current.version, key, probability)
+            BATCH_ROWS.observe(1, source='predict')
+        if traffic_monitor is not None:
+            traffic_monitor.observe(input_data, probability[1])
+        timer.mark('predict')
+        prediction = int(current.classes_[int(np.argmax(probability))])
         
-        # Prepare response
-        result = {
-            'prediction': int(prediction),
-            'is_fake': bool(prediction),
-            'confidence': {
-                'real_account': float(probability[0]),
-                'fake_account': float(probability[1])
-            },
-            'probability_fake': float(probability[1]),
-            'input_data': data
-        }
+        # Prepare response; compact mode leaves out the echo and the derived fields
+        if compact_requested():
+            result = {
+                'prediction': prediction,
+                'is_fake': bool(prediction),
+                'probability_fake': float(probability[1])
+            }
+        else:
+            result = {
+                'prediction': prediction,
+                'is_fake': bool(prediction),
+                'confidence': {
+                    'real_account': float(probability[0]),
+                    'fake_account': float(probability[1])
+                },
+                'probability_fake': float(probability[1]),
+                'input_data': data
+            }
+        if explanation is not None:
+            result['explanation'] = explanation
+        response = jsonify(result)
+        response.headers['X-Cache'] = 'HIT' if cached is not None else 'MISS'
+        timer.mark('serialize')
         
-        logger.info(f"Prediction made: {result}")
-        return jsonify(result)
+        if should_log_prediction():
+            logger.info(f"Prediction made: {result}")
+        timer.mark('log')
+        return response
         
     except Exception as e:
         logger.error(f"Error in prediction: {str(e)}")
         return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predict many accounts at once from a JSON array or a CSV body"""
+    timer = g.timer = StageTimer()
+    try:
+        body = request.get_data(as_text=True)
+        if not body.strip():
+            return jsonify({'error': 'No data provided'}), 400
+
+        # Take one reference to the active bundle for the whole request
+        current = bundle
+        if current is None:
+            return jsonify({'error': 'Model not loaded. Please train the model first.'}), 500
+
+        # Parse the body column-wise into a matrix of the raw input fields
+        try:
+            if request.mimetype in ('text/csv', 'application/csv'):
+                X, errors, _ = parse_csv_matrix(body, current.input_columns)
+            else:
+                X, errors = records_to_matrix(load_json_records(body), current.input_columns)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid batch body: {str(e)}'}), 400
+        timer.mark('parse')
+
+        if len(X) == 0:
+            return jsonify({'error': 'No accounts provided'}), 400
+        if len(X) > MAX_BATCH_ROWS:
+            return jsonify({'error': f'Batch too large: {len(X)} rows (max {MAX_BATCH_ROWS})'}), 413
+
+        # Validate every column at once
+        errors = find_invalid_rows(X, current.input_columns, errors)
+        timer.mark('validate')
+        if errors:
+            return jsonify({'error': first_error(errors), 'invalid_rows': len(errors)}), 400
+
+        # One scale + predict_proba pass over the whole matrix (one tree walk with explanations)
+        explanations = None
+        if explain_requested():
+            try:
+                probability, bias, contributions = current.explain(X)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            explanations = format_explanations(bias, contributions, current.feature_columns)
+        else:
+            probability = current.predict_proba(X, timer=timer)
+        if traffic_monitor is not None:
+            traffic_monitor.observe_batch(X, probability[:, 1])
+        timer.mark('predict')
+        BATCH_ROWS.observe(len(X), source='batch')
+        predictions = format_predictions(probability, current.classes_, compact=compact_requested())
+        if explanations is not None:
+            for prediction, explanation in zip(predictions, explanations):
+                prediction['explanation'] = explanation
+        fake_count = sum(1 for p in predictions if p['is_fake'])
+        response = jsonify({
+            'count': len(predictions),
+            'fake_count': fake_count,
+            'predictions': predictions
+        })
+        timer.mark('serialize')
+
+        logger.info(f"Batch prediction made: {len(predictions)} accounts, {fake_count} fake")
+        timer.mark('log')
+        return response
+
+    except Exception as e:
+        logger.error(f"Error in batch prediction: {str(e)}")
+        return jsonify({'error': f'Batch prediction failed: {str(e)}'}), 500
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """Score a newline-delimited JSON or CSV body chunk by chunk as a streamed response"""
+    # The whole stream is scored by the bundle active when it started
+    current = bundle
+    if current is None:
+        return jsonify({'error': 'Model not loaded. Please train the model first.'}), 500
+
+    input_format = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+    output_format = request.args.get('output', 'ndjson')
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'output must be ndjson or csv'}), 400
+    chunk_rows = request.args.get('chunk_size', STREAM_CHUNK_ROWS, type=int)
+    if chunk_rows <= 0:
+        return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+
+    def predict_chunk(X):
+        BATCH_ROWS.observe(len(X), source='stream')
+        proba = current.predict_proba(X)
+        if traffic_monitor is not None:
+            traffic_monitor.observe_batch(X, proba[:, 1])
+        return proba
+
+    def generate():
+        try:
+            yield from score_stream(request.stream, predict_chunk, current.classes_,
+                                    current.input_columns, input_format, output_format,
+                                    chunk_rows=chunk_rows)
+        except Exception as e:
+            # Headers are already sent, so report the failure inline and stop
+            logger.error(f"Error in streaming prediction: {str(e)}")
+            if output_format == 'csv':
+                yield f",,,,{csv_field(f'Streaming prediction failed: {str(e)}')}\n"
+            else:
+                yield json.dumps({'error': f'Streaming prediction failed: {str(e)}'}) + "\n"
+
+    mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 @app.route('/train', methods=['POST'])
 def retrain_model():
-    """Retrain the machine learning model"""
+    """Start a background retraining job (pass ?wait=true to block until it finishes)"""
     try:
-        logger.info("Starting model retraining...")
-        accuracy = train_model()
+        data = request.get_json(silent=True) or {}
+        n_jobs = data.get('n_jobs')
+        if n_jobs is not None and (not isinstance(n_jobs, int) or isinstance(n_jobs, bool) or n_jobs == 0):
+            return jsonify({'error': 'n_jobs must be a non-zero integer (-1 = all cores)'}), 400
+        compaction, message = parse_compaction(data.get('compaction'))
+        if message:
+            return jsonify({'error': message}), 400
+        search, message = parse_search(data.get('search'))
+        if message:
+            return jsonify({'error': message}), 400
+        
+        job_id = submit_job(train_model, n_jobs=n_jobs, compaction=compaction, search=search)
+        logger.info(f"Queued model retraining job {job_id}")
+        
+        if request.args.get('wait', '').lower() in ('1', 'true', 'yes'):
+            job = wait_for_job(job_id)
+            if job['status'] != 'succeeded':
+                return jsonify({'error': f"Training failed: {job['error']}", 'job': job}), 500
+            return jsonify({
+                'message': 'Model retrained successfully',
+                'accuracy': job['result']['accuracy'],
+                'metrics': job['result'],
+                'job_id': job_id,
+                'timestamp': datetime.now().isoformat()
+            })
         
         return jsonify({
-            'message': 'Model retrained successfully',
-            'accuracy': accuracy,
-            'timestamp': pd.Timestamp.now().isoformat()
-        })
+            'message': 'Model retraining started',
+            'job_id': job_id,
+            'status_url': url_for('training_status', job_id=job_id)
+        }), 202
         
     except Exception as e:
         logger.error(f"Error in training: {str(e)}")
         return jsonify({'error': f'Training failed: {str(e)}'}), 500
 
+@app.route('/train/<job_id>', methods=['GET'])
+def training_status(job_id):
+    """Poll the status and progress of a training job"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown training job: {job_id}'}), 404
+    return jsonify(job)
+
+@app.route('/train/jobs', methods=['GET'])
+def training_jobs():
+    """List all training jobs, newest first"""
+    return jsonify({'jobs': list_jobs()})
+
+@app.route('/feedback', methods=['POST'])
+def add_feedback():
+    """Append labeled accounts (features plus is_fake) to the feedback store"""
+    try:
+        body = request.get_data(as_text=True)
+        if not body.strip():
+            return jsonify({'error': 'No data provided'}), 400
+        # One account object, a JSON array of them, or {"accounts": [...]}
+        try:
+            records = fast_json.loads(body)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid feedback body: {str(e)}'}), 400
+        if isinstance(records, dict):
+            records = records['accounts'] if 'accounts' in records else [records]
+        if not isinstance(records, list):
+            return jsonify({'error': 'Expected an account object or an array of accounts'}), 400
+        if not records:
+            return jsonify({'error': 'No accounts provided'}), 400
+        if len(records) > MAX_BATCH_ROWS:
+            return jsonify({'error': f'Batch too large: {len(records)} rows (max {MAX_BATCH_ROWS})'}), 413
+        
+        # Features must pass the same FeatureValidator as /predict; the label must be 0/1
+        X, errors = records_to_matrix(records, input_columns + ['is_fake'])
+        errors = get_validator(input_columns).validate_matrix(X[:, :-1], errors)
+        for row in np.flatnonzero(~np.isin(X[:, -1], (0, 1))):
+            errors.setdefault(int(row), "is_fake must be 0 or 1")
+        if errors:
+            return jsonify({'error': first_error(errors), 'invalid_rows': len(errors)}), 400
+        
+        accepted = feedback_store.append(X[:, :-1], X[:, -1], input_columns)
+        FEEDBACK_ROWS.inc(accepted)
+        current = bundle
+        offset = current.metrics.get('feedback_offset', 0) if current is not None else 0
+        pending = feedback_store.count_since(offset)
+        response = {'accepted': accepted, 'pending_rows': pending}
+        job_id = maybe_schedule_update(pending)
+        if job_id:
+            response['update_job'] = job_id
+        return jsonify(response), 201
+    
+    except Exception as e:
+        logger.error(f"Error storing feedback: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/feedback', methods=['GET'])
+def feedback_status():
+    """Feedback rows stored and not yet learned by the active model"""
+    current = bundle
+    offset = current.metrics.get('feedback_offset', 0) if current is not None else 0
+    return jsonify({
+        'total_rows': feedback_store.count_since(0),
+        'pending_rows': feedback_store.count_since(offset),
+        'model_version': current.version if current is not None else None,
+        'incremental': current.metrics.get('incremental') if current is not None else None,
+        'auto_update_rows': online_updates.FEEDBACK_UPDATE_ROWS
+    })
+
+@app.route('/feedback/update', methods=['POST'])
+def start_feedback_update():
+    """Start a feedback update job (incremental, or a full rebuild when the policy says so)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        mode = data.get('mode')
+        if mode is not None and mode not in online_updates.UPDATE_MODES:
+            return jsonify({'error': f"mode must be one of: {', '.join(online_updates.UPDATE_MODES)}"}), 400
+        n_trees = data.get('trees')
+        if n_trees is not None and (not isinstance(n_trees, int) or isinstance(n_trees, bool) or n_trees < 1):
+            return jsonify({'error': 'trees must be a positive integer'}), 400
+        rebuild = data.get('rebuild', False)
+        if not isinstance(rebuild, bool):
+            return jsonify({'error': 'rebuild must be true or false'}), 400
+        
+        job_id = submit_job(update_from_feedback, kind='feedback_update', mode=mode, n_trees=n_trees,
+                            rebuild=rebuild)
+        if request.args.get('wait', '').lower() in ('1', 'true', 'yes'):
+            job = wait_for_job(job_id)
+            if job['status'] != 'succeeded':
+                return jsonify({'error': f"Update failed: {job['error']}", 'job': job}), 500
+            return jsonify(dict(job['result'], job_id=job_id))
+        return jsonify({
+            'message': 'Feedback update started',
+            'job_id': job_id,
+            'status_url': url_for('training_status', job_id=job_id)
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Error starting feedback update: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/drift', methods=['GET'])
+def drift_status():
+    """Live traffic drift of the served version against its training profile"""
+    if traffic_monitor is None:
+        return jsonify({'error': 'Drift monitoring is disabled (DRIFT_MONITOR=0)'}), 404
+    windows = request.args.get('windows', type=int)
+    if windows is not None and windows < 1:
+        return jsonify({'error': 'windows must be a positive integer'}), 400
+    
+    report = traffic_monitor.report(windows)
+    report['retrain'] = {
+        'enabled': drift_monitor.DRIFT_RETRAIN,
+        'cooldown_seconds': drift_monitor.DRIFT_RETRAIN_COOLDOWN,
+        'last_job': _drift_retrain_job
+    }
+    return jsonify(report)
+
 @app.route('/model-info', methods=['GET'])
 def model_info():
     """Get information about the current model"""
     try:
-        if model is None:
+        current = bundle
+        if current is None:
             return jsonify({'error': 'No model loaded'}), 404
         
         # Get feature importance if available
         feature_importance = None
-        if hasattr(model, 'feature_importances_'):
-            feature_importance = dict(zip(feature_columns, model.feature_importances_.tolist()))
+        if current.feature_importances is not None:
+            feature_importance = dict(zip(current.feature_columns, current.feature_importances))
         
         info = {
-            'model_type': type(model).__name__,
-            'features': feature_columns,
+            'version': current.version,
+            'created_at': current.created_at,
+            'model_type': current.model_type,
+            'inference_backend': current.backend,
+            'quantization': current.manifest.get('quantization'),
+            'features': current.feature_columns,
+            'inputs': current.input_columns,
+            'derived_features': current.pipeline.describe(),
             'feature_importance': feature_importance,
-            'model_parameters': model.get_params() if hasattr(model, 'get_params') else None
+            'metrics': current.metrics,
+            'model_parameters': current.model_params
         }
         
         return jsonify(info)
@@ -278,25 +989,94 @@ def model_info():
         logger.error(f"Error getting model info: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/models', methods=['GET'])
+def list_models():
+    """List all registered model versions"""
+    current = bundle
+    active = current.version if current is not None else None
+    versions = model_registry.list_versions()
+    for manifest in versions:
+        manifest['active'] = manifest['version'] == active
+    return jsonify({'active_version': active, 'versions': versions})
+
+@app.route('/models/<version>/activate', methods=['POST'])
+def activate_model(version):
+    """Switch serving to a registered model version"""
+    try:
+        new_bundle = activate_version(version)
+        return jsonify({'message': f'Model version {version} activated', 'model': new_bundle.describe()})
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    except Exception as e:
+        logger.error(f"Error activating model version {version}: {str(e)}")
+        return jsonify({'error': f'Activation failed: {str(e)}'}), 500
+
+@app.route('/models/rollback', methods=['POST'])
+def rollback_model():
+    """Switch serving back to the previously active model version"""
+    try:
+        previous = model_registry.previous_version()
+        if previous is None:
+            return jsonify({'error': 'No previous version to roll back to'}), 409
+        
+        # Load first so a broken artifact leaves the current version serving
+        new_bundle = model_registry.load_bundle(previous)
+        model_registry.rollback()
+        activate_bundle(new_bundle)
+        return jsonify({'message': f'Rolled back to model version {previous}', 'model': new_bundle.describe()})
+    except Exception as e:
+        logger.error(f"Error rolling back model: {str(e)}")
+        return jsonify({'error': f'Rollback failed: {str(e)}'}), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    current = bundle
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None,
-        'scaler_loaded': scaler is not None
+        'model_loaded': current is not None,
+        # A compiled engine carries the scaler in its thresholds; don't unpickle just to answer
+        'scaler_loaded': current is not None and (current.engine is not None or current.scaler is not None),
+        'model_version': current.version if current is not None else None,
+        'prediction_cache': prediction_cache.stats(),
+        'micro_batching': micro_batcher.stats() if micro_batcher is not None else {'enabled': False},
+        'admission': ({name: limiter.concurrency.snapshot() for name, limiter in admission_classes.items()}
+                      if admission.ADMISSION_ENABLED else {'enabled': False})
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker process"""
+    current = bundle
+    cache = prediction_cache.stats()
+    lines = render_samples('fakeacct_model_info', 'gauge', 'Model version being served (value is always 1)',
+                           [({'version': current.version, 'backend': current.backend}, 1)] if current else [])
+    for name in ('hits', 'misses', 'evictions', 'expirations'):
+        lines += render_samples(f'fakeacct_prediction_cache_{name}_total', 'counter',
+                                f'Prediction cache {name}', [({}, cache[name])])
+    lines += render_samples('fakeacct_prediction_cache_entries', 'gauge', 'Entries in the prediction cache',
+                            [({'backend': cache['backend']}, cache['size'])])
+    if micro_batcher is not None:
+        batching = micro_batcher.stats()
+        lines += render_samples('fakeacct_micro_batches_total', 'counter', 'Micro-batches flushed',
+                                [({}, batching['batches'])])
+        lines += render_samples('fakeacct_micro_batch_queue_depth', 'gauge', 'Requests waiting for a micro-batch',
+                                [({}, batching['queued'])])
+    return Response(metrics_registry.render(lines), mimetype='text/plain; version=0.0.4')
+
 def initialize_app():
     """Initialize the application by loading or training the model"""
     logger.info("Initializing Fake Account Detector API...")
     
     # Try to load existing model
+    started = time.perf_counter()
     if not load_model():
         logger.info("No existing model found. Training new model...")
         train_model()
+        STARTUP_SECONDS.set(time.perf_counter() - started, stage='train')
     else:
         logger.info("Existing model loaded successfully")
+        STARTUP_SECONDS.set(time.perf_counter() - started, stage='load_model')
 
 if __name__ == '__main__':
     # Initialize the application
@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for the Fake Account Detector
+Run from the project root, e.g. python -m benchmarks.bench_inference
+"""
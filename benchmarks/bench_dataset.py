@@ -0,0 +1,84 @@
+"""
+Dataset Loading Benchmark
+Compares loading the training data with pd.read_csv, with the chunked CSV
+training loader and with the memory-mapped columnar cache: wall time, peak
+traced memory and resident size of the loaded data
+
+    python -m benchmarks.bench_dataset [--rows 1000000]
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+import dataset_generator
+import dataset_store
+import training
+
+FEATURE_COLUMNS = [
+    'username_length', 'num_posts', 'num_followers', 'num_following',
+    'account_age_days', 'has_profile_picture', 'has_bio',
+    'engagement_ratio', 'is_verified'
+]
+
+
+def measure(fn):
+    """Run fn and return (result, seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the generated dataset')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'bench_dataset.csv')
+        dataset_generator.generate_dataset_to_file(csv_path, args.rows)
+        dataset_store.DATASET_CACHE_DIR = os.path.join(tmp_dir, 'cache')
+
+        _, build_seconds, _ = measure(lambda: dataset_store.build_cache(csv_path))
+        cache_dir = dataset_store.cache_dir_for(csv_path)
+        cache_bytes = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+
+        df, csv_seconds, csv_peak = measure(lambda: pd.read_csv(csv_path))
+        csv_resident = df.memory_usage(deep=True).sum() / 2 ** 20
+        del df
+
+        (X, y, _), loader_seconds, loader_peak = measure(
+            lambda: training.load_training_data(csv_path, FEATURE_COLUMNS))
+        loader_resident = (X.nbytes + y.nbytes) / 2 ** 20
+        del X, y
+
+        columns, mmap_seconds, mmap_peak = measure(lambda: dataset_store.load_columns(csv_path))
+        del columns
+
+        (X, y, _), cached_seconds, cached_peak = measure(
+            lambda: training.load_cached_training_data(csv_path, FEATURE_COLUMNS))
+        cached_resident = (X.nbytes + y.nbytes) / 2 ** 20
+        del X, y
+
+        print(f"{args.rows:,} rows; CSV {os.path.getsize(csv_path) / 2 ** 20:.1f} MB on disk, "
+              f"cache {cache_bytes / 2 ** 20:.1f} MB (built once in {build_seconds:.2f} s)\n")
+        print(f"{'loader':<34} {'seconds':>9} {'speedup':>9} {'peak MB':>9} {'data MB':>9}")
+        print("-" * 74)
+        rows = [
+            ('pd.read_csv (all columns)', csv_seconds, csv_peak, csv_resident),
+            ('CSV chunks -> float32 matrix', loader_seconds, loader_peak, loader_resident),
+            ('cache: open mmap columns', mmap_seconds, mmap_peak, 0.0),
+            ('cache -> float32 matrix', cached_seconds, cached_peak, cached_resident),
+        ]
+        for name, seconds, peak, resident in rows:
+            print(f"{name:<34} {seconds:>9.3f} {csv_seconds / seconds:>8.1f}x {peak:>9.1f} {resident:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
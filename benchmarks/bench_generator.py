@@ -0,0 +1,49 @@
+"""
+Dataset Generator Benchmark
+Reports generation throughput (rows/s) in memory and chunked to disk, with one
+worker process and with several
+
+    python -m benchmarks.bench_generator [--rows 2000000] [--workers 4]
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import dataset_generator
+
+
+def rows_per_second(fn, n_rows):
+    """Run fn once and return its throughput"""
+    start = time.perf_counter()
+    fn()
+    return n_rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Rows written to disk per run')
+    parser.add_argument('--chunk-rows', type=int, default=500_000, help='Rows per chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Workers for the parallel run')
+    args = parser.parse_args()
+
+    print(f"{'mode':<32} {'rows':>12} {'rows/s':>14}")
+    print("-" * 60)
+
+    for n_rows in (10_000, 1_000_000):
+        rate = rows_per_second(lambda: dataset_generator.generate_fake_account_dataset(n_rows), n_rows)
+        print(f"{'in memory':<32} {n_rows:>12,} {rate:>14,.0f}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.csv')
+        for workers in sorted({1, args.workers}):
+            rate = rows_per_second(
+                lambda: dataset_generator.generate_dataset_to_file(path, args.rows, args.chunk_rows,
+                                                                   n_workers=workers),
+                args.rows
+            )
+            print(f"{f'csv, {workers} worker(s)':<32} {args.rows:>12,} {rate:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Inference Latency Benchmark
+Compares sklearn's scaler.transform + predict_proba against the compiled forest
+engine for batch sizes 1, 100 and 10k, and checks the probabilities match bit for bit
+
+    python -m benchmarks.bench_inference [--repeats 200]
+"""
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+from forest_engine import CompiledForest
+
+BATCH_SIZES = [1, 100, 10000]
+
+
+def time_calls(fn, X, repeats):
+    """Return per-call latencies in milliseconds"""
+    fn(X)  # warm-up
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=200, help='Timed calls per batch size (10k batches use a tenth)')
+    args = parser.parse_args()
+
+    model = joblib.load('fake_account_model.pkl')
+    scaler = joblib.load('scaler.pkl')
+    # Single job so sklearn sums trees in a fixed order
+    model.set_params(n_jobs=None)
+
+    start = time.perf_counter()
+    engine = CompiledForest.from_sklearn(model, scaler)
+    print(f"Compiled {engine.n_trees} trees ({len(engine.feature)} nodes) in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    df = pd.read_csv('fake_accounts_dataset.csv')
+    data = df.drop(columns=['is_fake']).to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(0)
+
+    backends = {
+        'sklearn': lambda X: model.predict_proba(scaler.transform(X)),
+        'compiled': engine.predict_proba,
+    }
+
+    print(f"\n{'batch':>7} {'backend':>9} {'p50 ms':>10} {'p99 ms':>10} {'rows/s':>12}")
+    print("-" * 52)
+    for batch_size in BATCH_SIZES:
+        X = data[rng.integers(0, len(data), batch_size)]
+        identical = np.array_equal(backends['sklearn'](X), backends['compiled'](X))
+        repeats = max(args.repeats // 10, 5) if batch_size >= 10000 else args.repeats
+
+        for name, fn in backends.items():
+            latencies = time_calls(fn, X, repeats)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{batch_size:>7} {name:>9} {p50:>10.3f} {p99:>10.3f} {batch_size / (p50 / 1000):>12,.0f}")
+        print(f"{'':>7} bit-identical probabilities: {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-Batching Load Test
+Drives POST /predict from many concurrent client threads through the Flask
+test client and reports throughput and p50/p99 latency with micro-batching off
+and at several (max batch size, max wait) settings. The prediction cache is
+disabled so every request reaches the model.
+
+    python -m benchmarks.bench_microbatch [--clients 32] [--requests 100] [--backend sklearn]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+# (max batch size, max wait ms); None = micro-batching off
+SETTINGS = [None, (16, 0.5), (64, 2), (64, 5), (256, 10)]
+
+
+def run_load(app, accounts, clients, requests_per_client):
+    """Fire requests from concurrent threads; return (requests/s, latencies in ms)"""
+    latencies = [[] for _ in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def client(index):
+        test_client = app.test_client()
+        rng = np.random.default_rng(index)
+        barrier.wait()
+        for _ in range(requests_per_client):
+            account = accounts[rng.integers(len(accounts))]
+            start = time.perf_counter()
+            response = test_client.post('/predict', json=account)
+            latencies[index].append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return clients * requests_per_client / elapsed, np.concatenate(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent client threads')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per client')
+    parser.add_argument('--backend', default=None, help='INFERENCE_BACKEND to load the model with')
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ['INFERENCE_BACKEND'] = args.backend
+    # Measure batching, not rate limits (read when api is imported)
+    os.environ['ADMISSION'] = '0'
+    import logging
+    logging.disable(logging.INFO)
+    import api
+    from micro_batcher import MicroBatcher
+    import pandas as pd
+
+    if not api.load_model():
+        sys.exit("No model available; start the API once or POST /train first")
+    api.prediction_cache.max_entries = 0
+
+    df = pd.read_csv(api.ensure_dataset(), nrows=5000)
+    accounts = df[api.input_columns].to_dict(orient='records')
+
+    print(f"backend={api.bundle.backend}, {args.clients} clients x {args.requests} requests\n")
+    print(f"{'setting':<22} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'mean batch':>11}")
+    print("-" * 64)
+    for setting in SETTINGS:
+        api.micro_batcher = MicroBatcher(*setting) if setting else None
+        throughput, latencies = run_load(api.app, accounts, args.clients, args.requests)
+        label = 'off' if setting is None else f"size {setting[0]}, wait {setting[1]} ms"
+        mean_batch = api.micro_batcher.stats()['mean_batch_size'] if api.micro_batcher else 1.0
+        print(f"{label:<22} {throughput:>9.0f} {np.percentile(latencies, 50):>9.2f} "
+              f"{np.percentile(latencies, 99):>9.2f} {mean_batch:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Overload Benchmark
+Starts the production runner twice, with admission control off (ADMISSION=0)
+and on, and drives each with well-behaved interactive clients (one /predict
+at a time at a steady pace, each with its own API key) alongside one abusive
+client that sends large /predict/batch requests back to back from several
+connections and keeps posting /train. Reports the interactive clients'
+latency and success rate, and how the abusive client's requests were
+answered (200/202, 429 rate-limited, 503 shed; 'error' when a rejected batch
+is too large to read off and the server closes the connection on it)
+
+    python -m benchmarks.bench_overload [--interactive 8] [--rate 20] [--abusers 4] [--rate-limit 40]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import json
+import threading
+from collections import Counter
+import numpy as np
+import requests
+from benchmarks.bench_server import start_server, stop_server
+
+ACCOUNT = {'username_length': 12, 'num_posts': 45, 'num_followers': 234, 'num_following': 156,
+           'account_age_days': 120, 'has_profile_picture': 1, 'has_bio': 1, 'is_verified': 0}
+
+
+def run_overload(url, interactive, rate, abusers, batch_rows, seconds):
+    """Drive the server for a fixed time; returns interactive latencies, their statuses and the abuser's statuses"""
+    stop_at = time.perf_counter() + seconds
+    latencies = [[] for _ in range(interactive)]
+    interactive_statuses = Counter()
+    abuser_statuses = Counter()
+    lock = threading.Lock()
+
+    def post(session, path, **kwargs):
+        try:
+            return session.post(f"{url}{path}", timeout=60, **kwargs).status_code
+        except requests.RequestException:
+            return 'error'
+
+    def interactive_client(index):
+        session = requests.Session()
+        session.headers['X-API-Key'] = f"interactive-{index}"
+        next_at = time.perf_counter()
+        n = index
+        while next_at < stop_at:
+            time.sleep(max(next_at - time.perf_counter(), 0))
+            next_at += 1 / rate
+            # Vary the account so the prediction cache does not answer everything
+            account = dict(ACCOUNT, num_posts=n % 5000)
+            n += interactive
+            start = time.perf_counter()
+            status = post(session, '/predict', json=account)
+            latencies[index].append((time.perf_counter() - start) * 1000)
+            with lock:
+                interactive_statuses[status] += 1
+
+    def batch_abuser():
+        session = requests.Session()
+        session.headers['X-API-Key'] = 'abuser'
+        session.headers['Content-Type'] = 'application/json'
+        body = json.dumps([dict(ACCOUNT, num_posts=i) for i in range(batch_rows)]).encode()
+        while time.perf_counter() < stop_at:
+            status = post(session, '/predict/batch', data=body)
+            with lock:
+                abuser_statuses[f"batch {status}"] += 1
+
+    def train_abuser():
+        session = requests.Session()
+        session.headers['X-API-Key'] = 'abuser'
+        while time.perf_counter() < stop_at:
+            status = post(session, '/train', json={})
+            with lock:
+                abuser_statuses[f"train {status}"] += 1
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=interactive_client, args=(i,)) for i in range(interactive)]
+    if abusers:
+        threads += [threading.Thread(target=batch_abuser) for _ in range(abusers)]
+        threads.append(threading.Thread(target=train_abuser))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate([np.array(l) for l in latencies]), interactive_statuses, abuser_statuses
+
+
+def train_backlog(url):
+    """Training jobs still queued or running"""
+    jobs = requests.get(f"{url}/train/jobs", timeout=10).json()['jobs']
+    return sum(job['status'] in ('queued', 'running') for job in jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interactive', type=int, default=8, help='Well-behaved /predict clients')
+    parser.add_argument('--rate', type=float, default=20, help='Requests per second per interactive client')
+    parser.add_argument('--abusers', type=int, default=4, help='Connections the abusive client sends batches from')
+    parser.add_argument('--batch-rows', type=int, default=2000, help='Accounts per abusive batch')
+    parser.add_argument('--rate-limit', type=float, default=40,
+                        help='Per-client predict tokens per second (RATE_LIMIT_PREDICT) when admission is on')
+    parser.add_argument('--seconds', type=float, default=10, help='Load duration per run')
+    parser.add_argument('--workers', type=int, default=1, help='serve.py worker processes')
+    parser.add_argument('--threads', type=int, default=16, help='serve.py threads per worker')
+    args = parser.parse_args()
+
+    url = 'http://127.0.0.1:5002'
+    command = [sys.executable, 'serve.py', '--bind', '127.0.0.1:5002',
+               '--workers', str(args.workers), '--threads', str(args.threads)]
+    runs = [
+        ('interactive only', '1', 0),
+        ('overload, admission off', '0', args.abusers),
+        ('overload, admission on', '1', args.abusers),
+    ]
+
+    print(f"{args.interactive} interactive clients x {args.rate:g} req/s; abuser: {args.abusers} x "
+          f"{args.batch_rows}-row batches + /train; {args.seconds:g} s per run\n")
+    print(f"{'run':<26} {'p50 ms':>9} {'p99 ms':>9} {'ok %':>7} {'jobs left':>10}   abusive client")
+    print("-" * 110)
+    for name, admission, abusers in runs:
+        # Jobs the abuser starts register versions; keep them out of the real registry
+        scratch = tempfile.mkdtemp(prefix='bench-overload-')
+        env = dict(os.environ, PYTHONWARNINGS='ignore', PREDICTION_CACHE_SIZE='0', ADMISSION=admission,
+                   RATE_LIMIT_PREDICT=str(args.rate_limit), RATE_LIMIT_PREDICT_BURST=str(2 * args.rate_limit),
+                   MODEL_REGISTRY_DIR=os.path.join(scratch, 'models'),
+                   FEEDBACK_PATH=os.path.join(scratch, 'feedback.csv'))
+        process = start_server(command, url, env)
+        try:
+            run_overload(url, args.interactive, args.rate, 0, args.batch_rows, 1)  # warm-up
+            latencies, statuses, abuser = run_overload(url, args.interactive, args.rate, abusers,
+                                                       args.batch_rows, args.seconds)
+            backlog = train_backlog(url)
+        finally:
+            stop_server(process)
+            shutil.rmtree(scratch, ignore_errors=True)
+        ok = 100 * statuses[200] / max(sum(statuses.values()), 1)
+        abuse = ', '.join(f"{key}: {count}" for key, count in sorted(abuser.items())) or '-'
+        print(f"{name:<26} {np.percentile(latencies, 50):>9.2f} {np.percentile(latencies, 99):>9.2f} "
+              f"{ok:>6.1f}% {backlog:>10}   {abuse}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Request Path Benchmark
+Sends POST /predict through the Flask test client under progressively leaner
+settings and averages the Server-Timing stages of every response, showing
+where the time goes: parsing, validation, model, serialization and logging
+
+    python -m benchmarks.bench_request_path [--requests 5000]
+"""
+
+import os
+import argparse
+import logging
+import numpy as np
+
+ACCOUNT = {
+    'username_length': 12, 'num_posts': 45, 'num_followers': 234, 'num_following': 156,
+    'account_age_days': 120, 'has_profile_picture': 1, 'has_bio': 1,
+    'engagement_ratio': 0.192, 'is_verified': 0
+}
+
+# (label, JSON provider, compact responses, fraction of predictions logged)
+SETTINGS = [
+    ('json + full + log all', 'std', False, 1.0),
+    ('orjson + full + log all', 'orjson', False, 1.0),
+    ('orjson + compact + log all', 'orjson', True, 1.0),
+    ('orjson + compact + log 1%', 'orjson', True, 0.01),
+]
+
+
+def parse_server_timing(header):
+    """'a;dur=1.0, b;dur=2.0' -> {'a': 1.0, 'b': 2.0}"""
+    stages = {}
+    for part in header.split(','):
+        name, _, duration = part.strip().partition(';dur=')
+        stages[name] = float(duration)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000, help='Requests per setting')
+    args = parser.parse_args()
+
+    # Measure the request path, not rate limits (read when api is imported)
+    os.environ['ADMISSION'] = '0'
+    import api
+    import fast_json
+    from flask.json.provider import DefaultJSONProvider
+
+    if not api.load_model():
+        raise SystemExit("No model available; start the API once or POST /train first")
+    # Every request should reach the model, and log output should cost what a file write costs
+    api.prediction_cache.max_entries = 0
+    root = logging.getLogger()
+    root.handlers = [logging.StreamHandler(open(os.devnull, 'w'))]
+    client = api.app.test_client()
+
+    stage_names = ['parse', 'validate', 'cache', 'predict', 'serialize', 'log', 'total']
+    print(f"{'setting':<28}" + ''.join(f"{name:>10}" for name in stage_names) + f"{'bytes':>8}")
+    print("-" * (28 + 10 * len(stage_names) + 8))
+    for label, encoder, compact, log_sample in SETTINGS:
+        if encoder == 'orjson' and fast_json.orjson is None:
+            print(f"{label:<28} skipped (orjson not installed)")
+            continue
+        api.app.json = fast_json.OrjsonProvider(api.app) if encoder == 'orjson' else DefaultJSONProvider(api.app)
+        api.PREDICTION_LOG_SAMPLE = log_sample
+        url = '/predict?compact=true' if compact else '/predict?compact=false'
+
+        timings = []
+        for _ in range(args.requests):
+            response = client.post(url, json=ACCOUNT)
+            timings.append(parse_server_timing(response.headers['Server-Timing']))
+        means = {name: np.mean([t.get(name, 0.0) for t in timings]) for name in stage_names}
+        print(f"{label:<28}" + ''.join(f"{means[name]:>10.4f}" for name in stage_names)
+              + f"{len(response.get_data()):>8}")
+    print("\n(mean milliseconds per stage inside the handler)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Server Throughput Benchmark
+Starts the API with the Flask development server (python api.py) and with the
+production runner (python serve.py), then drives POST /predict over real HTTP
+keep-alive connections from concurrent clients and reports requests/s and
+p50/p99 latency for each
+
+    python -m benchmarks.bench_server [--clients 16] [--seconds 10] [--workers 4]
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+import subprocess
+import numpy as np
+import requests
+
+ACCOUNTS = [
+    {'username_length': 12, 'num_posts': 45, 'num_followers': 234, 'num_following': 156,
+     'account_age_days': 120, 'has_profile_picture': 1, 'has_bio': 1,
+     'engagement_ratio': 0.192, 'is_verified': 0},
+    {'username_length': 25, 'num_posts': 3, 'num_followers': 12, 'num_following': 4000,
+     'account_age_days': 7, 'has_profile_picture': 0, 'has_bio': 0,
+     'engagement_ratio': 0.25, 'is_verified': 0},
+]
+
+
+def start_server(command, url, env):
+    """Launch a server in its own process group and wait until /health answers"""
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.25)
+    stop_server(process)
+    raise RuntimeError(f"Server did not start: {' '.join(command)}")
+
+
+def stop_server(process):
+    """Terminate the server and any children it forked"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def run_load(url, clients, seconds):
+    """Send /predict requests from concurrent sessions for a fixed time"""
+    latencies = [[] for _ in range(clients)]
+    failures = [0] * clients
+    stop_at = time.perf_counter() + seconds
+
+    def client(index):
+        session = requests.Session()
+        n = index
+        while time.perf_counter() < stop_at:
+            # Vary the account so the prediction cache does not answer everything
+            account = dict(ACCOUNTS[n % 2], num_posts=n % 5000)
+            n += clients
+            start = time.perf_counter()
+            response = session.post(f"{url}/predict", json=account, timeout=30)
+            latencies[index].append((time.perf_counter() - start) * 1000)
+            failures[index] += response.status_code != 200
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    all_latencies = np.concatenate([np.array(l) for l in latencies])
+    return len(all_latencies) / seconds, all_latencies, sum(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent HTTP clients')
+    parser.add_argument('--seconds', type=float, default=10, help='Load duration per server')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='serve.py worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='serve.py threads per worker')
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONWARNINGS='ignore', PREDICTION_CACHE_SIZE='0', ADMISSION='0')
+    servers = [
+        ('dev server (api.py)', [sys.executable, 'api.py'], 'http://127.0.0.1:5000'),
+        (f'serve.py {args.workers}w x {args.threads}t',
+         [sys.executable, 'serve.py', '--bind', '127.0.0.1:5001',
+          '--workers', str(args.workers), '--threads', str(args.threads)], 'http://127.0.0.1:5001'),
+    ]
+
+    print(f"{args.clients} clients, {args.seconds:g} s per server\n")
+    print(f"{'server':<26} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    print("-" * 64)
+    for name, command, url in servers:
+        process = start_server(command, url, env)
+        try:
+            run_load(url, args.clients, 1)  # warm-up
+            throughput, latencies, failures = run_load(url, args.clients, args.seconds)
+        finally:
+            stop_server(process)
+        print(f"{name:<26} {throughput:>9.0f} {np.percentile(latencies, 50):>9.2f} "
+              f"{np.percentile(latencies, 99):>9.2f} {failures:>7}")
+
+
+if __name__ == '__main__':
+    main()
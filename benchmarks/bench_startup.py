@@ -0,0 +1,75 @@
+"""
+Cold Start Benchmark
+Measures, in fresh interpreter processes, how long it takes to import the API,
+load the active model and answer the first prediction - once with the
+memory-mapped compiled engine and once with pickled sklearn artifacts
+
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import numpy as np
+
+# Runs inside each child process and prints one JSON line of timings
+CHILD_SCRIPT = r"""
+import time, json, sys
+start = time.perf_counter()
+import api
+imported = time.perf_counter()
+api.load_model()
+loaded = time.perf_counter()
+client = api.app.test_client()
+client.post('/predict', json={
+    'username_length': 12, 'num_posts': 45, 'num_followers': 234, 'num_following': 156,
+    'account_age_days': 120, 'has_profile_picture': 1, 'has_bio': 1,
+    'engagement_ratio': 0.192, 'is_verified': 0
+})
+predicted = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'load_ms': (loaded - imported) * 1000,
+    'first_predict_ms': (predicted - loaded) * 1000,
+    'total_ms': (predicted - start) * 1000,
+    'sklearn_imported': 'sklearn' in sys.modules
+}))
+"""
+
+MODES = {
+    'mmap (compiled engine)': {'INFERENCE_BACKEND': 'auto'},
+    'pickle (sklearn)': {'INFERENCE_BACKEND': 'sklearn'},
+}
+
+
+def run_child(env_overrides):
+    """Start a fresh interpreter and return its timing dict"""
+    env = dict(os.environ, **env_overrides)
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', CHILD_SCRIPT],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per mode')
+    args = parser.parse_args()
+
+    # Make sure the registry has an active version (imports legacy pickles if needed)
+    run_child({})
+
+    print(f"{'mode':<24} {'import ms':>10} {'load ms':>10} {'1st pred ms':>12} {'total ms':>10} {'sklearn':>8}")
+    print("-" * 78)
+    for mode, env in MODES.items():
+        runs = [run_child(env) for _ in range(args.runs)]
+        median = {key: float(np.median([r[key] for r in runs]))
+                  for key in ('import_ms', 'load_ms', 'first_predict_ms', 'total_ms')}
+        print(f"{mode:<24} {median['import_ms']:>10.1f} {median['load_ms']:>10.1f} "
+              f"{median['first_predict_ms']:>12.1f} {median['total_ms']:>10.1f} "
+              f"{str(runs[-1]['sklearn_imported']):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Benchmark Suite
+Runs in-process (Flask test client, no network) against a temporary registry
+and a seeded synthetic dataset, and writes every result as machine-readable
+JSON. compare checks a run against a stored baseline and exits non-zero when
+any metric regressed past the threshold or is missing from the run.
+
+    python -m benchmarks.suite run [--quick] [--output results.json]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.25]
+
+Store a baseline by running once on the reference machine:
+
+    python -m benchmarks.suite run --output benchmarks/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import numpy as np
+
+# Dataset sizes for the training-time benchmark (full and --quick runs)
+TRAINING_SIZES = [10000, 50000, 200000]
+QUICK_TRAINING_SIZES = [5000, 20000]
+
+ACCOUNT = {
+    'username_length': 12, 'num_posts': 45, 'num_followers': 234, 'num_following': 156,
+    'account_age_days': 120, 'has_profile_picture': 1, 'has_bio': 1,
+    'engagement_ratio': 0.192, 'is_verified': 0
+}
+
+
+class Results:
+    """Collects metrics as {name: {'value', 'unit', 'better'}}"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better='lower'):
+        self.metrics[name] = {'value': round(float(value), 6), 'unit': unit, 'better': better}
+        print(f"  {name:<44} {value:>14.4f} {unit}", flush=True)
+
+
+def latencies_ms(fn, repeats):
+    """Call fn repeats times after one warm-up; return per-call milliseconds"""
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+
+def peak_traced_mb(fn):
+    """Run fn once and return (result, peak traced allocation in MB)"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_generator(results, quick):
+    import dataset_generator
+    n_rows = 100000 if quick else 1000000
+    timings = latencies_ms(lambda: dataset_generator.generate_fake_account_dataset(n_rows), 3)
+    results.add('generator.rows_per_s', n_rows / (np.median(timings) / 1000), 'rows/s', better='higher')
+
+
+def bench_training(results, api, work_dir, quick):
+    import dataset_generator
+    sizes = QUICK_TRAINING_SIZES if quick else TRAINING_SIZES
+    for n_rows in sizes:
+        path = os.path.join(work_dir, f"train_{n_rows}.csv")
+        dataset_generator.generate_fake_account_dataset(n_rows).to_csv(path, index=False)
+        api.DATASET_PATH = path
+        start = time.perf_counter()
+        metrics, peak = peak_traced_mb(lambda: api.train_model(n_jobs=1, activate=False))
+        results.add(f'training.{n_rows}_rows.seconds', time.perf_counter() - start, 's')
+        results.add(f'training.{n_rows}_rows.peak_mb', peak, 'MB')
+        results.add(f'training.{n_rows}_rows.accuracy', metrics['accuracy'], 'fraction', better='higher')
+
+
+def bench_model_load(results, api, version):
+    import model_registry
+    timings = latencies_ms(lambda: model_registry.load_bundle(version), 20)
+    results.add('model.load_ms', np.median(timings), 'ms')
+
+
+def bench_inference(results, api, quick):
+    client = api.app.test_client()
+    repeats = 200 if quick else 1000
+
+    # Every request reaches the model: vary one feature and keep the cache off
+    counter = iter(range(10 ** 9))
+    single = latencies_ms(lambda: client.post('/predict', json=dict(ACCOUNT, num_posts=next(counter))), repeats)
+    results.add('inference.single.p50_ms', np.percentile(single, 50), 'ms')
+    results.add('inference.single.p99_ms', np.percentile(single, 99), 'ms')
+
+    for batch_size in (100, 10000):
+        body = [dict(ACCOUNT, num_posts=i) for i in range(batch_size)]
+        n = max(repeats // (10 if batch_size >= 10000 else 2), 10)
+        timings = latencies_ms(lambda: client.post('/predict/batch?compact=true', json=body), n)
+        results.add(f'inference.batch_{batch_size}.p50_ms', np.percentile(timings, 50), 'ms')
+        results.add(f'inference.batch_{batch_size}.rows_per_s',
+                    batch_size / (np.percentile(timings, 50) / 1000), 'rows/s', better='higher')
+
+    body = [dict(ACCOUNT, num_posts=i) for i in range(10000)]
+    timings = latencies_ms(lambda: client.post('/predict/batch?compact=true&explain=true', json=body),
+                           max(repeats // 10, 10))
+    results.add('inference.explain_10000.p50_ms', np.percentile(timings, 50), 'ms')
+
+    _, peak = peak_traced_mb(lambda: client.post('/predict/batch', json=body))
+    results.add('inference.batch_10000.peak_mb', peak, 'MB')
+
+
+def bench_concurrency(results, api, quick, clients=8):
+    per_client = 100 if quick else 500
+    barrier = threading.Barrier(clients + 1)
+
+    def worker(index):
+        client = api.app.test_client()
+        barrier.wait()
+        for i in range(per_client):
+            client.post('/predict', json=dict(ACCOUNT, num_posts=index * per_client + i))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    results.add(f'inference.concurrent_{clients}.requests_per_s',
+                clients * per_client / (time.perf_counter() - start), 'req/s', better='higher')
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix='bench-suite-')
+    # Module-level settings are read at import time, so point them at the sandbox first
+    os.environ.update({
+        'MODEL_REGISTRY_DIR': os.path.join(work_dir, 'models'),
+        'DATASET_CACHE_DIR': os.path.join(work_dir, 'dataset_cache'),
+        'FEEDBACK_PATH': os.path.join(work_dir, 'feedback.csv'),
+        'PREDICTION_CACHE_SIZE': '0',
+        'PREDICTION_LOG_SAMPLE': '0',
+        'MODEL_RELOAD_SECONDS': '0',
+        'ADMISSION': '0',
+    })
+    import logging
+    logging.disable(logging.WARNING)
+    import warnings
+    warnings.filterwarnings('ignore')
+
+    results = Results()
+    try:
+        import api
+        import sklearn
+
+        print("generator")
+        bench_generator(results, args.quick)
+
+        print("training")
+        bench_training(results, api, work_dir, args.quick)
+
+        # Serve a model trained on the 10k-row dataset for the inference benchmarks
+        print("inference")
+        import dataset_generator
+        api.DATASET_PATH = os.path.join(work_dir, 'serve.csv')
+        dataset_generator.generate_fake_account_dataset(10000).to_csv(api.DATASET_PATH, index=False)
+        version = api.train_model(n_jobs=1)['version']
+        bench_model_load(results, api, version)
+        bench_inference(results, api, args.quick)
+        bench_concurrency(results, api, args.quick)
+
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+            results.add('process.max_rss_mb', max_rss, 'MB')
+        except ImportError:
+            pass
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'quick': args.quick,
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'sklearn': sklearn.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'inference_backend': api.bundle.backend,
+            },
+            'metrics': results.metrics
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results.metrics)} metrics to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        current = json.load(f)
+
+    regressions = []
+    missing = []
+    print(f"{'metric':<44} {'baseline':>16} {'current':>16} {'change':>9}")
+    print("-" * 88)
+    for name, base in baseline['metrics'].items():
+        if name not in current['metrics']:
+            print(f"{name:<44} {base['value']:>16.4f} {'missing':>16}  MISSING")
+            missing.append(name)
+            continue
+        value = current['metrics'][name]['value']
+        if base['value'] == 0:
+            continue
+        change = (value - base['value']) / abs(base['value'])
+        # Positive 'worse' means slower / bigger / less throughput
+        worse = change if base['better'] == 'lower' else -change
+        flag = ''
+        if worse > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<44} {base['value']:>16.4f} {value:>16.4f} {change:>+8.1%}{flag}")
+
+    if baseline['meta'].get('platform') != current['meta'].get('platform') or \
+            baseline['meta'].get('cpu_count') != current['meta'].get('cpu_count'):
+        print("\nNote: baseline was recorded on a different machine; absolute timings may not be comparable")
+
+    if missing:
+        print(f"\n{len(missing)} baseline metric(s) missing from the results: {', '.join(missing)}")
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+    if missing or regressions:
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the suite and write JSON results')
+    run_parser.add_argument('--quick', action='store_true', help='Smaller datasets and fewer repeats')
+    run_parser.add_argument('--output', default='benchmark_results.json', help='Results file')
+
+    compare_parser = commands.add_parser('compare', help='Fail if results regressed against a baseline')
+    compare_parser.add_argument('baseline', help='Baseline results JSON')
+    compare_parser.add_argument('results', help='New results JSON')
+    compare_parser.add_argument('--threshold', type=float, default=0.25,
+                                help='Allowed relative regression per metric (0.25 = 25%%)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,485 @@
+"""
+Offline Bulk Scoring Jobs
+Scores a whole account table without the web API: the input (a CSV or NDJSON
+file, or a columnar dataset cache) is split into row-range shards, a pool of
+worker processes loads the model once each and scores shards through the same
+streaming engine as /predict/stream, and every shard becomes one part file in
+the output directory. Finished shards are checkpointed in the job manifest,
+so rerunning a crashed or interrupted job only scores what is missing.
+
+    python -m bulk_scoring accounts.csv scores/ --workers 4 --shard-rows 500000
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+# Worker processes scoring shards (0 = one per core)
+BULK_WORKERS = int(os.environ.get('BULK_WORKERS', '0'))
+
+# Rows per shard (one part file each), and rows scored per model call within a shard
+BULK_SHARD_ROWS = int(os.environ.get('BULK_SHARD_ROWS', '500000'))
+BULK_CHUNK_ROWS = int(os.environ.get('BULK_CHUNK_ROWS', '50000'))
+
+# Seconds between progress lines
+BULK_PROGRESS_SECONDS = float(os.environ.get('BULK_PROGRESS_SECONDS', '5'))
+
+JOB_FILE = '_job.json'
+JOB_FORMAT_VERSION = 2
+
+# Bytes scanned per read while planning text shards
+PLAN_BLOCK_BYTES = 1 << 24
+
+# Bytes str.strip() removes, so a line of only these is blank (as scoring sees it)
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+
+OUTPUT_EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson'}
+
+# Per-process state set up by _init_worker
+_shared = {}
+
+
+def _input_signature(path):
+    """Fingerprint of the input (a columnar cache is fingerprinted by its manifest)"""
+    if os.path.isdir(path):
+        path = os.path.join(path, 'manifest.json')
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over path"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def plan_text_shards(path, shard_rows, has_header=True, block_bytes=PLAN_BLOCK_BYTES):
+    """
+    Split a newline-delimited file into shards of shard_rows rows
+
+    Returns (header bytes, shards), each shard a dict with its byte range
+    and first row. Blank lines are skipped, as scoring skips them, so row
+    numbers match the scored output. Newlines and blank lines are found with
+    a few vectorized passes per block, so planning runs at disk speed and
+    nothing is parsed.
+    """
+    shards = []
+    with open(path, 'rb') as f:
+        header = f.readline() if has_header else b''
+        shard_start = position = f.tell()
+        shard_row = rows = 0
+        pending = False  # The line continuing into the next block has content
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            data = np.frombuffer(block, dtype=np.uint8)
+            newlines = np.flatnonzero(data == 10)
+            # Content bytes up to each position; a line is blank if its span adds none
+            content = np.cumsum(~_WHITESPACE[data], dtype=np.int64)
+            line_content = np.diff(content[newlines], prepend=0)
+            has_content = line_content > 0
+            if len(newlines):
+                has_content[0] |= pending
+                pending = bool(content[-1] > content[newlines[-1]])
+            else:
+                pending = pending or bool(content[-1])
+            row_ends = newlines[has_content] + position
+            # Index (within this block) of the row end that closes the current shard
+            k = shard_row + shard_rows - rows - 1
+            while k < len(row_ends):
+                end = int(row_ends[k]) + 1
+                shards.append({'start': shard_start, 'end': end, 'row': shard_row, 'rows': shard_rows})
+                shard_start, shard_row = end, shard_row + shard_rows
+                k += shard_rows
+            rows += len(row_ends)
+            position += len(block)
+        remaining = rows - shard_row + pending
+        if remaining:
+            shards.append({'start': shard_start, 'end': position, 'row': shard_row, 'rows': remaining})
+    return header, shards
+
+
+def plan_row_shards(n_rows, shard_rows):
+    """Split n_rows of a columnar input into row ranges"""
+    return [{'start': start, 'end': min(start + shard_rows, n_rows), 'row': start,
+             'rows': min(shard_rows, n_rows - start)}
+            for start in range(0, n_rows, shard_rows)]
+
+
+class _ShardReader:
+    """Read-only binary stream over a header line plus bytes [start, end) of a file"""
+
+    def __init__(self, path, header, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._header = header
+        self._remaining = end - start
+
+    def read(self, size=-1):
+        if self._header:
+            header, self._header = self._header, b''
+            return header
+        if self._remaining <= 0:
+            return b''
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _init_worker(version, rows_done):
+    """Load the job's model version once per worker process"""
+    import model_registry
+    _shared['bundle'] = model_registry.load_bundle(version)
+    _shared['rows_done'] = rows_done
+
+
+def _columnar_chunks(cache_dir, columns, id_field, start, end, chunk_rows):
+    """(X, errors, ids) chunks of rows [start, end) of a columnar cache"""
+    from dataset_store import open_cache
+    from scoring import find_invalid_rows
+
+    arrays = open_cache(cache_dir, columns)
+    try:
+        id_column = open_cache(cache_dir, [id_field])[id_field] if id_field else None
+    except KeyError:
+        id_column = None
+    for chunk_start in range(start, end, chunk_rows):
+        chunk_end = min(chunk_start + chunk_rows, end)
+        X = np.column_stack([np.asarray(arrays[c][chunk_start:chunk_end], dtype=np.float64) for c in columns])
+        ids = None
+        if id_column is not None:
+            ids = np.asarray(id_column[chunk_start:chunk_end])
+            # The cache stores unknown columns as float64; give integer ids back as integers
+            if ids.dtype.kind == 'f' and np.array_equal(ids, np.trunc(ids)):
+                ids = ids.astype(np.int64)
+            ids = ids.tolist()
+        yield X, find_invalid_rows(X, columns, {}), ids
+
+
+def _count_progress(chunks):
+    """Pass chunks through, adding their rows to the shared progress counter"""
+    rows_done = _shared['rows_done']
+    for chunk in chunks:
+        yield chunk
+        with rows_done.get_lock():
+            rows_done.value += len(chunk[0])
+
+
+def score_shard(job, index):
+    """
+    Score one shard of job into its part file; returns the shard's stats
+
+    The part file is written under a temporary name and renamed into place,
+    so a part file that exists is always complete.
+    """
+    from scoring import iter_feature_chunks, score_chunks, predictions_from_proba
+
+    bundle = _shared['bundle']
+    shard = job['shards'][index]
+    source = job['input']
+    started = time.perf_counter()
+
+    if source['format'] == 'columnar':
+        stream = None
+        chunks = _columnar_chunks(source['path'], bundle.input_columns, job['id_field'],
+                                  shard['start'], shard['end'], job['chunk_rows'])
+    else:
+        stream = _ShardReader(source['path'], job['header'].encode('utf-8'), shard['start'], shard['end'])
+        chunks = iter_feature_chunks(stream, bundle.input_columns, source['format'], job['id_field'],
+                                     job['chunk_rows'])
+
+    # Count rows, errors and positives as chunks go by, without re-reading the output
+    stats = {'rows': 0, 'errors': 0, 'fake': 0}
+
+    def predict_proba(X):
+        proba = bundle.predict_proba(X)
+        stats['fake'] += int(np.sum(predictions_from_proba(proba, bundle.classes_) == 1))
+        return proba
+
+    def tally(chunks):
+        for X, errors, ids in chunks:
+            stats['rows'] += len(X)
+            stats['errors'] += len(errors)
+            yield X, errors, ids
+
+    path = os.path.join(job['output_dir'], part_name(index, job['output_format']))
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            for text in score_chunks(tally(_count_progress(chunks)), predict_proba, bundle.classes_,
+                                     job['output_format'], shard['row']):
+                out.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if stream is not None:
+            stream.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    stats['file'] = os.path.basename(path)
+    return index, stats
+
+
+def part_name(index, output_format):
+    return f"part-{index:05d}.{OUTPUT_EXTENSIONS[output_format]}"
+
+
+def detect_format(path):
+    """'columnar' for a dataset cache directory, else csv/ndjson from the extension"""
+    if os.path.isdir(path):
+        return 'columnar'
+    return 'csv' if path.endswith('.csv') else 'ndjson'
+
+
+def plan_job(input_path, output_dir, version, input_format=None, output_format='csv', id_field='id',
+             shard_rows=None, chunk_rows=None):
+    """Build a job manifest: input fingerprint, pinned model version and the shard plan"""
+    from dataset_store import open_cache
+
+    input_format = input_format or detect_format(input_path)
+    shard_rows = shard_rows or BULK_SHARD_ROWS
+    if input_format == 'columnar':
+        header = ''
+        arrays = open_cache(input_path)
+        shards = plan_row_shards(len(next(iter(arrays.values()))) if arrays else 0, shard_rows)
+    else:
+        header, shards = plan_text_shards(input_path, shard_rows, has_header=input_format == 'csv')
+        header = header.decode('utf-8')
+
+    return {
+        'format_version': JOB_FORMAT_VERSION,
+        'input': {'path': os.path.abspath(input_path), 'format': input_format,
+                  'signature': _input_signature(input_path)},
+        'output_dir': os.path.abspath(output_dir),
+        'output_format': output_format,
+        'model_version': version,
+        'id_field': id_field,
+        'shard_rows': shard_rows,
+        'chunk_rows': chunk_rows or BULK_CHUNK_ROWS,
+        'header': header,
+        'rows': int(sum(shard['rows'] for shard in shards)),
+        'shards': shards,
+        'completed': {},
+        'status': 'running',
+        'created_at': time.time(),
+        'finished_at': None
+    }
+
+
+def clear_job(output_dir):
+    """Remove a job's checkpoint and part files (nothing else in output_dir)"""
+    if not os.path.isdir(output_dir):
+        return
+    for name in os.listdir(output_dir):
+        if name.startswith(JOB_FILE) or name.startswith('part-'):
+            os.remove(os.path.join(output_dir, name))
+
+
+def load_job(output_dir):
+    """Return the job manifest in output_dir, or None"""
+    path = os.path.join(output_dir, JOB_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _check_resumable(job, input_path, input_format, output_format, id_field, shard_rows):
+    """Refuse to resume a checkpoint made for a different input or different options"""
+    if job.get('format_version') != JOB_FORMAT_VERSION:
+        return "it was written by an incompatible version"
+    if job['input']['signature'] != _input_signature(input_path):
+        return "the input has changed since it was written"
+    requested = {'format': input_format or detect_format(input_path), 'output_format': output_format,
+                 'id_field': id_field, 'shard_rows': shard_rows or job['shard_rows']}
+    recorded = {'format': job['input']['format'], 'output_format': job['output_format'],
+                'id_field': job['id_field'], 'shard_rows': job['shard_rows']}
+    changed = [name for name in requested if requested[name] != recorded[name]]
+    if changed:
+        return f"it was made with different options ({', '.join(changed)})"
+    return None
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def run_job(job, workers=None, progress_seconds=None, report=None):
+    """
+    Score every shard of job not yet completed, checkpointing each one
+
+    job is updated in place and saved to the output directory after each
+    finished shard. report(line) receives progress lines (rows done, rows/s
+    over this run, ETA). Returns the finished job manifest.
+    """
+    workers = workers or BULK_WORKERS or os.cpu_count() or 1
+    progress_seconds = progress_seconds or BULK_PROGRESS_SECONDS
+    report = report or (lambda line: logger.info(line))
+    job_path = os.path.join(job['output_dir'], JOB_FILE)
+    os.makedirs(job['output_dir'], exist_ok=True)
+    # Part files a killed run was still writing
+    for name in os.listdir(job['output_dir']):
+        if name.startswith('part-') and name.endswith('.tmp'):
+            os.remove(os.path.join(job['output_dir'], name))
+
+    pending = [i for i in range(len(job['shards'])) if str(i) not in job['completed']]
+    rows_before = sum(job['shards'][i]['rows'] for i in range(len(job['shards'])) if str(i) in job['completed'])
+    if rows_before:
+        report(f"Resuming: {len(job['completed'])}/{len(job['shards'])} shards "
+               f"({rows_before:,} rows) already scored")
+    _write_json_atomic(job_path, job)
+
+    context = multiprocessing.get_context()
+    rows_done = context.Value('q', 0)
+    started = time.perf_counter()
+
+    def progress_line():
+        done = rows_done.value
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(job['rows'] - rows_before - done, 0)
+        eta = _format_duration(remaining / rate) if rate > 0 else '?'
+        total = max(job['rows'], 1)
+        return (f"{len(job['completed'])}/{len(job['shards'])} shards, "
+                f"{rows_before + done:,}/{job['rows']:,} rows ({100 * (rows_before + done) / total:.1f}%), "
+                f"{rate:,.0f} rows/s, ETA {eta}")
+
+    def checkpoint(index, stats):
+        job['completed'][str(index)] = stats
+        _write_json_atomic(job_path, job)
+
+    n_workers = min(workers, len(pending)) or 1
+    if n_workers == 1:
+        # Small jobs and single-core machines: score in this process
+        _init_worker(job['model_version'], rows_done)
+        last_report = time.perf_counter()
+        for index in pending:
+            checkpoint(*score_shard(job, index))
+            if time.perf_counter() - last_report >= progress_seconds:
+                report(progress_line())
+                last_report = time.perf_counter()
+    else:
+        with ProcessPoolExecutor(n_workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(job['model_version'], rows_done)) as executor:
+            futures = {executor.submit(score_shard, job, index) for index in pending}
+            try:
+                while futures:
+                    finished, futures = wait(futures, timeout=progress_seconds, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        checkpoint(*future.result())
+                    report(progress_line())
+            except BaseException:
+                # Completed shards stay checkpointed; the next run picks up the rest
+                for future in futures:
+                    future.cancel()
+                raise
+
+    job['status'] = 'complete'
+    job['finished_at'] = time.time()
+    job['totals'] = {
+        'rows': sum(stats['rows'] for stats in job['completed'].values()),
+        'errors': sum(stats['errors'] for stats in job['completed'].values()),
+        'fake': sum(stats['fake'] for stats in job['completed'].values())
+    }
+    _write_json_atomic(job_path, job)
+    elapsed = time.perf_counter() - started
+    report(f"Done: {rows_done.value:,} rows scored in {elapsed:.1f} s "
+           f"({rows_done.value / max(elapsed, 1e-9):,.0f} rows/s) on {n_workers} worker(s)")
+    return job
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bulk_scoring', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV or NDJSON file, or a columnar dataset cache directory')
+    parser.add_argument('output_dir', help='Directory for the part files and the job checkpoint')
+    parser.add_argument('--input-format', choices=['csv', 'ndjson', 'columnar'],
+                        help='Input format (default: guessed from the path)')
+    parser.add_argument('--output-format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--workers', type=int, default=BULK_WORKERS, help='Worker processes (0 = all cores)')
+    parser.add_argument('--shard-rows', type=int, help=f'Rows per shard / part file (default {BULK_SHARD_ROWS})')
+    parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_ROWS, help='Rows scored per model call')
+    parser.add_argument('--id-field', default='id', help='Column echoed back with each result')
+    parser.add_argument('--model-version', help='Registered version to score with (default: the active one)')
+    parser.add_argument('--restart', action='store_true', help='Discard an existing checkpoint and start over')
+    parser.add_argument('--progress-seconds', type=float, default=BULK_PROGRESS_SECONDS,
+                        help='Seconds between progress lines')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    job = None if args.restart else load_job(args.output_dir)
+    if job is not None:
+        problem = _check_resumable(job, args.input, args.input_format, args.output_format, args.id_field,
+                                   args.shard_rows)
+        if problem:
+            print(f"Cannot resume the job in {args.output_dir}: {problem}. Use --restart to start over.",
+                  file=sys.stderr)
+            return 1
+        if job['status'] == 'complete':
+            print(f"{args.output_dir} already holds a complete job ({job['rows']:,} rows)", file=sys.stderr)
+            return 0
+        if args.model_version and args.model_version != job['model_version']:
+            print(f"The job in {args.output_dir} is pinned to model version {job['model_version']}. "
+                  f"Use --restart to score with another version.", file=sys.stderr)
+            return 1
+    else:
+        if args.restart:
+            clear_job(args.output_dir)
+        version = args.model_version
+        if version is not None:
+            import model_registry
+            try:
+                model_registry.read_manifest(version)
+            except KeyError as e:
+                print(e.args[0], file=sys.stderr)
+                return 1
+        else:
+            # Reuse the API's model loading so offline and online scoring match exactly
+            import api
+            if not api.load_model():
+                print("No trained model found. Start the API or call train_model() first.", file=sys.stderr)
+                return 1
+            version = api.bundle.version
+        job = plan_job(args.input, args.output_dir, version, args.input_format, args.output_format,
+                       args.id_field, args.shard_rows, args.chunk_size)
+        logger.info(f"Scoring {job['rows']:,} rows in {len(job['shards'])} shard(s) with model version {version}")
+
+    try:
+        job = run_job(job, args.workers, args.progress_seconds)
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun the same command to resume ({len(job['completed'])} shards saved)",
+              file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"Scoring failed: {e}. Completed shards are saved; rerun to resume.", file=sys.stderr)
+        return 1
+
+    totals = job['totals']
+    print(f"{totals['rows']:,} rows scored, {totals['fake']:,} predicted fake, {totals['errors']:,} invalid; "
+          f"results in {args.output_dir}/part-*.{OUTPUT_EXTENSIONS[job['output_format']]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Shared pytest fixtures
+Points every on-disk setting (registry, dataset cache, feedback, jobs) at a
+scratch directory before the API is imported, and trains one small model
+that the Flask test client serves
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+import pytest
+
+# Module-level settings are read at import time, so redirect them first
+_SANDBOX = tempfile.mkdtemp(prefix='fakeacct-tests-')
+os.environ.update({
+    'MODEL_REGISTRY_DIR': os.path.join(_SANDBOX, 'models'),
+    'DATASET_CACHE_DIR': os.path.join(_SANDBOX, 'dataset_cache'),
+    'FEEDBACK_PATH': os.path.join(_SANDBOX, 'feedback.csv'),
+    'MODEL_RELOAD_SECONDS': '0',
+    'PREDICTION_LOG_SAMPLE': '0',
+    'ADMISSION': '0',
+})
+
+DATASET_ROWS = 3000
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_SANDBOX, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    """A small synthetic dataset (DataFrame) and the CSV it was written to"""
+    import dataset_generator
+    df = dataset_generator.generate_fake_account_dataset(DATASET_ROWS, seed=7)
+    path = os.path.join(_SANDBOX, 'accounts.csv')
+    df.to_csv(path, index=False)
+    return df, path
+
+
+@pytest.fixture(scope='session')
+def api_module(dataset):
+    """The api module serving a model trained on the dataset fixture"""
+    logging.disable(logging.INFO)
+    import api
+    api.DATASET_PATH = dataset[1]
+    api.train_model()
+    return api
+
+
+@pytest.fixture
+def client(api_module):
+    return api_module.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def accounts(dataset, api_module):
+    """Raw input fields of the first 50 dataset rows, as request bodies"""
+    return dataset[0][api_module.input_columns].head(50).to_dict('records')
@@ -1,17 +1,51 @@
 """
 Dataset Generator for Fake Account Detection
-Creates a realistic synthetic dataset with features commonly used in fake account detection
+Creates a realistic synthetic dataset with features commonly used in fake account detection.
+Columns are drawn all at once with a seeded numpy Generator, and large datasets can be
+written to disk chunk by chunk, optionally in parallel across processes.
 """
 
+import os
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import random
-from datetime import datetime, timedelta
 
-def generate_fake_account_dataset(n_samples=10000):
+COLUMNS = [
+    'username_length', 'num_posts', 'num_followers', 'num_following',
+    'account_age_days', 'has_profile_picture', 'has_bio',
+    'engagement_ratio', 'is_verified', 'is_fake'
+]
+
+# Rows generated per chunk when writing straight to disk
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def _mixture(rng, mask, ranges, p):
+    """
+    Draw integers for the rows in mask from a mixture of uniform ranges
+
+    ranges is a list of [low, high) pairs picked with probabilities p, the
+    vectorized form of np.random.choice([randint(a, b), randint(c, d)], p=p).
+    """
+    n = int(mask.sum())
+    component = rng.choice(len(ranges), size=n, p=p)
+    lows = np.array([low for low, _ in ranges])[component]
+    highs = np.array([high for _, high in ranges])[component]
+    return rng.integers(lows, highs)
+
+
+def _bernoulli(rng, mask, p_one):
+    """Draw 0/1 values for the rows in mask with P(1) = p_one"""
+    return (rng.random(int(mask.sum())) < p_one).astype(np.int64)
+
+
+def generate_fake_account_dataset(n_samples=10000, seed=42):
     """
     Generate a synthetic dataset for fake account detection
-    
+
     Features:
     - username_length: Length of username
     - num_posts: Number of posts made by the account
@@ -23,118 +57,167 @@ def generate_fake_account_dataset(n_samples=10000):
     - engagement_ratio: Posts to followers ratio
     - is_verified: Boolean (0/1) for verification status
     - is_fake: Target variable (0=real, 1=fake)
+
+    seed may be an int or a np.random.SeedSequence (used for parallel chunks).
     """
-    
-    np.random.seed(42)  # For reproducible results
-    random.seed(42)
-    
-    data = []
-    
-    for i in range(n_samples):
-        # Decide if account is fake (30% fake accounts)
-        is_fake = np.random.choice([0, 1], p=[0.7, 0.3])
-        
-        if is_fake == 1:  # Fake account characteristics
-            # Fake accounts tend to have specific patterns
-            username_length = np.random.choice(
-                [np.random.randint(3, 8), np.random.randint(15, 30)], 
-                p=[0.3, 0.7]  # Many fake accounts have very long or very short usernames
-            )
-            
-            # Fake accounts often have low post counts
-            num_posts = np.random.choice(
-                [np.random.randint(0, 10), np.random.randint(10, 50)],
-                p=[0.8, 0.2]
-            )
-            
-            # Fake accounts often have suspicious follower patterns
-            num_followers = np.random.choice(
-                [np.random.randint(0, 100), np.random.randint(1000, 10000)],
-                p=[0.6, 0.4]  # Either very few or suspiciously many followers
-            )
-            
-            # Fake accounts often follow many accounts
-            num_following = np.random.randint(100, 5000)
-            
-            # Fake accounts are usually newer
-            account_age_days = np.random.choice(
-                [np.random.randint(1, 30), np.random.randint(30, 365)],
-                p=[0.7, 0.3]
-            )
-            
-            # Fake accounts less likely to have profile pictures and bios
-            has_profile_picture = np.random.choice([0, 1], p=[0.6, 0.4])
-            has_bio = np.random.choice([0, 1], p=[0.7, 0.3])
-            
-            # Fake accounts rarely verified
-            is_verified = np.random.choice([0, 1], p=[0.99, 0.01])
-            
-        else:  # Real account characteristics
-            # Real accounts have more natural username lengths
-            username_length = np.random.randint(5, 20)
-            
-            # Real accounts have more varied post counts
-            num_posts = np.random.choice(
-                [np.random.randint(0, 100), np.random.randint(100, 2000)],
-                p=[0.4, 0.6]
-            )
-            
-            # Real accounts have more natural follower counts
-            num_followers = np.random.choice([
-                np.random.randint(10, 500),      # Normal users
-                np.random.randint(500, 5000),    # Popular users
-                np.random.randint(5000, 50000)   # Very popular users
-            ], p=[0.7, 0.25, 0.05])
-            
-            # Real accounts follow reasonable numbers of people
-            num_following = np.random.randint(50, 1000)
-            
-            # Real accounts can be any age
-            account_age_days = np.random.randint(30, 3650)  # Up to 10 years
-            
-            # Real accounts more likely to have complete profiles
-            has_profile_picture = np.random.choice([0, 1], p=[0.2, 0.8])
-            has_bio = np.random.choice([0, 1], p=[0.3, 0.7])
-            
-            # Real accounts can be verified (small chance)
-            is_verified = np.random.choice([0, 1], p=[0.95, 0.05])
-        
-        # Calculate engagement ratio (posts per follower)
-        if num_followers == 0:
-            engagement_ratio = num_posts  # If no followers, ratio is just post count
-        else:
-            engagement_ratio = num_posts / num_followers
-        
-        # Add some noise to make data more realistic
-        engagement_ratio += np.random.normal(0, 0.01)
-        engagement_ratio = max(0, engagement_ratio)  # Ensure non-negative
-        
-        data.append({
-            'username_length': username_length,
-            'num_posts': num_posts,
-            'num_followers': num_followers,
-            'num_following': num_following,
-            'account_age_days': account_age_days,
-            'has_profile_picture': has_profile_picture,
-            'has_bio': has_bio,
-            'engagement_ratio': round(engagement_ratio, 4),
-            'is_verified': is_verified,
-            'is_fake': is_fake
-        })
-    
-    # Create DataFrame
-    df = pd.DataFrame(data)
-    
+    rng = np.random.default_rng(seed)  # For reproducible results
+
+    # Decide which accounts are fake (30% fake accounts)
+    is_fake = (rng.random(n_samples) < 0.3).astype(np.int64)
+    fake = is_fake == 1
+    real = ~fake
+
+    columns = {name: np.empty(n_samples, dtype=np.int64) for name in COLUMNS if name != 'engagement_ratio'}
+    columns['is_fake'] = is_fake
+
+    # Fake account characteristics
+    # Many fake accounts have very long or very short usernames
+    columns['username_length'][fake] = _mixture(rng, fake, [(3, 8), (15, 30)], [0.3, 0.7])
+    # Fake accounts often have low post counts
+    columns['num_posts'][fake] = _mixture(rng, fake, [(0, 10), (10, 50)], [0.8, 0.2])
+    # Either very few or suspiciously many followers
+    columns['num_followers'][fake] = _mixture(rng, fake, [(0, 100), (1000, 10000)], [0.6, 0.4])
+    # Fake accounts often follow many accounts
+    columns['num_following'][fake] = rng.integers(100, 5000, int(fake.sum()))
+    # Fake accounts are usually newer
+    columns['account_age_days'][fake] = _mixture(rng, fake, [(1, 30), (30, 365)], [0.7, 0.3])
+    # Less likely to have profile pictures and bios, rarely verified
+    columns['has_profile_picture'][fake] = _bernoulli(rng, fake, 0.4)
+    columns['has_bio'][fake] = _bernoulli(rng, fake, 0.3)
+    columns['is_verified'][fake] = _bernoulli(rng, fake, 0.01)
+
+    # Real account characteristics
+    # More natural username lengths
+    columns['username_length'][real] = rng.integers(5, 20, int(real.sum()))
+    # More varied post counts
+    columns['num_posts'][real] = _mixture(rng, real, [(0, 100), (100, 2000)], [0.4, 0.6])
+    # Normal, popular and very popular users
+    columns['num_followers'][real] = _mixture(rng, real, [(10, 500), (500, 5000), (5000, 50000)],
+                                              [0.7, 0.25, 0.05])
+    # Real accounts follow reasonable numbers of people
+    columns['num_following'][real] = rng.integers(50, 1000, int(real.sum()))
+    # Real accounts can be any age, up to 10 years
+    columns['account_age_days'][real] = rng.integers(30, 3650, int(real.sum()))
+    # More likely to have complete profiles, small chance of verification
+    columns['has_profile_picture'][real] = _bernoulli(rng, real, 0.8)
+    columns['has_bio'][real] = _bernoulli(rng, real, 0.7)
+    columns['is_verified'][real] = _bernoulli(rng, real, 0.05)
+
+    # Calculate engagement ratio (posts per follower); with no followers the
+    # ratio is just the post count
+    posts = columns['num_posts'].astype(np.float64)
+    followers = columns['num_followers']
+    engagement_ratio = np.divide(posts, followers, out=posts.copy(), where=followers != 0)
+
+    # Add some noise to make data more realistic, keeping it non-negative
+    engagement_ratio += rng.normal(0, 0.01, n_samples)
+    engagement_ratio = np.round(np.maximum(engagement_ratio, 0), 4)
+
     # Add some additional realistic variations
     # Some real accounts might have characteristics similar to fake ones
-    noise_indices = np.random.choice(df[df['is_fake'] == 0].index, size=int(0.1 * len(df[df['is_fake'] == 0])))
-    for idx in noise_indices:
-        if np.random.random() < 0.5:
-            df.loc[idx, 'num_posts'] = np.random.randint(0, 10)  # Real account with few posts
-        if np.random.random() < 0.3:
-            df.loc[idx, 'has_bio'] = 0  # Real account without bio
-    
-    return df
+    real_indices = np.flatnonzero(real)
+    noise_indices = rng.choice(real_indices, size=int(0.1 * len(real_indices))) if len(real_indices) else real_indices
+    few_posts = rng.random(len(noise_indices)) < 0.5
+    columns['num_posts'][noise_indices[few_posts]] = rng.integers(0, 10, int(few_posts.sum()))  # Real account with few posts
+    no_bio = rng.random(len(noise_indices)) < 0.3
+    columns['has_bio'][noise_indices[no_bio]] = 0  # Real account without bio
+
+    columns['engagement_ratio'] = engagement_ratio
+    return pd.DataFrame({name: columns[name] for name in COLUMNS})
+
+
+def _chunk_sizes(n_samples, chunk_rows):
+    """Split n_samples into chunk lengths of at most chunk_rows"""
+    return [min(chunk_rows, n_samples - start) for start in range(0, n_samples, chunk_rows)]
+
+
+def _generate_csv_chunk(args):
+    """Worker: generate one chunk and return it as CSV text without a header"""
+    n_rows, seed = args
+    return generate_fake_account_dataset(n_rows, seed=seed).to_csv(index=False, header=False)
+
+
+def _generate_frame_chunk(args):
+    """Worker: generate one chunk as a DataFrame"""
+    n_rows, seed = args
+    return generate_fake_account_dataset(n_rows, seed=seed)
+
+
+def _map_in_window(executor, fn, tasks, window):
+    """
+    Like executor.map, but with at most window tasks submitted at once
+
+    Results are yielded in task order; the next task is only submitted once
+    the oldest result has been taken, so finished chunks cannot pile up
+    while the writer falls behind.
+    """
+    tasks = iter(tasks)
+    pending = deque(executor.submit(fn, task) for task in itertools.islice(tasks, window))
+    while pending:
+        result = pending.popleft().result()
+        for task in itertools.islice(tasks, 1):
+            pending.append(executor.submit(fn, task))
+        yield result
+
+
+def generate_dataset_to_file(filename, n_samples, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42,
+                             file_format=None, n_workers=1):
+    """
+    Generate a large dataset chunk by chunk straight to disk
+
+    Each chunk gets its own independent stream spawned from seed, so the
+    output is reproducible for a given (seed, chunk_rows) whatever the number
+    of workers. At most n_workers chunks are in flight at a time, plus the
+    one being written, so memory stays bounded however large the file. file_format
+    is 'csv' or 'parquet' (needs pyarrow); by default it follows the extension.
+    Returns the number of rows written.
+    """
+    file_format = file_format or ('parquet' if filename.endswith('.parquet') else 'csv')
+    sizes = _chunk_sizes(n_samples, chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = list(zip(sizes, seeds))
+
+    if file_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        worker = _generate_frame_chunk
+    elif file_format == 'csv':
+        worker = _generate_csv_chunk
+    else:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+    tmp_filename = f"{filename}.partial"
+    written = 0
+    executor = ProcessPoolExecutor(n_workers) if n_workers > 1 else None
+    chunks = _map_in_window(executor, worker, tasks, n_workers) if executor else map(worker, tasks)
+
+    try:
+        if file_format == 'csv':
+            with open(tmp_filename, 'w', newline='') as f:
+                f.write(','.join(COLUMNS) + '\n')
+                for size, text in zip(sizes, chunks):
+                    f.write(text)
+                    written += size
+        else:
+            writer = None
+            for size, frame in zip(sizes, chunks):
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_filename, table.schema)
+                writer.write_table(table)
+                written += size
+            if writer is not None:
+                writer.close()
+    finally:
+        if executor:
+            executor.shutdown()
+
+    os.replace(tmp_filename, filename)
+    return written
+
 
 def save_dataset(df, filename='fake_accounts_dataset.csv'):
     """Save the dataset to a CSV file"""
@@ -144,19 +227,33 @@ def save_dataset(df, filename='fake_accounts_dataset.csv'):
     print(f"Fake accounts: {df['is_fake'].sum()} ({df['is_fake'].mean()*100:.1f}%)")
     print(f"Real accounts: {(1-df['is_fake']).sum()} ({(1-df['is_fake']).mean()*100:.1f}%)")
 
+
 if __name__ == "__main__":
-    # Generate dataset
-    print("Generating fake account detection dataset...")
-    dataset = generate_fake_account_dataset(10000)
-    
-    # Save dataset
-    save_dataset(dataset, 'fake_accounts_dataset.csv')
-    
-    # Display sample data
-    print("\nFirst 10 rows of the dataset:")
-    print(dataset.head(10))
-    
-    print("\nDataset statistics:")
-    print(dataset.describe())
+    parser = argparse.ArgumentParser(description="Generate a synthetic fake account detection dataset")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of accounts to generate")
+    parser.add_argument("--output", default="fake_accounts_dataset.csv", help="Output file (.csv or .parquet)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per chunk for large datasets")
+    parser.add_argument("--workers", type=int, default=1, help="Processes generating chunks in parallel")
+    args = parser.parse_args()
+
+    if args.rows <= args.chunk_rows and not args.output.endswith('.parquet'):
+        # Generate dataset
+        print("Generating fake account detection dataset...")
+        dataset = generate_fake_account_dataset(args.rows, seed=args.seed)
+
+        # Save dataset
+        save_dataset(dataset, args.output)
 
+        # Display sample data
+        print("\nFirst 10 rows of the dataset:")
+        print(dataset.head(10))
 
+        print("\nDataset statistics:")
+        print(dataset.describe())
+    else:
+        print(f"Generating {args.rows:,} accounts in chunks of {args.chunk_rows:,} "
+              f"with {args.workers} worker(s)...")
+        rows = generate_dataset_to_file(args.output, args.rows, args.chunk_rows, args.seed,
+                                        n_workers=args.workers)
+        print(f"Dataset saved to {args.output} ({rows:,} rows)")
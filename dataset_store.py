@@ -0,0 +1,262 @@
+"""
+Columnar Dataset Cache
+Converts the training CSV once into one .npy file per column with compact
+dtypes plus a JSON manifest, and serves the columns memory-mapped afterwards.
+Derived features (see feature_pipeline) are computed from the cached columns
+once and stored alongside them. Caches are keyed on the CSV's absolute path,
+size and mtime, so a changed CSV gets a fresh cache and files that share a
+name do not share one.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import numpy as np
+from feature_pipeline import FeaturePipeline, spec_key
+
+logger = logging.getLogger(__name__)
+
+# Root directory for cached datasets; one sub-directory per source CSV
+DATASET_CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', 'dataset_cache')
+
+# Set to 0 to always parse the CSV
+DATASET_CACHE_ENABLED = os.environ.get('DATASET_CACHE', '1') != '0'
+
+# Rows parsed per CSV chunk while building the cache
+BUILD_CHUNK_ROWS = 250000
+
+MANIFEST_FILE = 'manifest.json'
+DERIVED_DIR = 'derived'
+CACHE_FORMAT_VERSION = 1
+
+# Storage dtype of every known column; anything else is kept as float64
+COLUMN_DTYPES = {
+    'username_length': np.int32,
+    'num_posts': np.int32,
+    'num_followers': np.int32,
+    'num_following': np.int32,
+    'account_age_days': np.int32,
+    'has_profile_picture': np.uint8,
+    'has_bio': np.uint8,
+    'engagement_ratio': np.float32,
+    'is_verified': np.uint8,
+    'is_fake': np.uint8
+}
+
+
+def _cache_prefix(csv_path):
+    """Name shared by every cache of csv_path: its file name and a hash of its absolute path"""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    path_hash = hashlib.sha256(os.path.abspath(csv_path).encode()).hexdigest()[:12]
+    return f"{name}-{path_hash}-"
+
+
+def cache_dir_for(csv_path):
+    """Directory holding the cache of csv_path, keyed on its absolute path, size and mtime"""
+    stat = os.stat(csv_path)
+    contents_hash = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:8]
+    return os.path.join(DATASET_CACHE_DIR, _cache_prefix(csv_path) + contents_hash)
+
+
+def _remove_stale_caches(csv_path, cache_dir):
+    """Delete caches of earlier versions of csv_path, which can no longer be looked up"""
+    parent = os.path.dirname(os.path.abspath(cache_dir))
+    prefix = _cache_prefix(csv_path)
+    for name in os.listdir(parent):
+        if name.startswith(prefix) and name != os.path.basename(cache_dir):
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+
+def _source_signature(csv_path):
+    """Cheap fingerprint of the CSV: its absolute path, size and modification time"""
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _read_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def is_fresh(csv_path, cache_dir=None):
+    """True if a cache exists for csv_path and was built from its current contents"""
+    manifest = _read_manifest(cache_dir or cache_dir_for(csv_path))
+    return (manifest is not None
+            and manifest.get('format_version') == CACHE_FORMAT_VERSION
+            and manifest.get('source') == _source_signature(csv_path))
+
+
+def _count_rows(csv_path, block_bytes=1 << 24):
+    """Count data rows by counting newlines, without parsing anything"""
+    lines = 0
+    last = b'\n'
+    with open(csv_path, 'rb') as f:
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1  # No trailing newline after the last row
+    return max(lines - 1, 0)
+
+
+def _check_range(column, values, dtype):
+    """Refuse to store values that the compact dtype would silently corrupt"""
+    if not len(values) or np.issubdtype(dtype, np.floating):
+        return
+    if values.dtype.kind == 'f':
+        if np.isnan(values).any():
+            raise ValueError(f"Column {column} has missing values")
+        if not np.array_equal(values, np.trunc(values)):
+            raise ValueError(f"Column {column} has non-integer values")
+    info = np.iinfo(dtype)
+    if values.min() < info.min or values.max() > info.max:
+        raise ValueError(f"Column {column} does not fit in {np.dtype(dtype).name}")
+
+
+def build_cache(csv_path, cache_dir=None, chunk_rows=None):
+    """
+    Convert csv_path into per-column .npy files and return the cache directory
+
+    Rows are counted first so every column is written straight into a
+    preallocated .npy file chunk by chunk; memory stays at one CSV chunk.
+    The cache is assembled in a temporary directory and renamed into place.
+    """
+    import pandas as pd
+
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    chunk_rows = chunk_rows or BUILD_CHUNK_ROWS
+    source = _source_signature(csv_path)
+    n_rows = _count_rows(csv_path)
+
+    parent = os.path.dirname(os.path.abspath(cache_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        columns = list(pd.read_csv(csv_path, nrows=0).columns)
+        dtypes = {column: np.dtype(COLUMN_DTYPES.get(column, np.float64)) for column in columns}
+        # Parse floats straight to their storage type, as the CSV training path does
+        read_dtypes = {column: dtype for column, dtype in dtypes.items() if dtype.kind == 'f'}
+        arrays = {column: np.lib.format.open_memmap(os.path.join(tmp_dir, f"{column}.npy"), mode='w+',
+                                                    dtype=dtypes[column], shape=(n_rows,))
+                  for column in columns}
+
+        filled = 0
+        for chunk in pd.read_csv(csv_path, dtype=read_dtypes, chunksize=chunk_rows):
+            end = filled + len(chunk)
+            if end > n_rows:
+                raise ValueError(f"{csv_path} has more rows than its line count")
+            for column in columns:
+                values = chunk[column].to_numpy()
+                _check_range(column, values, dtypes[column])
+                arrays[column][filled:end] = values
+            filled = end
+
+        for array in arrays.values():
+            array.flush()
+        del arrays
+
+        # Blank lines are counted but not parsed; trim the files to the real length
+        if filled != n_rows:
+            for column in columns:
+                path = os.path.join(tmp_dir, f"{column}.npy")
+                trimmed = np.load(path)[:filled]
+                np.save(path, trimmed)
+
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'source': source,
+            'rows': filled,
+            'columns': {column: dtypes[column].name for column in columns}
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the new cache in; the old one (if any) is removed afterwards
+        old_dir = None
+        if os.path.exists(cache_dir):
+            old_dir = os.path.join(parent, f".old-{uuid.uuid4().hex}")
+            os.rename(cache_dir, old_dir)
+        os.rename(tmp_dir, cache_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.basename(cache_dir).startswith(_cache_prefix(csv_path)):
+            _remove_stale_caches(csv_path, cache_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Built columnar cache for {csv_path} ({filled:,} rows) in {cache_dir}")
+    return cache_dir
+
+
+def load_columns(csv_path, columns=None, mmap_mode='r', cache_dir=None):
+    """
+    Return {column: array} for csv_path, building or rebuilding the cache if needed
+
+    With mmap_mode='r' the arrays are read-only views of the cache files, so
+    nothing is read until a column is actually used.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    if not is_fresh(csv_path, cache_dir):
+        build_cache(csv_path, cache_dir)
+    return open_cache(cache_dir, columns, mmap_mode)
+
+
+def open_cache(cache_dir, columns=None, mmap_mode='r'):
+    """Return {column: array} from an existing cache directory, without checking its source"""
+    manifest = _read_manifest(cache_dir)
+    if manifest is None or manifest.get('format_version') != CACHE_FORMAT_VERSION:
+        raise ValueError(f"{cache_dir} is not a dataset cache")
+    columns = list(manifest['columns']) if columns is None else list(columns)
+    missing = [column for column in columns if column not in manifest['columns']]
+    if missing:
+        raise KeyError(f"Columns not in dataset: {', '.join(missing)}")
+    return {column: np.load(os.path.join(cache_dir, f"{column}.npy"), mmap_mode=mmap_mode)
+            for column in columns}
+
+
+def load_derived(csv_path, pipeline, mmap_mode='r', cache_dir=None, block_rows=None):
+    """
+    Return {name: array} of pipeline's derived features for csv_path
+
+    Each feature is computed from the cached input columns on first use,
+    block by block, and saved as float32 under derived/, keyed by its
+    declaration; later calls just map the file. A rebuilt cache starts
+    without derived files, so they never outlive the CSV they came from.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    block_rows = block_rows or BUILD_CHUNK_ROWS
+    derived_dir = os.path.join(cache_dir, DERIVED_DIR)
+    # Also rebuilds a stale cache (dropping its derived files) before anything is reused
+    columns = load_columns(csv_path, {c for _, _, inputs in pipeline.derived for c in inputs},
+                           cache_dir=cache_dir)
+
+    arrays = {}
+    for name, operation, inputs in pipeline.derived:
+        path = os.path.join(derived_dir, f"{spec_key(name, operation, inputs)}.npy")
+        if not os.path.exists(path):
+            step = FeaturePipeline([name], derived=[(name, operation, inputs)])
+            n_rows = len(columns[inputs[0]])
+            os.makedirs(derived_dir, exist_ok=True)
+            tmp_path = os.path.join(derived_dir, f".tmp-{uuid.uuid4().hex}.npy")
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(n_rows,))
+            for start in range(0, n_rows, block_rows):
+                block = {c: columns[c][start:start + block_rows] for c in inputs}
+                out[start:start + block_rows] = step.derive(block, dtype=np.float32)[name]
+            out.flush()
+            del out
+            os.replace(tmp_path, path)
+            logger.info(f"Cached derived feature {name} for {csv_path}")
+        arrays[name] = np.load(path, mmap_mode=mmap_mode)
+    return arrays
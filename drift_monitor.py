@@ -0,0 +1,305 @@
+"""
+Drift Monitoring
+Constant-memory sketches of live traffic compared against a reference profile
+captured at training time. Every model feature is binned on its training
+deciles and probability_fake on fixed-width bins; live rows are counted into
+a ring of time windows, and the PSI and KS distance of each histogram against
+the reference say when traffic no longer looks like the training data.
+Requests only append to a buffer; binning happens in vectorized flushes.
+"""
+
+import os
+import time
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Set to 0 to stop recording live traffic
+DRIFT_ENABLED = os.environ.get('DRIFT_MONITOR', '1') != '0'
+
+# Rolling windows: DRIFT_WINDOWS windows of DRIFT_WINDOW_SECONDS each are kept
+DRIFT_WINDOW_SECONDS = int(os.environ.get('DRIFT_WINDOW_SECONDS', '300'))
+DRIFT_WINDOWS = int(os.environ.get('DRIFT_WINDOWS', '12'))
+
+# Buffered observations binned per flush
+DRIFT_FLUSH_ROWS = int(os.environ.get('DRIFT_FLUSH_ROWS', '1000'))
+
+# Fewest live rows before a status is reported, and the PSI levels for 'warning' / 'drift'
+DRIFT_MIN_ROWS = int(os.environ.get('DRIFT_MIN_ROWS', '500'))
+DRIFT_PSI_WARNING = float(os.environ.get('DRIFT_PSI_WARNING', '0.1'))
+DRIFT_PSI_ALERT = float(os.environ.get('DRIFT_PSI_ALERT', '0.25'))
+
+# Start a background retrain when drift is detected (at most once per cooldown)
+DRIFT_RETRAIN = os.environ.get('DRIFT_RETRAIN', '0') == '1'
+DRIFT_RETRAIN_COOLDOWN = int(os.environ.get('DRIFT_RETRAIN_COOLDOWN', '3600'))
+
+# Reference profile: decile cut points per feature, equal-width probability bins
+PROFILE_QUANTILES = np.linspace(0.1, 0.9, 9)
+PROFILE_MAX_ROWS = 200000
+PROBABILITY_BINS = 10
+
+# Floor for empty bins, so PSI stays finite
+_EPSILON = 1e-4
+
+
+def _bin_probabilities(probability):
+    return np.minimum((np.asarray(probability, dtype=np.float64) * PROBABILITY_BINS).astype(np.intp),
+                      PROBABILITY_BINS - 1)
+
+
+def build_profile(X, feature_columns, probability=None, seed=0):
+    """
+    Reference profile of a training matrix (raw model columns)
+
+    Each feature gets its decile cut points and the fraction of rows in every
+    bin between them; probability (predicted P(fake) on held-out rows) gets a
+    fixed-width histogram. At most PROFILE_MAX_ROWS sampled rows are used.
+    """
+    X = np.asarray(X)
+    if len(X) > PROFILE_MAX_ROWS:
+        X = X[np.sort(np.random.default_rng(seed).choice(len(X), PROFILE_MAX_ROWS, replace=False))]
+
+    features = {}
+    for j, name in enumerate(feature_columns):
+        column = X[:, j].astype(np.float64)
+        cuts = np.unique(np.quantile(column, PROFILE_QUANTILES))
+        counts = np.bincount(np.searchsorted(cuts, column, side='right'), minlength=len(cuts) + 1)
+        features[name] = {
+            'cuts': cuts.tolist(),
+            'fractions': (counts / max(len(column), 1)).tolist(),
+            'mean': float(column.mean()) if len(column) else 0.0
+        }
+
+    profile = {'rows': int(len(X)), 'features': features, 'created_at': time.time()}
+    if probability is not None:
+        profile['probability_fake'] = probability_profile(probability)
+    return profile
+
+
+def probability_profile(probability):
+    """Fixed-width histogram (as fractions) and mean of predicted P(fake)"""
+    probability = np.asarray(probability, dtype=np.float64)
+    counts = np.bincount(_bin_probabilities(probability), minlength=PROBABILITY_BINS)
+    return {
+        'fractions': (counts / max(len(probability), 1)).tolist(),
+        'mean': float(probability.mean()) if len(probability) else 0.0
+    }
+
+
+def psi(expected, actual):
+    """Population stability index of two histograms given as fractions"""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), _EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), _EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov distance of two histograms, evaluated at the bin edges"""
+    return float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected)))) if len(expected) else 0.0
+
+
+def status_for(value):
+    """'ok', 'warning' or 'drift' for a PSI value"""
+    if value >= DRIFT_PSI_ALERT:
+        return 'drift'
+    return 'warning' if value >= DRIFT_PSI_WARNING else 'ok'
+
+
+class DriftMonitor:
+    """
+    Rolling histograms of live inputs and scores for the serving bundle
+
+    observe() and observe_batch() only append to a buffer under a short
+    lock. Once DRIFT_FLUSH_ROWS entries are waiting, a background thread
+    bins them all at once (one pipeline transform, one searchsorted per
+    feature), so no request pays for it. on_flush, if set, receives the
+    fresh report after every flush.
+    """
+
+    def __init__(self, window_seconds=None, n_windows=None, flush_rows=None, on_flush=None):
+        self.window_seconds = window_seconds or DRIFT_WINDOW_SECONDS
+        self.n_windows = n_windows or DRIFT_WINDOWS
+        self.flush_rows = flush_rows or DRIFT_FLUSH_ROWS
+        self.on_flush = on_flush
+        # _lock guards the windows; _pending_lock only the buffer (taken after _lock, never before)
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending = []
+        self._flush_requested = threading.Event()
+        self._flusher_pid = None
+        self._bundle = None
+        self._profile = None
+        self._start(None, None)
+
+    def _start(self, bundle, profile):
+        """Point at bundle and empty every window (call with the lock held)"""
+        self._bundle = bundle
+        self._profile = profile
+        with self._pending_lock:
+            self._pending = []
+        self._features = []
+        if profile is not None:
+            self._features = [(j, name, np.asarray(profile['features'][name]['cuts']))
+                              for j, name in enumerate(bundle.feature_columns) if name in profile['features']]
+        max_bins = max([len(cuts) + 1 for _, _, cuts in self._features] + [1])
+        self._counts = np.zeros((self.n_windows, len(self._features), max_bins), dtype=np.int64)
+        self._probability_counts = np.zeros((self.n_windows, PROBABILITY_BINS), dtype=np.int64)
+        self._window_ids = np.full(self.n_windows, -1, dtype=np.int64)
+
+    def reset(self, bundle):
+        """
+        Monitor bundle against its reference profile
+
+        Live windows are kept when the new bundle shares the old one's
+        profile and features (e.g. an incremental update), and dropped otherwise.
+        """
+        profile = bundle.reference_profile if bundle is not None else None
+        with self._lock:
+            if (self._bundle is not None and bundle is not None and profile == self._profile
+                    and bundle.feature_columns == self._bundle.feature_columns):
+                self._bundle = bundle
+                return
+            self._start(bundle, profile)
+
+    def observe(self, values, probability_fake):
+        """Record one scored account (raw input values)"""
+        with self._pending_lock:
+            self._pending.append((time.time(), values, probability_fake))
+            full = len(self._pending) >= self.flush_rows
+        if full:
+            self._request_flush()
+
+    def observe_batch(self, X, probability_fake):
+        """Record a scored batch (raw input matrix, P(fake) per row)"""
+        with self._pending_lock:
+            self._pending.append((time.time(), X, np.asarray(probability_fake)))
+            full = len(X) >= self.flush_rows or len(self._pending) >= self.flush_rows
+        if full:
+            self._request_flush()
+
+    def _request_flush(self):
+        """Wake the flush thread, starting it first in a new (e.g. forked worker) process"""
+        if self._flusher_pid != os.getpid():
+            with self._lock:
+                if self._flusher_pid != os.getpid():
+                    self._flusher_pid = os.getpid()
+                    threading.Thread(target=self._flush_loop, name='drift-flush', daemon=True).start()
+        self._flush_requested.set()
+
+    def _flush_loop(self):
+        while True:
+            self._flush_requested.wait()
+            self._flush_requested.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Drift flush failed: {e}")
+
+    def flush(self):
+        """Bin every buffered observation into its time window"""
+        with self._lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+            if not pending or self._profile is None:
+                return
+            times, blocks, probabilities = [], [], []
+            singles = [entry for entry in pending if not isinstance(entry[2], np.ndarray)]
+            if singles:
+                single_times, values, scores = zip(*singles)
+                times.append(np.array(single_times))
+                blocks.append(np.array(values, dtype=np.float64))
+                probabilities.append(np.array(scores, dtype=np.float64))
+            for observed_at, X, scores in pending:
+                if isinstance(scores, np.ndarray):
+                    times.append(np.full(len(scores), observed_at))
+                    blocks.append(np.asarray(X, dtype=np.float64))
+                    probabilities.append(scores)
+
+            X = self._bundle.pipeline.transform(np.concatenate(blocks))
+            probability = np.concatenate(probabilities)
+            window_ids = (np.concatenate(times) // self.window_seconds).astype(np.int64)
+            max_bins = self._counts.shape[2]
+            for window_id in np.unique(window_ids):
+                rows = window_ids == window_id
+                slot = int(window_id % self.n_windows)
+                if self._window_ids[slot] != window_id:
+                    if self._window_ids[slot] > window_id:
+                        continue  # Older than everything kept
+                    self._counts[slot] = 0
+                    self._probability_counts[slot] = 0
+                    self._window_ids[slot] = window_id
+                for k, (j, _, cuts) in enumerate(self._features):
+                    bins = np.searchsorted(cuts, X[rows, j], side='right')
+                    self._counts[slot, k] += np.bincount(bins, minlength=max_bins)[:max_bins]
+                self._probability_counts[slot] += np.bincount(_bin_probabilities(probability[rows]),
+                                                              minlength=PROBABILITY_BINS)
+
+        if self.on_flush is not None:
+            try:
+                self.on_flush(self.report(flush=False))
+            except Exception as e:
+                logger.error(f"Drift flush callback failed: {e}")
+
+    def report(self, windows=None, flush=True):
+        """PSI/KS of the last `windows` windows (default all) against the reference profile"""
+        if flush:
+            self.flush()
+        windows = min(windows or self.n_windows, self.n_windows)
+        with self._lock:
+            bundle = self._bundle
+            profile = self._profile
+            current_id = int(time.time() // self.window_seconds)
+            live = (self._window_ids > current_id - windows) & (self._window_ids >= 0)
+            counts = self._counts[live].sum(axis=0)
+            probability_counts = self._probability_counts[live].sum(axis=0)
+            features = list(self._features)
+
+        report = {
+            'version': bundle.version if bundle is not None else None,
+            'window_seconds': self.window_seconds,
+            'windows': windows,
+            'rows': int(probability_counts.sum()),
+            'status': 'no_reference',
+            'drifted_features': [],
+            'features': {}
+        }
+        if profile is None:
+            return report
+
+        rows = max(report['rows'], 1)
+        for k, (_, name, cuts) in enumerate(features):
+            reference = profile['features'][name]['fractions']
+            live_fractions = counts[k, :len(cuts) + 1] / rows
+            value = psi(reference, live_fractions)
+            report['features'][name] = {
+                'psi': round(value, 6),
+                'ks': round(ks(reference, live_fractions), 6),
+                'status': status_for(value)
+            }
+        if 'probability_fake' in profile:
+            reference = profile['probability_fake']['fractions']
+            live_fractions = probability_counts / rows
+            value = psi(reference, live_fractions)
+            centers = (np.arange(PROBABILITY_BINS) + 0.5) / PROBABILITY_BINS
+            report['probability_fake'] = {
+                'psi': round(value, 6),
+                'ks': round(ks(reference, live_fractions), 6),
+                'status': status_for(value),
+                'reference_mean': profile['probability_fake']['mean'],
+                'live_mean_approx': round(float(centers @ live_fractions), 6),
+                'reference_histogram': reference,
+                'live_histogram': [round(f, 6) for f in live_fractions.tolist()]
+            }
+
+        if report['rows'] < DRIFT_MIN_ROWS:
+            report['status'] = 'insufficient_data'
+            return report
+        report['drifted_features'] = [name for name, result in report['features'].items()
+                                      if result['status'] == 'drift']
+        statuses = [result['status'] for result in report['features'].values()]
+        if 'probability_fake' in report:
+            statuses.append(report['probability_fake']['status'])
+        report['status'] = 'drift' if 'drift' in statuses else 'warning' if 'warning' in statuses else 'ok'
+        return report
@@ -0,0 +1,64 @@
+"""
+JSON Encoding
+Uses orjson when it is installed (several times faster than the standard
+library for both encoding and decoding) and falls back to json otherwise,
+plus a Flask JSON provider built on the same choice
+"""
+
+import os
+import json
+import logging
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# 'auto' (orjson if installed), 'orjson' or 'std'
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto')
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if JSON_ENCODER == 'orjson' and orjson is None:
+    logger.warning("JSON_ENCODER=orjson but orjson is not installed; using the standard library")
+
+USE_ORJSON = orjson is not None and JSON_ENCODER != 'std'
+
+# numpy arrays/scalars serialize directly; int dict keys become strings as with json
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    return orjson.loads(data) if USE_ORJSON else json.loads(data)
+
+
+def dumps(obj):
+    """Encode obj as a compact JSON str"""
+    if USE_ORJSON:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skip the str round trip: orjson already produces the response bytes
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, option=_ORJSON_OPTIONS, default=self.default)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def install(app):
+    """Make jsonify and request.get_json use orjson when it is enabled"""
+    if USE_ORJSON:
+        app.json = OrjsonProvider(app)
+    return app
@@ -0,0 +1,112 @@
+"""
+Derived Feature Pipeline
+Declares the features the server derives from an account's raw counts
+(engagement, follower/following and posts-per-day ratios) instead of trusting
+client-supplied values. A FeaturePipeline compiles the declarations once for
+a model's feature order into a vectorized numpy transform; training, the
+dataset cache and every serving path run that same transform, so the model
+never sees features computed two different ways.
+"""
+
+import numpy as np
+
+# Raw fields clients send, in the order they are parsed and stored
+INPUT_COLUMNS = [
+    'username_length', 'num_posts', 'num_followers', 'num_following',
+    'account_age_days', 'has_profile_picture', 'has_bio', 'is_verified'
+]
+
+# Derived features: (name, operation, input columns)
+DERIVED_FEATURES = [
+    ('engagement_ratio', 'ratio', ('num_posts', 'num_followers')),
+    ('follower_following_ratio', 'ratio', ('num_followers', 'num_following')),
+    ('posts_per_day', 'ratio', ('num_posts', 'account_age_days')),
+]
+
+# Model columns for new training runs. The first nine are the original
+# feature order, so older versions' feature lists are a prefix of this one.
+FEATURE_COLUMNS = [
+    'username_length', 'num_posts', 'num_followers', 'num_following',
+    'account_age_days', 'has_profile_picture', 'has_bio',
+    'engagement_ratio', 'is_verified',
+    'follower_following_ratio', 'posts_per_day'
+]
+
+
+def _ratio(numerator, denominator, out):
+    """numerator / denominator, keeping the numerator where the denominator is 0 (as the generator does)"""
+    np.copyto(out, numerator)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+
+
+OPERATIONS = {
+    'ratio': _ratio,
+}
+
+
+class FeaturePipeline:
+    """
+    DERIVED_FEATURES compiled for a fixed model feature order
+
+    input_columns are the raw columns the model needs: its non-derived
+    features plus the inputs of its derived ones, in INPUT_COLUMNS order.
+    transform() maps an input matrix to the model matrix and derive() maps a
+    dict of input columns to the derived columns; both compute in float64
+    and run one vectorized numpy call per derived feature.
+    """
+
+    def __init__(self, feature_columns, derived=None):
+        self.feature_columns = list(feature_columns)
+        specs = {name: (operation, tuple(inputs)) for name, operation, inputs in
+                 (DERIVED_FEATURES if derived is None else derived)}
+        for name, (operation, _) in specs.items():
+            if operation not in OPERATIONS:
+                raise ValueError(f"Unknown operation {operation!r} for derived feature {name}")
+        self.derived = [(name,) + specs[name] for name in self.feature_columns if name in specs]
+
+        needed = [c for c in self.feature_columns if c not in specs]
+        needed += [c for _, _, inputs in self.derived for c in inputs]
+        ordered = [c for c in INPUT_COLUMNS if c in needed]
+        self.input_columns = ordered + [c for c in dict.fromkeys(needed) if c not in ordered]
+
+        index = {c: i for i, c in enumerate(self.input_columns)}
+        output = {c: i for i, c in enumerate(self.feature_columns)}
+        self._passthrough_out = [output[c] for c in self.feature_columns if c not in specs]
+        self._passthrough_in = [index[c] for c in self.feature_columns if c not in specs]
+        self._derived_steps = [(output[name], OPERATIONS[operation], [index[c] for c in inputs])
+                               for name, operation, inputs in self.derived]
+
+    @property
+    def derived_columns(self):
+        """Names of the derived model features"""
+        return [name for name, _, _ in self.derived]
+
+    def describe(self):
+        """JSON-friendly declarations of this pipeline's derived features (stored in manifests)"""
+        return [[name, operation, list(inputs)] for name, operation, inputs in self.derived]
+
+    def transform(self, X, dtype=np.float64):
+        """Map an (n, len(input_columns)) matrix onto the model's (n, len(feature_columns)) matrix"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        out = np.empty((X.shape[0], len(self.feature_columns)), dtype=np.float64)
+        out[:, self._passthrough_out] = X[:, self._passthrough_in]
+        for col, operation, inputs in self._derived_steps:
+            operation(*(X[:, i] for i in inputs), out=out[:, col])
+        return out if out.dtype == dtype else out.astype(dtype)
+
+    def derive(self, columns, dtype=np.float64):
+        """Compute every derived feature from a dict of input column arrays"""
+        derived = {}
+        for name, operation, inputs in self.derived:
+            values = [np.asarray(columns[c], dtype=np.float64) for c in inputs]
+            out = np.empty(len(values[0]), dtype=np.float64)
+            OPERATIONS[operation](*values, out=out)
+            derived[name] = out if out.dtype == dtype else out.astype(dtype)
+        return derived
+
+
+def spec_key(name, operation, inputs):
+    """Stable file-name-safe key of one derived feature declaration"""
+    return f"{name}.{operation}.{'-'.join(inputs)}"
@@ -0,0 +1,129 @@
+"""
+Labeled Feedback Store
+Append-only CSV of accounts whose true label became known after serving
+(feature columns, is_fake, received_at). Rows are only ever appended, so a
+byte offset is a stable cursor: each model version records the offset it has
+learned up to, and updates read just the rows after it.
+"""
+
+import io
+import os
+import time
+import logging
+import threading
+import numpy as np
+from scoring import get_validator
+
+logger = logging.getLogger(__name__)
+
+# Feedback file; created with a header on the first append
+FEEDBACK_PATH = os.environ.get('FEEDBACK_PATH', 'feedback.csv')
+
+_append_lock = threading.Lock()
+
+
+def _header(feature_columns, target):
+    return (','.join(list(feature_columns) + [target, 'received_at']) + '\n').encode()
+
+
+def data_start(path=None):
+    """Byte offset of the first data row (0 if the store does not exist yet)"""
+    path = path or FEEDBACK_PATH
+    try:
+        with open(path, 'rb') as f:
+            return len(f.readline())
+    except FileNotFoundError:
+        return 0
+
+
+def append(X, y, feature_columns, target='is_fake', path=None):
+    """
+    Append labeled rows (X: feature matrix, y: 0/1 labels) in a single write
+
+    The file is opened with O_APPEND and each batch is one os.write, so
+    concurrent writers (threads or worker processes) never interleave rows.
+    Returns the number of rows appended.
+    """
+    path = path or FEEDBACK_PATH
+    now = f"{time.time():.3f}"
+    lines = [','.join([repr(float(v)) for v in row] + [str(int(label)), now]) for row, label in zip(X, y)]
+    data = ('\n'.join(lines) + '\n').encode() if lines else b''
+
+    with _append_lock:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                data = _header(feature_columns, target) + data
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+    return len(lines)
+
+
+def read_since(offset=0, path=None, columns=None, target='is_fake'):
+    """
+    Read the complete rows written after byte offset
+
+    Returns (X float32, y uint8, received_at float64, end_offset, skipped).
+    Columns are matched to the file's header by name, so X holds columns
+    (default: every feature column, in file order) in that order whatever
+    order the file was written in. Rows that are malformed, incomplete or
+    fail the /predict feature rules are left out and counted in skipped, so
+    one bad row cannot sink an update. A row still being written (no
+    trailing newline yet) is left for the next read.
+    """
+    path = path or FEEDBACK_PATH
+    empty = (np.empty((0, len(columns or ())), np.float32), np.empty(0, np.uint8), np.empty(0), max(offset, 0), 0)
+    if not os.path.exists(path):
+        return empty
+
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start = max(offset, len(header))
+        f.seek(start)
+        data = f.read()
+    names = header.decode().strip().split(',')
+    if columns is None:
+        columns = [name for name in names if name not in (target, 'received_at')]
+    missing = [name for name in list(columns) + [target, 'received_at'] if name not in names]
+    if missing:
+        raise ValueError(f"Feedback file {path} has no column(s): {', '.join(missing)}")
+    data = data[:data.rfind(b'\n') + 1]
+    if not data:
+        return empty[:3] + (start, 0)
+
+    import pandas as pd
+    # Parse fields as text so a row with the wrong field count or a stray string is
+    # dropped on its own; anything that is not a number becomes NaN below
+    rows = sum(1 for line in data.split(b'\n') if line.strip())
+    table = pd.read_csv(io.BytesIO(data), header=None, names=names, dtype=str, index_col=False,
+                        on_bad_lines='skip')
+    values = table[list(columns) + [target, 'received_at']].apply(pd.to_numeric, errors='coerce')
+    values = values.to_numpy(np.float64)
+    X, y, received_at = values[:, :-2], values[:, -2], values[:, -1]
+
+    valid = np.isfinite(values).all(axis=1) & np.isin(y, (0, 1))
+    valid[list(get_validator(columns).validate_matrix(X))] = False
+    skipped = rows - int(valid.sum())
+    if skipped:
+        logger.warning(f"Skipped {skipped} malformed feedback row(s) in {path} after byte {start}")
+    return X[valid].astype(np.float32), y[valid].astype(np.uint8), received_at[valid], start + len(data), skipped
+
+
+def count_since(offset=0, path=None):
+    """Number of complete rows after byte offset, without parsing them"""
+    path = path or FEEDBACK_PATH
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        header_end = len(f.readline())
+        f.seek(max(offset, header_end))
+        count = 0
+        while True:
+            chunk = f.read(1 << 20)
+            if not chunk:
+                return count
+            count += chunk.count(b'\n')
@@ -0,0 +1,403 @@
+"""
+Compiled Forest Inference Engine
+Flattens a fitted RandomForestClassifier into contiguous numpy arrays and walks
+every tree for a whole batch at once, with the StandardScaler folded into the
+split thresholds so no separate transform step is needed. The arrays are saved
+as plain .npy files that load memory-mapped, so worker processes on one host
+share the same pages and serving never needs sklearn or a pickle.
+"""
+
+import os
+import json
+import numpy as np
+
+# Rows traversed per block; keeps the (trees x rows) index arrays cache-sized
+BLOCK_ROWS = 1024
+
+# Arrays persisted by CompiledForest.save, one .npy file each
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+METADATA_FILE = 'engine.json'
+
+# Storage dtypes CompiledForest keeps as-is (anything else is widened); the
+# narrow ones come from quantize()
+FEATURE_DTYPES = (np.uint8, np.uint16, np.int32, np.intp)
+THRESHOLD_DTYPES = (np.float16, np.float32, np.float64)
+INDEX_DTYPES = (np.int32, np.intp)
+VALUE_DTYPES = (np.uint8, np.float16, np.float32, np.float64)
+
+_SIGN_BIT = np.uint64(1 << 63)
+_ONE = np.uint64(1)
+_HALF_SIGN_BIT = np.uint16(1 << 15)
+
+
+def _ordered_keys(values):
+    """Map float64 values onto uint64 keys whose integer order matches float order"""
+    bits = values.view(np.uint64)
+    return np.where(bits & _SIGN_BIT, ~bits, bits | _SIGN_BIT)
+
+
+def _as_dtype(values, allowed, default):
+    """Keep an array's dtype if it is one of allowed, otherwise convert to default"""
+    array = np.asarray(values)
+    return array if array.dtype in [np.dtype(d) for d in allowed] else array.astype(default)
+
+
+def _half_keys(values):
+    """
+    Map float16 values onto uint16 keys with the same order
+
+    numpy compares float16 in software; the keys compare natively. -0.0 is
+    folded into +0.0 first so equal values get equal keys.
+    """
+    bits = (values + np.float16(0)).view(np.uint16)
+    return np.where(bits & _HALF_SIGN_BIT, ~bits, bits | _HALF_SIGN_BIT)
+
+
+def _round_up(values, dtype):
+    """
+    Round float64 values up to dtype (float32 or float16)
+
+    For any threshold t representable in dtype, round_up(x) > t exactly when
+    x > t, so a narrowed engine can compare in its threshold dtype without
+    widening every node it visits. Stepping to the next value up is one
+    integer increment of the bit pattern (a decrement for negatives).
+    """
+    with np.errstate(over='ignore'):
+        rounded = values.astype(dtype)
+    bits = rounded.view(np.int32 if rounded.itemsize == 4 else np.int16)
+    step = (rounded < values).astype(bits.dtype)
+    np.negative(step, out=step, where=bits < 0)
+    bits += step
+    return rounded
+
+
+def _keys_to_values(keys):
+    """Inverse of _ordered_keys"""
+    bits = np.where(keys & _SIGN_BIT, keys & ~_SIGN_BIT, ~keys)
+    return bits.view(np.float64)
+
+
+def fold_thresholds(thresholds, mean, scale):
+    """
+    Move split thresholds from scaled space into raw feature space
+
+    sklearn decides a split as float32((x - mean) / scale) <= t. That map is
+    monotonic in x, so the set of raw values going left is exactly
+    x <= T for the largest float64 T satisfying the condition. T is found by
+    a vectorized bisection over the float64 bit patterns, which makes the
+    folded comparison bit-identical to scaling first.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    def goes_left(x):
+        with np.errstate(over='ignore', invalid='ignore'):
+            return ((x - mean) / scale).astype(np.float32).astype(np.float64) <= thresholds
+
+    finite_max = np.finfo(np.float64).max
+    lo = np.broadcast_to(_ordered_keys(np.array([-finite_max])), thresholds.shape).copy()
+    hi = np.broadcast_to(_ordered_keys(np.array([finite_max])), thresholds.shape).copy()
+
+    # Nodes where even the largest finite value goes left never send anything right
+    always_left = goes_left(np.full(thresholds.shape, finite_max))
+    never_left = ~goes_left(np.full(thresholds.shape, -finite_max))
+
+    # Invariant: goes_left(lo) is True, goes_left(hi + 1) is False
+    while True:
+        active = lo < hi
+        if not active.any():
+            break
+        gap = hi - lo
+        mid = lo + (gap >> _ONE) + (gap & _ONE)
+        left = goes_left(_keys_to_values(mid))
+        lo = np.where(active & left, mid, lo)
+        hi = np.where(active & ~left, mid - _ONE, hi)
+
+    folded = _keys_to_values(lo)
+    folded = np.where(always_left, np.inf, folded)
+    return np.where(never_left, -np.inf, folded)
+
+
+class CompiledForest:
+    """
+    A RandomForestClassifier flattened into contiguous node arrays
+
+    All trees share one set of arrays; roots holds the index of each tree's
+    root node and children[node] the (left, right) pair. Leaves point to
+    themselves and carry an infinite threshold, so a fixed number of
+    vectorized steps walks every tree to its leaf.
+
+    Exported forests use float64/intp arrays and match sklearn bit for bit;
+    quantize() narrows them for a smaller (approximate) engine.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, classes):
+        self.feature = _as_dtype(feature, FEATURE_DTYPES, np.intp)
+        self.threshold = _as_dtype(threshold, THRESHOLD_DTYPES, np.float64)
+        self.children = _as_dtype(children, INDEX_DTYPES, np.intp)
+        self.value = _as_dtype(value, VALUE_DTYPES, np.float64)
+        self.roots = _as_dtype(roots, INDEX_DTYPES, np.intp)
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_trees = len(self.roots)
+        self.n_classes = self.value.shape[1]
+
+        # Children flattened so that 2 * node + go_right indexes the next node
+        self._children_flat = self.children.reshape(-1)
+        # float16 thresholds are compared through order-preserving integer keys
+        self._half = self.threshold.dtype == np.float16
+        self._threshold_cmp = _half_keys(self.threshold) if self._half else self.threshold
+        # Per-node path contribution tables for explain(), built on first use
+        self._contribution_tables = {}
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None):
+        """Export a fitted forest (and optionally its StandardScaler) into flat arrays"""
+        n_features = model.n_features_in_
+        mean = np.zeros(n_features)
+        scale = np.ones(n_features)
+        if scaler is not None:
+            if getattr(scaler, 'mean_', None) is not None:
+                mean = np.asarray(scaler.mean_, dtype=np.float64)
+            if getattr(scaler, 'scale_', None) is not None:
+                scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(offset, offset + n_nodes)
+
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.where(is_leaf, np.inf,
+                                 fold_thresholds(tree.threshold, mean[feature], scale[feature]))
+
+            features.append(feature)
+            thresholds.append(threshold)
+            children.append(np.column_stack([
+                np.where(is_leaf, node_ids, tree.children_left + offset),
+                np.where(is_leaf, node_ids, tree.children_right + offset)
+            ]))
+            # tree_.value already holds per-leaf class fractions, exactly what
+            # DecisionTreeClassifier.predict_proba returns
+            values.append(tree.value[:, 0, :model.n_classes_])
+            roots.append(offset)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children),
+            value=np.concatenate(values),
+            roots=roots,
+            max_depth=max_depth,
+            classes=model.classes_
+        )
+
+    @property
+    def quantized(self):
+        """True if thresholds or leaf values were stored at reduced precision"""
+        return self.threshold.dtype != np.float64 or self.value.dtype != np.float64
+
+    @property
+    def nbytes(self):
+        """Total size of the node arrays"""
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def quantize(self, threshold_dtype=np.float64, value_dtype=np.float64):
+        """
+        Return a copy with narrower arrays
+
+        Feature ids are narrowed losslessly; node indices stay intp, because
+        numpy converts narrower index arrays on every take(). Thresholds are
+        rounded to threshold_dtype (float32 or float16), and leaf class
+        fractions to value_dtype (float16, or uint8 storing round(p * 255)).
+        Probabilities are renormalized to sum to 1 after averaging.
+        """
+        n_features = int(self.feature.max()) + 1 if len(self.feature) else 1
+        feature_dtype = np.uint8 if n_features <= 1 << 8 else np.uint16 if n_features <= 1 << 16 else np.int32
+
+        value = self.value.astype(np.float64)
+        if np.dtype(value_dtype) == np.uint8:
+            value = np.rint(value * 255)
+        with np.errstate(over='ignore'):
+            threshold = self.threshold.astype(threshold_dtype)
+
+        return CompiledForest(
+            feature=self.feature.astype(feature_dtype),
+            threshold=threshold,
+            children=self.children,
+            value=value.astype(value_dtype),
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_
+        )
+
+    def save(self, directory):
+        """Write the node arrays as .npy files plus a small JSON header"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, METADATA_FILE), 'w') as f:
+            json.dump({'max_depth': self.max_depth, 'classes': self.classes_.tolist()}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Load arrays written by save()
+
+        With mmap_mode='r' nothing is copied: the arrays are views of the
+        files, paged in on first use and shared by every process on the host.
+        """
+        with open(os.path.join(directory, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ARRAY_NAMES}
+        return cls(max_depth=metadata['max_depth'], classes=metadata['classes'], **arrays)
+
+    def _walk(self, X):
+        """Return leaf indices for one block as a (n_trees, n_samples) array"""
+        n_samples = X.shape[0]
+        # Feature-major copy of X so a node's value lookup is feature * n + row
+        X_flat = np.ascontiguousarray(X.T).reshape(-1)
+        if self.threshold.dtype != np.float64:
+            X_flat = _round_up(X_flat, self.threshold.dtype.type)
+            if self._half:
+                X_flat = _half_keys(X_flat)
+        feature_offset = np.multiply(self.feature, n_samples, dtype=np.intp)
+        rows = np.tile(np.arange(n_samples), self.n_trees)
+        nodes = np.repeat(self.roots, n_samples)
+
+        for _ in range(self.max_depth):
+            index = feature_offset.take(nodes)
+            index += rows
+            go_right = X_flat.take(index) > self._threshold_cmp.take(nodes)
+            nodes *= 2
+            nodes += go_right
+            nodes = self._children_flat.take(nodes)
+
+        return nodes.reshape(self.n_trees, n_samples)
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_samples, n_trees)"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        blocks = [self._walk(X[start:start + BLOCK_ROWS]).T
+                  for start in range(0, X.shape[0], BLOCK_ROWS)]
+        return np.vstack(blocks) if blocks else np.empty((0, self.n_trees), dtype=np.intp)
+
+    def predict_proba(self, X):
+        """Average the leaf class fractions over all trees, in sklearn's order"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        proba = np.empty((X.shape[0], self.n_classes))
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            leaves = self._walk(X[start:start + BLOCK_ROWS])
+            self._sum_leaf_values(leaves, out=proba[start:start + leaves.shape[1]])
+        return self._normalize(proba)
+
+    def _sum_leaf_values(self, leaves, out):
+        """Sum the class fractions of one block's leaves over the trees into out"""
+        # add.accumulate over the tree axis reproduces RandomForestClassifier's
+        # running "+=" sum exactly; np.sum would use pairwise summation
+        leaf_values = self.value.take(leaves, axis=0)
+        if self.value.dtype == np.float64:
+            out[:] = np.add.accumulate(leaf_values, axis=0)[-1]
+        else:
+            out[:] = leaf_values.sum(axis=0, dtype=np.float64)
+
+    def _normalize(self, proba):
+        """Turn summed leaf values into probabilities, in place"""
+        if self.value.dtype == np.float64:
+            proba /= self.n_trees
+        else:
+            # Rounded leaf values no longer sum to exactly 1 per tree
+            proba /= np.maximum(proba.sum(axis=1, keepdims=True), np.finfo(np.float64).tiny)
+        return proba
+
+    def predict(self, X):
+        """Predict class labels from the averaged probabilities"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def _node_fractions(self, class_index):
+        """Class fraction of class_index at every node (leaf or internal), as float64"""
+        value = self.value.astype(np.float64)
+        if self.quantized:
+            value /= np.maximum(value.sum(axis=1, keepdims=True), np.finfo(np.float64).tiny)
+        return value[:, class_index]
+
+    def contribution_table(self, class_index=-1):
+        """
+        Per-node feature contributions along the path from the tree root
+
+        Row n holds, for every feature, the summed change in the class
+        fraction over the splits on that feature between the root and node n
+        (Saabas path decomposition). The root fraction plus a leaf's row is
+        that leaf's value, so explaining a row only needs its leaves. Built
+        one tree level at a time and cached per class.
+        """
+        class_index = range(self.n_classes)[class_index]
+        table = self._contribution_tables.get(class_index)
+        if table is not None:
+            return table
+
+        fraction = self._node_fractions(class_index)
+        n_nodes = len(fraction)
+        n_features = int(self.feature.max()) + 1 if n_nodes else 0
+        table = np.zeros((n_nodes, n_features))
+        nodes = np.asarray(self.roots, dtype=np.intp)
+        for _ in range(self.max_depth):
+            nodes = nodes[self.children[nodes, 0] != nodes]
+            if not len(nodes):
+                break
+            feature = self.feature.take(nodes).astype(np.intp)
+            for side in (0, 1):
+                child = self.children[nodes, side].astype(np.intp)
+                table[child] = table[nodes]
+                table[child, feature] += fraction.take(child) - fraction.take(nodes)
+            nodes = self.children[nodes].reshape(-1).astype(np.intp)
+
+        self._contribution_tables[class_index] = table
+        return table
+
+    def explain(self, X, class_index=-1):
+        """
+        Probabilities plus per-feature contributions to one class
+
+        Returns (proba, bias, contributions): bias is the forest's prior for
+        the class (mean root fraction) and contributions[i, j] how much
+        feature j moved row i away from it, so bias + contributions.sum(1)
+        equals proba[:, class_index] (to rounding; approximately for a
+        quantized engine). Costs one tree walk plus one table gather per
+        block, about the same as predict_proba.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        class_index = range(self.n_classes)[class_index]
+        table = self.contribution_table(class_index)
+
+        # One walk per block serves both the probabilities and the contributions
+        proba = np.empty((X.shape[0], self.n_classes))
+        contributions = np.zeros((X.shape[0], max(X.shape[1], table.shape[1])))
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            leaves = self._walk(X[start:start + BLOCK_ROWS])
+            end = start + leaves.shape[1]
+            self._sum_leaf_values(leaves, out=proba[start:end])
+            block = contributions[start:end, :table.shape[1]]
+            for tree_leaves in leaves:
+                block += table.take(tree_leaves, axis=0)
+        self._normalize(proba)
+        contributions /= self.n_trees
+
+        bias = float(self._node_fractions(class_index).take(self.roots).mean())
+        return proba, bias, contributions[:, :X.shape[1]]
@@ -0,0 +1,315 @@
+"""
+Hyperparameter Search for the Fake Account Forest
+Successive halving over random Random Forest configurations: every candidate
+is scored on a small slice of each cross-validation fold, and only the best
+1/eta move on to a slice eta times larger, so bad configurations are dropped
+after a few cheap fits. Folds are written once as .npy files and memory-mapped
+by a pool of worker processes. Candidates are ranked by a combined objective
+of accuracy and compiled-engine inference latency.
+
+    python hyperparameter_search.py --candidates 24 --workers 4 --register
+"""
+
+import os
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Random configurations drawn per search (the current defaults are always one of them)
+SEARCH_CANDIDATES = int(os.environ.get('SEARCH_CANDIDATES', '24'))
+
+# Cross-validation folds, and the factor by which each halving round cuts candidates
+SEARCH_FOLDS = int(os.environ.get('SEARCH_FOLDS', '3'))
+SEARCH_ETA = int(os.environ.get('SEARCH_ETA', '3'))
+
+# Worker processes evaluating candidates (0 = one per core)
+SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', '0'))
+
+# Accuracy given up per microsecond of per-row batch latency: objective = accuracy - weight * latency_us
+SEARCH_LATENCY_WEIGHT = float(os.environ.get('SEARCH_LATENCY_WEIGHT', '0.001'))
+
+# Rows the search itself works on (uniformly sampled above this); the winner is refit on everything
+SEARCH_MAX_ROWS = int(os.environ.get('SEARCH_MAX_ROWS', '100000'))
+
+# Smallest training slice used in the first round
+MIN_ROUND_ROWS = 500
+
+SEARCH_SPACE = {
+    'n_estimators': [10, 25, 50, 100, 200],
+    'max_depth': [4, 6, 8, 10, 14, None],
+    'min_samples_split': [2, 5, 10, 20],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'class_weight': [None, 'balanced', 'balanced_subsample'],
+}
+
+# Rows per latency measurement
+LATENCY_ROWS = 1000
+
+_shared = {}
+
+
+def sample_candidates(n_candidates, base_params, seed=42):
+    """Draw distinct configurations from SEARCH_SPACE; the first one is base_params"""
+    rng = np.random.default_rng(seed)
+    first = {name: base_params[name] for name in SEARCH_SPACE}
+    candidates = [first]
+    seen = {tuple(sorted(first.items(), key=str))}
+    attempts = 0
+    while len(candidates) < n_candidates and attempts < 100 * n_candidates:
+        attempts += 1
+        params = {name: values[rng.integers(len(values))] for name, values in SEARCH_SPACE.items()}
+        key = tuple(sorted(params.items(), key=str))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def write_folds(directory, X, y, n_folds, seed=42):
+    """
+    Write X, y and stratified fold indices as .npy files for the workers
+
+    Each fold's training indices are shuffled, so any prefix of them is a
+    uniform sample; halving rounds just read longer prefixes.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    np.save(os.path.join(directory, 'X.npy'), np.ascontiguousarray(X, dtype=np.float32))
+    np.save(os.path.join(directory, 'y.npy'), np.asarray(y))
+    rng = np.random.default_rng(seed)
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for fold, (train_idx, val_idx) in enumerate(splitter.split(np.zeros(len(y)), y)):
+        np.save(os.path.join(directory, f'train_{fold}.npy'), rng.permutation(train_idx))
+        np.save(os.path.join(directory, f'val_{fold}.npy'), val_idx)
+    return len(train_idx)
+
+
+def _init_worker(directory):
+    """Map the shared arrays once per worker process"""
+    _shared['directory'] = directory
+    _shared['X'] = np.load(os.path.join(directory, 'X.npy'), mmap_mode='r')
+    _shared['y'] = np.load(os.path.join(directory, 'y.npy'), mmap_mode='r')
+
+
+def _evaluate(task):
+    """Fit one candidate on a prefix of one fold; return accuracy, latency and fit time"""
+    import warnings
+    from sklearn.ensemble import RandomForestClassifier
+    from forest_engine import CompiledForest
+
+    candidate, fold, n_rows, seed = task
+    directory = _shared['directory']
+    train_idx = np.load(os.path.join(directory, f'train_{fold}.npy'), mmap_mode='r')[:n_rows]
+    val_idx = np.load(os.path.join(directory, f'val_{fold}.npy'), mmap_mode='r')
+    X, y = _shared['X'], _shared['y']
+
+    started = time.perf_counter()
+    model = RandomForestClassifier(n_jobs=1, random_state=seed, **candidate['params'])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - started
+
+    # Score and time with the compiled engine serving uses (no scaler: trees are scale-invariant)
+    engine = CompiledForest.from_sklearn(model)
+    X_val = np.asarray(X[val_idx], dtype=np.float64)
+    accuracy = float(np.mean(engine.predict(X_val) == y[val_idx]))
+    batch = X_val[:LATENCY_ROWS]
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        engine.predict_proba(batch)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'candidate': candidate['id'],
+        'fold': fold,
+        'accuracy': accuracy,
+        'latency_us': min(timings) / len(batch) * 1e6,
+        'fit_seconds': fit_seconds
+    }
+
+
+def successive_halving(directory, candidates, n_folds, n_train, eta, latency_weight, n_workers,
+                       seed=42, progress=None):
+    """
+    Run the halving rounds and return (ranked final-round results, per-round summaries)
+
+    Round i trains on n_train / eta^(rounds - 1 - i) rows of every fold; the
+    last round uses each fold's full training split.
+    """
+    progress = progress or (lambda fraction, stage: None)
+    n_rounds = 1
+    while len(candidates) // eta ** n_rounds >= 1 and n_train // eta ** n_rounds >= MIN_ROUND_ROWS:
+        n_rounds += 1
+
+    # Searches run on a thread of the multi-threaded API process; a forked child
+    # could inherit a lock another thread holds at that moment, so start clean
+    # interpreters instead (they only need the arrays in directory)
+    executor = ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(directory,)) \
+        if n_workers > 1 else None
+    if executor is None:
+        _init_worker(directory)
+
+    survivors = list(candidates)
+    rounds = []
+    total_tasks = sum(max(len(candidates) // eta ** i, 1) * n_folds for i in range(n_rounds))
+    done = 0
+    try:
+        for round_index in range(n_rounds):
+            n_rows = n_train // eta ** (n_rounds - 1 - round_index)
+            tasks = [(candidate, fold, n_rows, seed) for candidate in survivors for fold in range(n_folds)]
+            results = executor.map(_evaluate, tasks) if executor else map(_evaluate, tasks)
+
+            scores = {candidate['id']: [] for candidate in survivors}
+            for result in results:
+                scores[result['candidate']].append(result)
+                done += 1
+                progress(done / total_tasks, f"search round {round_index + 1}/{n_rounds} ({n_rows:,} rows)")
+
+            ranked = []
+            for candidate in survivors:
+                fold_results = scores[candidate['id']]
+                accuracy = float(np.mean([r['accuracy'] for r in fold_results]))
+                latency_us = float(np.median([r['latency_us'] for r in fold_results]))
+                ranked.append({
+                    'candidate': candidate['id'],
+                    'params': candidate['params'],
+                    'accuracy': round(accuracy, 6),
+                    'latency_us': round(latency_us, 3),
+                    'objective': round(accuracy - latency_weight * latency_us, 6),
+                    'fit_seconds': round(float(np.sum([r['fit_seconds'] for r in fold_results])), 3)
+                })
+            ranked.sort(key=lambda r: r['objective'], reverse=True)
+
+            keep = max(len(survivors) // eta, 1)
+            rounds.append({
+                'round': round_index + 1,
+                'train_rows': n_rows,
+                'candidates': len(survivors),
+                'kept': keep if round_index < n_rounds - 1 else 1,
+                'best': ranked[0]
+            })
+            logger.info(f"Search round {round_index + 1}: {len(survivors)} candidates on {n_rows:,} rows, "
+                        f"best objective {ranked[0]['objective']:.4f}")
+            by_id = {candidate['id']: candidate for candidate in survivors}
+            survivors = [by_id[r['candidate']] for r in ranked[:keep]]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return ranked, rounds
+
+
+def run_search(dataset_path, feature_columns, target='is_fake', n_candidates=None, n_folds=None, eta=None,
+               latency_weight=None, n_workers=None, max_rows=None, seed=42, progress=None):
+    """
+    Search RandomForest hyperparameters on a dataset
+
+    Returns a JSON-friendly report whose 'best_params' can be passed straight
+    to training.fit_model(rf_params=...).
+    """
+    from training import RF_PARAMS, load_dataset
+
+    n_candidates = n_candidates or SEARCH_CANDIDATES
+    n_folds = n_folds or SEARCH_FOLDS
+    eta = eta or SEARCH_ETA
+    latency_weight = SEARCH_LATENCY_WEIGHT if latency_weight is None else latency_weight
+    n_workers = n_workers or SEARCH_WORKERS or os.cpu_count()
+    max_rows = max_rows or SEARCH_MAX_ROWS
+    progress = progress or (lambda fraction, stage: None)
+    if n_folds < 2 or eta < 2:
+        raise ValueError("Search needs at least 2 folds and eta >= 2")
+    started = time.time()
+
+    # Load once, sample down to the search budget and share the folds through .npy files
+    progress(0.0, "loading data")
+    X, y, total_rows = load_dataset(dataset_path, feature_columns, target)
+    if len(X) > max_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(len(X), size=max_rows, replace=False))
+        X, y = X[rows], y[rows]
+
+    directory = tempfile.mkdtemp(prefix='search-')
+    try:
+        n_train = write_folds(directory, X, y, n_folds, seed)
+        del X
+        candidates = [{'id': i, 'params': params}
+                      for i, params in enumerate(sample_candidates(n_candidates, RF_PARAMS, seed))]
+        ranked, rounds = successive_halving(directory, candidates, n_folds, n_train, eta, latency_weight,
+                                            n_workers, seed, progress)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    best = ranked[0]
+    baseline = next((r for r in ranked if r['candidate'] == 0), None)
+    logger.info(f"Best configuration {best['params']}: accuracy {best['accuracy']:.4f}, "
+                f"{best['latency_us']:.2f} us/row")
+    return {
+        'best_params': best['params'],
+        'best': best,
+        'default_in_final_round': baseline,
+        'final_round': ranked,
+        'rounds': rounds,
+        'candidates': len(candidates),
+        'folds': n_folds,
+        'eta': eta,
+        'latency_weight': latency_weight,
+        'rows_searched': int(len(y)),
+        'rows_total': int(total_rows),
+        'workers': n_workers,
+        'search_seconds': round(time.time() - started, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default='fake_accounts_dataset.csv', help='Training CSV')
+    parser.add_argument('--candidates', type=int, default=SEARCH_CANDIDATES, help='Configurations to try')
+    parser.add_argument('--folds', type=int, default=SEARCH_FOLDS, help='Cross-validation folds')
+    parser.add_argument('--eta', type=int, default=SEARCH_ETA, help='Keep 1/eta of candidates per round')
+    parser.add_argument('--workers', type=int, default=SEARCH_WORKERS, help='Worker processes (0 = all cores)')
+    parser.add_argument('--latency-weight', type=float, default=SEARCH_LATENCY_WEIGHT,
+                        help='Accuracy traded per microsecond of per-row latency')
+    parser.add_argument('--max-rows', type=int, default=SEARCH_MAX_ROWS, help='Rows sampled for the search')
+    parser.add_argument('--register', action='store_true', help='Refit the winner on all rows and register it')
+    parser.add_argument('--activate', action='store_true', help='Also make the registered version active')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    from feature_pipeline import FEATURE_COLUMNS as feature_columns
+    report = run_search(args.dataset, feature_columns, n_candidates=args.candidates, n_folds=args.folds,
+                        eta=args.eta, latency_weight=args.latency_weight, n_workers=args.workers,
+                        max_rows=args.max_rows)
+
+    print(f"\n{'round':>5} {'rows':>9} {'candidates':>11} {'best accuracy':>14} {'us/row':>8} {'objective':>10}")
+    for summary in report['rounds']:
+        best = summary['best']
+        print(f"{summary['round']:>5} {summary['train_rows']:>9,} {summary['candidates']:>11} "
+              f"{best['accuracy']:>14.4f} {best['latency_us']:>8.2f} {best['objective']:>10.4f}")
+    print(f"\nBest parameters: {report['best_params']}")
+    print(f"Search took {report['search_seconds']:.1f} s on {report['workers']} worker(s)")
+
+    if args.register:
+        import model_registry
+        from training import fit_model
+        model, scaler, metrics = fit_model(args.dataset, feature_columns, rf_params=report['best_params'])
+        metrics['search'] = report
+        profile = metrics.pop('reference_profile', None)
+        version = model_registry.save_version(model, scaler, feature_columns, metrics, source='search',
+                                              parent=model_registry.get_active_version(), profile=profile)
+        if args.activate:
+            model_registry.set_active_version(version)
+        print(f"Registered {version} (accuracy {metrics['accuracy']:.4f})"
+              + (" and activated it" if args.activate else ""))
+
+
+if __name__ == '__main__':
+    main()
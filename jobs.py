@@ -0,0 +1,216 @@
+"""
+Background Job Runner
+Runs training jobs in the background so /train returns immediately, with
+progress that can be polled by job id. Job records live in a SQLite file next
+to the model registry, so every worker process sees the same jobs, and only
+one process at a time (whichever holds RUNNER_LOCK_FILE) runs them, one after
+another in submission order.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import importlib
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from model_registry import REGISTRY_DIR
+
+logger = logging.getLogger(__name__)
+
+# Shared job records and the lock file that elects the process running them
+JOBS_DB_PATH = os.environ.get('JOBS_DB_PATH', os.path.join(REGISTRY_DIR, 'jobs.sqlite'))
+RUNNER_LOCK_FILE = f"{JOBS_DB_PATH}.runner"
+
+# How often the runner looks for jobs queued by other processes
+RUNNER_POLL_SECONDS = 0.5
+
+# Finished jobs kept; older ones are deleted as new jobs are submitted
+JOBS_KEEP = 200
+
+FINISHED = ('succeeded', 'failed')
+_FIELDS = ('job_id', 'kind', 'status', 'progress', 'stage', 'submitted_at', 'started_at',
+           'finished_at', 'result', 'error')
+
+_local = threading.local()
+_runner_pid = None
+_runner_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _connect():
+    """One connection per thread, never reused across fork()"""
+    connection = getattr(_local, 'connection', None)
+    if connection is None or _local.pid != os.getpid():
+        os.makedirs(os.path.dirname(JOBS_DB_PATH) or '.', exist_ok=True)
+        connection = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, kind TEXT, target TEXT, params TEXT, status TEXT, progress REAL, "
+            "stage TEXT, submitted_at REAL, started_at REAL, finished_at REAL, result TEXT, error TEXT)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at)")
+        _local.connection = connection
+        _local.pid = os.getpid()
+    return connection
+
+
+def _to_json(value):
+    """JSON text for a job's params or result (numpy values become plain numbers)"""
+    return json.dumps(value, default=lambda obj: obj.tolist() if hasattr(obj, 'tolist') else str(obj))
+
+
+def _record(row):
+    job = dict(zip(_FIELDS, row))
+    job['result'] = json.loads(job['result']) if job['result'] is not None else None
+    return job
+
+
+def _update_job(job_id, **fields):
+    """Update columns of a job record"""
+    columns = ', '.join(f"{name} = ?" for name in fields)
+    _connect().execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+
+def _resolve(target):
+    """The function a job's 'module:qualname' target names"""
+    module_name, name = target.split(':')
+    module = sys.modules.get(module_name) or importlib.import_module(module_name)
+    return getattr(module, name)
+
+
+def _run_job(job_id, kind, target, params):
+    """Execute a claimed job and record its outcome"""
+    def progress(fraction, stage):
+        _update_job(job_id, progress=round(min(max(fraction, 0.0), 1.0), 4), stage=stage)
+
+    try:
+        result = _resolve(target)(progress=progress, **json.loads(params))
+        _update_job(job_id, status='succeeded', progress=1.0, stage='done',
+                    result=_to_json(result), finished_at=time.time())
+    except Exception as e:
+        logger.exception(f"Job {job_id} ({kind}) failed")
+        _update_job(job_id, status='failed', stage='failed', error=str(e), finished_at=time.time())
+
+
+def _claim_next():
+    """Mark the oldest queued job running and return (job_id, kind, target, params), or None"""
+    connection = _connect()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        row = connection.execute(
+            "SELECT job_id, kind, target, params FROM jobs WHERE status = 'queued' "
+            "ORDER BY submitted_at LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            connection.execute("UPDATE jobs SET status = 'running', stage = 'starting', started_at = ? "
+                               "WHERE job_id = ?", (time.time(), row[0]))
+    finally:
+        connection.execute("COMMIT")
+    return row
+
+
+def _become_runner():
+    """Block until this process holds the runner lock; returns the open lock file"""
+    if fcntl is None:
+        return None
+    os.makedirs(os.path.dirname(RUNNER_LOCK_FILE) or '.', exist_ok=True)
+    lock_file = open(RUNNER_LOCK_FILE, 'a')
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+
+def _runner_loop():
+    """Run queued jobs for as long as this process is alive, once it is the elected runner"""
+    lock_file = _become_runner()  # kept open, and so locked, until the process exits
+    # Only the lock holder runs jobs, so anything still 'running' lost its process
+    _connect().execute(
+        "UPDATE jobs SET status = 'failed', stage = 'failed', finished_at = ?, "
+        "error = 'Interrupted: the process running it exited' WHERE status = 'running'", (time.time(),)
+    )
+    logger.info(f"Process {os.getpid()} is running background jobs")
+    while True:
+        try:
+            claimed = _claim_next()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading the job queue: {e}")
+            claimed = None
+        if claimed is None:
+            _wakeup.wait(RUNNER_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+        _run_job(*claimed)
+
+
+def _ensure_runner():
+    """Start this process's runner thread (after fork, each worker starts its own)"""
+    global _runner_pid
+    with _runner_lock:
+        if _runner_pid == os.getpid():
+            return
+        _runner_pid = os.getpid()
+        threading.Thread(target=_runner_loop, name='training', daemon=True).start()
+
+
+def submit_job(fn, kind='train', **kwargs):
+    """
+    Queue fn(progress=..., **kwargs) for the background job runner
+
+    fn must be a module-level function and kwargs JSON-serializable, since
+    the job may run in another worker process. Returns the new job id;
+    fn's return value becomes the job's result.
+    """
+    _ensure_runner()
+    job_id = uuid.uuid4().hex[:12]
+    connection = _connect()
+    connection.execute(
+        "INSERT INTO jobs VALUES (?, ?, ?, ?, 'queued', 0.0, 'queued', ?, NULL, NULL, NULL, NULL)",
+        (job_id, kind, f"{fn.__module__}:{fn.__qualname__}", _to_json(kwargs), time.time())
+    )
+    connection.execute(
+        "DELETE FROM jobs WHERE job_id IN (SELECT job_id FROM jobs WHERE status IN ('succeeded', 'failed') "
+        "ORDER BY submitted_at DESC LIMIT -1 OFFSET ?)", (JOBS_KEEP,)
+    )
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id):
+    """Return a snapshot of a job record, or None if the id is unknown"""
+    _ensure_runner()
+    row = _connect().execute(f"SELECT {', '.join(_FIELDS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _record(row) if row else None
+
+
+def list_jobs():
+    """Return snapshots of all jobs, newest first"""
+    _ensure_runner()
+    rows = _connect().execute(f"SELECT {', '.join(_FIELDS)} FROM jobs ORDER BY submitted_at DESC").fetchall()
+    return [_record(row) for row in rows]
+
+
+def wait_for_job(job_id, timeout=None, poll_seconds=0.1):
+    """Block until a job finishes (or the timeout passes) and return its snapshot"""
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job['status'] in FINISHED:
+            return job
+        if deadline is not None and time.time() >= deadline:
+            return job
+        time.sleep(poll_seconds)
+
+
+def pending_jobs(kind=None):
+    """Number of jobs (of one kind, if given) queued or running in any process"""
+    query = "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+    if kind is None:
+        return _connect().execute(query).fetchone()[0]
+    return _connect().execute(f"{query} AND kind = ?", (kind,)).fetchone()[0]
@@ -0,0 +1,130 @@
+"""
+Micro-Batching Scheduler
+Queues concurrent single-account predictions and scores them together as one
+matrix, flushing when the batch is full or the oldest request has waited long
+enough. Each caller gets a concurrent.futures.Future for its own row, so it
+works with threaded servers (future.result()) and asyncio (asyncio.wrap_future).
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Set to 1 to route /predict through the micro-batcher
+MICROBATCH_ENABLED = os.environ.get('MICROBATCH', '0') == '1'
+
+# Flush once this many requests are queued...
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', '64'))
+
+# ...or once the oldest queued request has waited this long
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get('MICROBATCH_MAX_WAIT_MS', '2'))
+
+
+class MicroBatcher:
+    """
+    A single background thread that turns queued rows into batched predict_proba calls
+
+    Requests are grouped by the bundle they were submitted with, so a model
+    swap mid-batch never scores a row with a different version than its
+    request saw. The thread starts on first use and again after a fork, so it
+    is safe to create the batcher before a pre-forking server spawns workers.
+    """
+
+    def __init__(self, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_MAX_WAIT_MS):
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        # Optional callback(rows) after each flush, e.g. for metrics
+        self.on_batch = None
+
+    def _ensure_started(self):
+        """Start the flush thread in this process if it is not running"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                # Threads do not survive fork(); anything queued before it belongs to the parent
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, bundle, row):
+        """Queue one feature row for bundle and return a Future of its probability row"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((bundle, row, future))
+        return future
+
+    def predict_proba(self, bundle, row, timeout=None):
+        """Blocking helper: submit a row and wait for its probabilities"""
+        return self.submit(bundle, row).result(timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+
+            # One matrix per bundle, in arrival order
+            groups = {}
+            for bundle, row, future in batch:
+                groups.setdefault(id(bundle), (bundle, []))[1].append((row, future))
+
+            for bundle, items in groups.values():
+                # Skip callers that cancelled while queued
+                live = [(row, future) for row, future in items if future.set_running_or_notify_cancel()]
+                if not live:
+                    continue
+                rows = [row for row, _ in live]
+                futures = [future for _, future in live]
+                try:
+                    proba = bundle.predict_proba(np.array(rows, dtype=np.float64))
+                except Exception as e:
+                    logger.error(f"Micro-batch of {len(rows)} rows failed: {e}")
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+                for future, probability in zip(futures, proba):
+                    future.set_result(probability)
+
+            self.batches += 1
+            self.rows += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            if self.on_batch is not None:
+                self.on_batch(len(batch))
+
+    def stats(self):
+        """Counters and configuration, for /health"""
+        return {
+            'enabled': True,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'queued': self._queue.qsize()
+        }
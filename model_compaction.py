@@ -0,0 +1,240 @@
+"""
+Model Compaction
+Shrinks a trained forest for serving: drops trees whose marginal validation
+gain is smallest, narrows the compiled engine's thresholds and leaf values
+(float16/uint8) while accuracy stays within a tolerance, and optionally
+distills the forest into a much smaller student model. Every variant is
+measured for size, latency and accuracy so the training report shows the
+tradeoffs, and the best one within tolerance is the one deployed.
+sklearn is imported only when compaction actually runs.
+"""
+
+import os
+import copy
+import time
+import pickle
+import logging
+import numpy as np
+from forest_engine import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+# Run compaction after every training run ('1'), or only when /train asks for it
+COMPACTION_ENABLED = os.environ.get('MODEL_COMPACTION', '0') == '1'
+
+# Largest drop in validation accuracy (vs the full forest) a compact variant may cost
+COMPACTION_TOLERANCE = float(os.environ.get('COMPACTION_TOLERANCE', '0.002'))
+
+# Pruning never goes below this many trees
+COMPACTION_MIN_TREES = int(os.environ.get('COMPACTION_MIN_TREES', '10'))
+
+# Optional student model: '' (none), 'logistic' or 'gbdt'
+COMPACTION_DISTILL = os.environ.get('COMPACTION_DISTILL', '')
+
+# Held-out rows used for decisions and for the report (sampled above this)
+COMPACTION_MAX_ROWS = int(os.environ.get('COMPACTION_MAX_ROWS', '20000'))
+
+# Candidate (threshold, leaf value) storage, smallest first
+QUANTIZATION_LEVELS = [
+    ('float16', 'uint8'),
+    ('float32', 'uint8'),
+    ('float16', 'float16'),
+    ('float32', 'float16'),
+    ('float64', 'uint8'),
+    ('float64', 'float16'),
+]
+
+DISTILL_MODELS = ('logistic', 'gbdt')
+
+
+def _accuracy(proba, y, classes):
+    return float(np.mean(classes.take(np.argmax(proba, axis=-1)) == y))
+
+
+def prune_trees(tree_proba, y, classes, tolerance, min_trees):
+    """
+    Greedy backward elimination of trees on per-tree validation probabilities
+
+    tree_proba has shape (n_trees, n_rows, n_classes). At each step the tree
+    whose removal leaves the best accuracy (ties broken by Brier score) is
+    dropped, as long as accuracy stays within tolerance of the full forest.
+    Returns the sorted indices of the trees to keep.
+    """
+    n_trees = len(tree_proba)
+    onehot = (y[:, None] == classes[None, :]).astype(np.float64)
+    total = tree_proba.sum(axis=0)
+    floor = _accuracy(total, y, classes) - tolerance
+    keep = list(range(n_trees))
+
+    while len(keep) > min_trees:
+        # Ensemble sums with each remaining tree left out
+        without = total[None] - tree_proba[keep]
+        accuracy = (classes.take(np.argmax(without, axis=2)) == y[None]).mean(axis=1)
+        mean_proba = without / (len(keep) - 1)
+        brier = ((mean_proba - onehot[None]) ** 2).sum(axis=2).mean(axis=1)
+        best = np.lexsort((brier, -accuracy))[0]
+        if accuracy[best] < floor:
+            break
+        total = without[best]
+        del keep[best]
+
+    return keep
+
+
+def _subset_forest(model, keep):
+    """
+    Shallow copy of a fitted forest holding only the trees in keep
+
+    Per-row training weights (kept by sklearn for out-of-bag bookkeeping,
+    often larger than the pruned trees themselves) are dropped.
+    """
+    pruned = copy.copy(model)
+    pruned.estimators_ = [model.estimators_[i] for i in keep]
+    pruned.n_estimators = len(keep)
+    if getattr(pruned, '_sample_weight', None) is not None:
+        pruned._sample_weight = None
+    return pruned
+
+
+def _latency_us(predict, X, repeats=200):
+    """Median microseconds for one single-row call and per row of a 1000-row batch"""
+    row = X[:1]
+    batch = X[:1000]
+    predict(row)
+    single = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(row)
+        single.append(time.perf_counter() - start)
+    batch_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        predict(batch)
+        batch_times.append(time.perf_counter() - start)
+    return {
+        'single_row_us': round(float(np.median(single)) * 1e6, 1),
+        'batch_row_us': round(float(np.median(batch_times)) / len(batch) * 1e6, 3)
+    }
+
+
+def _describe(name, engine, model, scaler, X_val, y_val, X_hold, y_hold, classes, **extra):
+    """Size, latency and accuracy of one variant (scored by engine if given, else model)"""
+    if engine is not None:
+        predict = engine.predict_proba
+    else:
+        def predict(X):
+            return model.predict_proba(scaler.transform(X))
+    report = {
+        'variant': name,
+        'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        'engine_bytes': int(engine.nbytes) if engine is not None else None,
+        'validation_accuracy': round(_accuracy(predict(X_val), y_val, classes), 6),
+        'holdout_accuracy': round(_accuracy(predict(X_hold), y_hold, classes), 6),
+    }
+    report.update(_latency_us(predict, X_hold))
+    report.update(extra)
+    return report
+
+
+def _fit_student(kind, X_train, teacher_labels, seed):
+    """Fit a small student on the teacher's labels (features already scaled)"""
+    if kind == 'logistic':
+        from sklearn.linear_model import LogisticRegression
+        student = LogisticRegression(max_iter=1000)
+    else:
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        student = HistGradientBoostingClassifier(max_iter=50, max_depth=4, random_state=seed)
+    return student.fit(X_train, teacher_labels)
+
+
+def compact_model(model, scaler, X_heldout, y_heldout, X_train=None, tolerance=None,
+                  min_trees=None, distill=None, seed=42, progress=None):
+    """
+    Prune, quantize and (optionally) distill a fitted forest
+
+    X_heldout holds raw (unscaled) rows the forest never trained on; it is
+    split into a validation half, which drives every decision, and a holdout
+    half, which only feeds the report. X_train must be the scaled training
+    matrix when distilling. Returns (model, report): the model to deploy and
+    a JSON-friendly report whose 'quantization' entry (or None) tells
+    save_version how to store the compiled engine.
+    """
+    tolerance = COMPACTION_TOLERANCE if tolerance is None else tolerance
+    min_trees = COMPACTION_MIN_TREES if min_trees is None else min_trees
+    distill = COMPACTION_DISTILL if distill is None else distill
+    progress = progress or (lambda stage: None)
+    if distill and distill not in DISTILL_MODELS:
+        raise ValueError(f"distill must be one of {', '.join(DISTILL_MODELS)}")
+    if not hasattr(model, 'estimators_') or not hasattr(model.estimators_[0], 'tree_'):
+        raise ValueError(f"Compaction needs a fitted forest, got {type(model).__name__}")
+
+    from sklearn.model_selection import train_test_split
+
+    # Split the held-out rows into validation (decisions) and holdout (report)
+    X_heldout = np.asarray(X_heldout, dtype=np.float64)
+    y_heldout = np.asarray(y_heldout)
+    rng = np.random.default_rng(seed)
+    if len(X_heldout) > 2 * COMPACTION_MAX_ROWS:
+        rows = rng.choice(len(X_heldout), size=2 * COMPACTION_MAX_ROWS, replace=False)
+        X_heldout, y_heldout = X_heldout[rows], y_heldout[rows]
+    X_val, X_hold, y_val, y_hold = train_test_split(
+        X_heldout, y_heldout, test_size=0.5, random_state=seed, stratify=y_heldout
+    )
+    classes = np.asarray(model.classes_)
+    variants = []
+
+    # Full forest, served by the exact compiled engine
+    full_engine = CompiledForest.from_sklearn(model, scaler)
+    variants.append(_describe('full', full_engine, model, scaler, X_val, y_val, X_hold, y_hold, classes,
+                              n_trees=len(model.estimators_)))
+    floor = variants[0]['validation_accuracy'] - tolerance
+
+    # Prune: per-tree probabilities on the validation rows, then backward elimination
+    progress("pruning trees")
+    X_val_scaled = scaler.transform(X_val).astype(np.float32)
+    tree_proba = np.stack([tree.predict_proba(X_val_scaled) for tree in model.estimators_])
+    keep = prune_trees(tree_proba, y_val, classes, tolerance, min_trees)
+    pruned = _subset_forest(model, keep)
+    pruned_engine = CompiledForest.from_sklearn(pruned, scaler)
+    variants.append(_describe('pruned', pruned_engine, pruned, scaler, X_val, y_val, X_hold, y_hold, classes,
+                              n_trees=len(keep)))
+    logger.info(f"Pruned forest from {len(model.estimators_)} to {len(keep)} trees")
+
+    # Quantize: the smallest storage that keeps validation accuracy above the floor
+    progress("quantizing engine")
+    quantization = None
+    for threshold_dtype, value_dtype in QUANTIZATION_LEVELS:
+        engine = pruned_engine.quantize(threshold_dtype, value_dtype)
+        if _accuracy(engine.predict_proba(X_val), y_val, classes) >= floor:
+            quantization = {'threshold': threshold_dtype, 'value': value_dtype}
+            variants.append(_describe('quantized', engine, pruned, scaler, X_val, y_val, X_hold, y_hold,
+                                      classes, n_trees=len(keep), **quantization))
+            break
+    deployed = variants[-1]
+    result = pruned
+
+    # Distill: a student fitted on the teacher's labels replaces the forest if it is good enough
+    if distill:
+        progress(f"distilling into {distill}")
+        if X_train is None:
+            raise ValueError("Distillation needs the scaled training matrix")
+        teacher_labels = pruned.predict(X_train)
+        student = _fit_student(distill, X_train, teacher_labels, seed)
+        variants.append(_describe(f'distilled_{distill}', None, student, scaler, X_val, y_val, X_hold, y_hold,
+                                  classes))
+        if variants[-1]['validation_accuracy'] >= floor:
+            deployed = variants[-1]
+            result = student
+            quantization = None
+
+    report = {
+        'tolerance': tolerance,
+        'validation_rows': int(len(y_val)),
+        'holdout_rows': int(len(y_hold)),
+        'deployed': deployed['variant'],
+        'quantization': quantization,
+        'variants': variants
+    }
+    logger.info(f"Compaction deployed '{deployed['variant']}': "
+                f"{variants[0]['holdout_accuracy']:.4f} -> {deployed['holdout_accuracy']:.4f} holdout accuracy")
+    return result, report
@@ -0,0 +1,447 @@
+"""
+Versioned Model Registry
+Immutable artifact directories (model, scaler, feature list, metrics, compiled
+engine arrays) plus the ModelBundle that the API swaps in with a single
+reference assignment
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+import numpy as np
+from forest_engine import CompiledForest
+from feature_pipeline import FeaturePipeline
+
+logger = logging.getLogger(__name__)
+
+# Root directory of the registry; one sub-directory per version
+REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', 'models')
+
+# Inference backend, chosen at startup: 'compiled' (flattened forest arrays,
+# bit-identical to sklearn), 'sklearn' (scaler.transform + predict_proba) or
+# 'auto' (compiled up to COMPILED_MAX_ROWS rows, where sklearn's per-call
+# overhead dominates, sklearn's Cython traversal for larger batches)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'auto')
+COMPILED_MAX_ROWS = int(os.environ.get('COMPILED_MAX_ROWS', '1000'))
+
+# Pickles written by releases before the registry existed
+LEGACY_MODEL_PATH = 'fake_account_model.pkl'
+LEGACY_SCALER_PATH = 'scaler.pkl'
+
+MANIFEST_FILE = 'manifest.json'
+PROFILE_FILE = 'profile.json'
+ACTIVE_FILE = 'active.json'
+ENGINE_DIR = 'engine'
+
+# Serializes registry writes: a thread lock within the process plus an flock on
+# LOCK_FILE across worker processes (Windows has no fcntl, but serve.py runs a
+# single process there)
+LOCK_FILE = '.lock'
+_thread_lock = threading.Lock()
+
+
+class ModelBundle:
+    """
+    Everything needed to serve one model version
+
+    Bundles are never mutated after construction; the API replaces its
+    reference to the active bundle in one assignment, so a request always
+    sees a matching model, scaler and feature list.
+
+    When a bundle is loaded from the registry with a compiled engine, the
+    pickled model and scaler (and sklearn itself) are only loaded the first
+    time something actually needs them.
+    """
+
+    def __init__(self, version, model, scaler, feature_columns, metrics=None, created_at=None,
+                 engine=None, path=None, manifest=None):
+        self.version = version
+        self.feature_columns = list(feature_columns)
+        self.metrics = metrics or {}
+        self.created_at = created_at
+        self.path = path
+        self.manifest = manifest or {}
+        self._model = model
+        self._scaler = scaler
+        self._load_lock = threading.Lock()
+        self._explainer = None
+        self._profile = None
+        # Raw input columns -> model columns, as declared when the version was saved. Versions
+        # saved before declarations were recorded were trained on every feature as sent
+        self.pipeline = FeaturePipeline(self.feature_columns, derived=self.manifest.get('derived_features', []))
+        self.input_columns = self.pipeline.input_columns
+
+        if INFERENCE_BACKEND not in ('compiled', 'auto'):
+            engine = None
+        elif engine is None:
+            engine = self._build_engine()
+        self.engine = engine
+        self.classes_ = np.asarray(engine.classes_ if engine is not None else self.model.classes_)
+
+    def _build_engine(self):
+        """Compile the forest for the configured inference backend (None means plain sklearn)"""
+        model = self.model
+        if not hasattr(model, 'estimators_') or not hasattr(model.estimators_[0], 'tree_'):
+            logger.warning(f"Compiled backend does not support {type(model).__name__}, using sklearn")
+            return None
+        return CompiledForest.from_sklearn(model, self.scaler)
+
+    def _load_pickles(self):
+        """Unpickle the model and scaler on first use"""
+        with self._load_lock:
+            if self._model is None:
+                import joblib
+                logger.info(f"Loading pickled model for version {self.version}")
+                self._scaler = joblib.load(os.path.join(self.path, 'scaler.pkl'))
+                self._model = joblib.load(os.path.join(self.path, 'model.pkl'))
+
+    @property
+    def model(self):
+        """The fitted sklearn estimator (loaded lazily)"""
+        if self._model is None:
+            self._load_pickles()
+        return self._model
+
+    @property
+    def scaler(self):
+        """The fitted StandardScaler (loaded lazily)"""
+        if self._model is None:
+            self._load_pickles()
+        return self._scaler
+
+    @property
+    def reference_profile(self):
+        """Training data profile for drift monitoring, or None if the version has none"""
+        if self._profile is None and self.path is not None:
+            path = os.path.join(self.path, PROFILE_FILE)
+            self._profile = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    self._profile = json.load(f)
+        return self._profile or None
+
+    @property
+    def backend(self):
+        """
+        Backend actually serving this bundle: 'compiled', 'sklearn', or
+        'compiled+sklearn' when 'auto' splits batches by size
+        """
+        if self.engine is None:
+            return 'sklearn'
+        if INFERENCE_BACKEND == 'compiled' or self.engine.quantized:
+            return 'compiled'
+        return 'compiled+sklearn'
+
+    @property
+    def model_type(self):
+        """Estimator class name, without loading the pickle when the manifest has it"""
+        return self.manifest.get('model_type') or type(self.model).__name__
+
+    @property
+    def feature_importances(self):
+        """Global feature importances, or None if the model has none"""
+        if 'feature_importances' in self.manifest:
+            return self.manifest['feature_importances']
+        model = self.model
+        if hasattr(model, 'feature_importances_'):
+            return model.feature_importances_.tolist()
+        return None
+
+    @property
+    def model_params(self):
+        """Estimator hyperparameters, or None if unavailable"""
+        if 'model_params' in self.manifest:
+            return self.manifest['model_params']
+        model = self.model
+        return model.get_params() if hasattr(model, 'get_params') else None
+
+    def predict_proba(self, X, timer=None):
+        """
+        Derive, scale and score a whole matrix of raw input columns in a single pass
+
+        An optional StageTimer gets a 'features' mark after the derived
+        features are computed and a 'scale' mark after the separate scaling
+        step of the sklearn backend (the compiled engine has none). A
+        quantized engine serves every batch size, so results never depend on
+        which backend a request happened to hit.
+        """
+        X = self.pipeline.transform(X)
+        if timer is not None:
+            timer.mark('features')
+        if self.engine is not None and (INFERENCE_BACKEND == 'compiled' or self.engine.quantized
+                                        or len(X) <= COMPILED_MAX_ROWS):
+            return self.engine.predict_proba(X)
+        X_scaled = self.scaler.transform(X)
+        if timer is not None:
+            timer.mark('scale')
+        return self.model.predict_proba(X_scaled)
+
+    def explain(self, X, class_index=1):
+        """
+        Class probabilities plus per-feature contributions to class_index
+
+        X holds raw input columns; contributions are per model feature
+        (feature_columns, derived ones included). Returns (proba, bias,
+        contributions) from CompiledForest.explain. The serving engine
+        explains its own predictions; bundles served by plain sklearn compile
+        a full-precision engine for explanations on first use.
+        """
+        engine = self.engine
+        if engine is None:
+            engine = self._explainer
+            if engine is None:
+                model = self.model
+                if not hasattr(model, 'estimators_') or not hasattr(model.estimators_[0], 'tree_'):
+                    raise ValueError(f"Explanations are not supported for {type(model).__name__}")
+                engine = self._explainer = CompiledForest.from_sklearn(model, self.scaler)
+        return engine.explain(self.pipeline.transform(X), class_index)
+
+    def describe(self):
+        """JSON-friendly summary of the bundle"""
+        return {
+            'version': self.version,
+            'created_at': self.created_at,
+            'features': self.feature_columns,
+            'inputs': self.input_columns,
+            'metrics': self.metrics,
+            'inference_backend': self.backend
+        }
+
+
+@contextmanager
+def _registry_lock():
+    """Hold the registry lock across threads and worker processes"""
+    with _thread_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(REGISTRY_DIR, exist_ok=True)
+        with open(os.path.join(REGISTRY_DIR, LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _version_dir(version):
+    return os.path.join(REGISTRY_DIR, version)
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over path"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_active():
+    path = os.path.join(REGISTRY_DIR, ACTIVE_FILE)
+    if not os.path.exists(path):
+        return {'active': None, 'history': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_versions():
+    """Return the manifests of all registered versions, oldest first"""
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(REGISTRY_DIR)):
+        manifest_path = os.path.join(REGISTRY_DIR, name, MANIFEST_FILE)
+        if name.startswith('v') and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifests.append(json.load(f))
+    return manifests
+
+
+def active_mtime():
+    """Modification time of the active pointer (None if absent); changes on every activation"""
+    try:
+        return os.stat(os.path.join(REGISTRY_DIR, ACTIVE_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def get_active_version():
+    """Return the active version name, or None if nothing is active"""
+    return _read_active()['active']
+
+
+def _json_safe(params):
+    """Keep only JSON-serializable hyperparameter values"""
+    safe = {}
+    for key, value in params.items():
+        try:
+            json.dumps(value)
+            safe[key] = value
+        except TypeError:
+            safe[key] = repr(value)
+    return safe
+
+
+def save_version(model, scaler, feature_columns, metrics=None, source='train', parent=None,
+                 quantization=None, pipeline=None, profile=None):
+    """
+    Write a new immutable version and return its name
+
+    Artifacts are written into a temporary directory and renamed into place,
+    so readers never see a partially written version. Forests also get their
+    compiled engine arrays, which serving loads memory-mapped; quantization
+    ({'threshold': dtype, 'value': dtype}, from model compaction) stores
+    them at reduced precision. The derived feature declarations of pipeline
+    (default: the current ones) are recorded so the version is always served
+    with the transform it was trained with. profile is the training data's
+    reference profile for drift monitoring (drift_monitor.build_profile).
+    """
+    pipeline = pipeline or FeaturePipeline(feature_columns)
+    import joblib
+
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    tmp_dir = os.path.join(REGISTRY_DIR, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        joblib.dump(model, os.path.join(tmp_dir, 'model.pkl'))
+        joblib.dump(scaler, os.path.join(tmp_dir, 'scaler.pkl'))
+
+        has_engine = hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_')
+        if has_engine:
+            engine = CompiledForest.from_sklearn(model, scaler)
+            if quantization:
+                engine = engine.quantize(quantization['threshold'], quantization['value'])
+            engine.save(os.path.join(tmp_dir, ENGINE_DIR))
+        if profile is not None:
+            _write_json_atomic(os.path.join(tmp_dir, PROFILE_FILE), profile)
+
+        with _registry_lock():
+            existing = [m['version'] for m in list_versions()]
+            number = max([int(v[1:]) for v in existing] + [0]) + 1
+            # Another process may claim the same number; skip ahead until free
+            while os.path.exists(_version_dir(f"v{number:04d}")):
+                number += 1
+            version = f"v{number:04d}"
+            manifest = {
+                'version': version,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime()),
+                'source': source,
+                'parent': parent,
+                'model_type': type(model).__name__,
+                'feature_columns': list(feature_columns),
+                'derived_features': pipeline.describe(),
+                'classes': np.asarray(model.classes_).tolist(),
+                'has_engine': has_engine,
+                'quantization': quantization if has_engine else None,
+                'metrics': metrics or {}
+            }
+            if hasattr(model, 'feature_importances_'):
+                manifest['feature_importances'] = model.feature_importances_.tolist()
+            if hasattr(model, 'get_params'):
+                manifest['model_params'] = _json_safe(model.get_params())
+            _write_json_atomic(os.path.join(tmp_dir, MANIFEST_FILE), manifest)
+            os.rename(tmp_dir, _version_dir(version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Registered model version {version}")
+    return version
+
+
+def read_manifest(version):
+    """Return the manifest of a registered version"""
+    manifest_path = os.path.join(_version_dir(version), MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise KeyError(f"Unknown model version: {version}")
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def load_bundle(version, model=None, scaler=None):
+    """
+    Load a registered version into a ModelBundle
+
+    The compiled engine is memory-mapped when the version has one and the
+    backend uses it; the pickles are then left on disk until needed. An
+    in-memory model and scaler (e.g. straight from training) can be passed
+    to skip unpickling entirely.
+    """
+    manifest = read_manifest(version)
+    path = _version_dir(version)
+    engine_dir = os.path.join(path, ENGINE_DIR)
+
+    engine = None
+    if INFERENCE_BACKEND in ('compiled', 'auto') and os.path.exists(engine_dir):
+        engine = CompiledForest.load(engine_dir, mmap_mode='r')
+    elif model is None:
+        import joblib
+        model = joblib.load(os.path.join(path, 'model.pkl'))
+        scaler = joblib.load(os.path.join(path, 'scaler.pkl'))
+
+    return ModelBundle(version, model, scaler, manifest['feature_columns'],
+                       manifest.get('metrics'), manifest.get('created_at'),
+                       engine=engine, path=path, manifest=manifest)
+
+
+def set_active_version(version):
+    """Point the registry at version and record it in the activation history"""
+    read_manifest(version)
+
+    with _registry_lock():
+        state = _read_active()
+        if state['active'] != version:
+            state['history'] = (state['history'] + [version])[-50:]
+        state['active'] = version
+        _write_json_atomic(os.path.join(REGISTRY_DIR, ACTIVE_FILE), state)
+
+
+def previous_version():
+    """Return the version that was active before the current one, or None"""
+    history = _read_active()['history']
+    return history[-2] if len(history) >= 2 else None
+
+
+def rollback():
+    """
+    Re-activate the previously active version and return its name
+
+    The current version is dropped from the history so repeated rollbacks
+    keep walking backwards.
+    """
+    with _registry_lock():
+        state = _read_active()
+        if len(state['history']) < 2:
+            raise ValueError("No previous version to roll back to")
+        state['history'] = state['history'][:-1]
+        state['active'] = state['history'][-1]
+        _write_json_atomic(os.path.join(REGISTRY_DIR, ACTIVE_FILE), state)
+        return state['active']
+
+
+def import_legacy_model(feature_columns):
+    """Register the pre-registry pickles as a version, if present; return it or None"""
+    if not (os.path.exists(LEGACY_MODEL_PATH) and os.path.exists(LEGACY_SCALER_PATH)):
+        return None
+    import joblib
+    model = joblib.load(LEGACY_MODEL_PATH)
+    scaler = joblib.load(LEGACY_SCALER_PATH)
+    # Legacy models were trained on a prefix of the current feature order, with
+    # engagement_ratio taken from the CSV, so it is still taken from the client
+    feature_columns = list(feature_columns)[:getattr(model, 'n_features_in_', len(feature_columns))]
+    version = save_version(model, scaler, feature_columns, source='legacy',
+                           pipeline=FeaturePipeline(feature_columns, derived=[]))
+    set_active_version(version)
+    return version
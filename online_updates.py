@@ -0,0 +1,174 @@
+"""
+Incremental Forest Updates
+Refreshes a served forest from recent labeled feedback in seconds: a few new
+trees are grown on the feedback rows only and either appended to the forest
+or swapped in for the stalest trees (trees are kept oldest first). A rebuild
+policy decides when the accumulated drift calls for a full retrain instead.
+"""
+
+import os
+import copy
+import time
+import logging
+import warnings
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 'grow' (append trees), 'replace' (swap out the stalest) or 'auto' (grow up to UPDATE_MAX_TREES, then replace)
+UPDATE_MODE = os.environ.get('UPDATE_MODE', 'auto')
+
+# Trees grown per update, and the forest size 'auto' grows to before it starts replacing
+UPDATE_TREES = int(os.environ.get('UPDATE_TREES', '10'))
+UPDATE_MAX_TREES = int(os.environ.get('UPDATE_MAX_TREES', '150'))
+
+# Fewest new labeled rows worth an update
+UPDATE_MIN_ROWS = int(os.environ.get('UPDATE_MIN_ROWS', '50'))
+
+# Queue an update automatically once this many rows are pending (0 = only on request)
+FEEDBACK_UPDATE_ROWS = int(os.environ.get('FEEDBACK_UPDATE_ROWS', '0'))
+
+# Full rebuild policy: trigger when any of these is exceeded
+REBUILD_FEEDBACK_TREE_FRACTION = float(os.environ.get('REBUILD_FEEDBACK_TREE_FRACTION', '0.5'))
+REBUILD_FEEDBACK_ROW_FRACTION = float(os.environ.get('REBUILD_FEEDBACK_ROW_FRACTION', '0.25'))
+REBUILD_ACCURACY_DROP = float(os.environ.get('REBUILD_ACCURACY_DROP', '0.05'))
+
+# Largest holdout accuracy drop (against the current forest on the same rows)
+# an update may cause; a worse update is rejected and the current version kept
+UPDATE_ACCURACY_TOLERANCE = float(os.environ.get('UPDATE_ACCURACY_TOLERANCE', '0.01'))
+
+UPDATE_MODES = ('grow', 'replace', 'auto')
+
+# Share of the new rows held out to compare the forest before and after an update
+HOLDOUT_FRACTION = 0.2
+
+
+def is_forest(model):
+    return hasattr(model, 'estimators_') and len(model.estimators_) > 0 and hasattr(model.estimators_[0], 'tree_')
+
+
+def decide(metrics, model_type, total_trees, n_new, labels, recent_accuracy=None, n_trees=None,
+           force_rebuild=False):
+    """
+    Choose 'rebuild', 'update' or 'wait' for the active version
+
+    metrics are the active version's metrics (with its 'incremental' block,
+    if it was produced by updates), total_trees its forest size and
+    recent_accuracy its accuracy on the pending feedback. Returns (action, reason).
+    """
+    n_trees = n_trees or UPDATE_TREES
+    incremental = metrics.get('incremental', {})
+    base_accuracy = metrics.get('accuracy')
+    base_rows = metrics.get('rows_used')
+
+    if force_rebuild:
+        return 'rebuild', "full rebuild requested"
+    if model_type != 'RandomForestClassifier':
+        return 'rebuild', f"{model_type} cannot be updated incrementally"
+    if n_new < UPDATE_MIN_ROWS:
+        return 'wait', f"{n_new} new rows (need {UPDATE_MIN_ROWS})"
+    _, counts = np.unique(labels, return_counts=True)
+    if len(counts) < 2 or counts.min() < 2:
+        return 'wait', "new rows need at least 2 accounts of each label"
+
+    if recent_accuracy is not None and base_accuracy is not None \
+            and recent_accuracy < base_accuracy - REBUILD_ACCURACY_DROP:
+        return 'rebuild', (f"accuracy on new feedback {recent_accuracy:.3f} is more than "
+                           f"{REBUILD_ACCURACY_DROP} below the trained {base_accuracy:.3f}")
+    feedback_trees = incremental.get('feedback_trees', 0)
+    if total_trees and (feedback_trees + n_trees) / total_trees > REBUILD_FEEDBACK_TREE_FRACTION:
+        return 'rebuild', f"more than {REBUILD_FEEDBACK_TREE_FRACTION:.0%} of trees would come from feedback"
+    feedback_rows = incremental.get('feedback_rows', 0) + n_new
+    if base_rows and feedback_rows / base_rows > REBUILD_FEEDBACK_ROW_FRACTION:
+        return 'rebuild', (f"{feedback_rows:,} feedback rows since the last rebuild exceed "
+                           f"{REBUILD_FEEDBACK_ROW_FRACTION:.0%} of the {base_rows:,} training rows")
+    return 'update', f"{n_new} new rows"
+
+
+def update_forest(model, scaler, X_new, y_new, mode=None, n_trees=None, seed=None, tolerance=None):
+    """
+    Grow n_trees on the new rows and add them to a copy of model
+
+    X_new holds raw features; they are scaled with the version's scaler so
+    the new trees split in the same space as the old ones. Returns
+    (updated_model, info) where info compares accuracy before and after on a
+    held-out slice of the new rows; info['accepted'] is False when the
+    update loses more than tolerance of it.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+
+    mode = mode or UPDATE_MODE
+    n_trees = n_trees or UPDATE_TREES
+    tolerance = UPDATE_ACCURACY_TOLERANCE if tolerance is None else tolerance
+    if mode not in UPDATE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(UPDATE_MODES)}")
+    if not is_forest(model):
+        raise ValueError(f"Incremental updates need a random forest, got {type(model).__name__}")
+    if mode == 'auto':
+        mode = 'grow' if len(model.estimators_) + n_trees <= UPDATE_MAX_TREES else 'replace'
+    started = time.time()
+
+    X_scaled = scaler.transform(np.asarray(X_new, dtype=np.float64)).astype(np.float32)
+    y_new = np.asarray(y_new)
+    X_fit, X_hold, y_fit, y_hold = train_test_split(
+        X_scaled, y_new, test_size=HOLDOUT_FRACTION, random_state=seed, stratify=y_new
+    )
+
+    # Same tree settings as the existing forest, fitted on the recent rows only
+    params = {name: value for name, value in model.get_params().items()
+              if name not in ('n_estimators', 'warm_start', 'n_jobs', 'random_state')}
+    params['random_state'] = seed
+    fresh = RandomForestClassifier(n_estimators=n_trees, **params)
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='class_weight presets')
+        fresh.fit(X_fit, y_fit)
+    if not np.array_equal(fresh.classes_, model.classes_):
+        raise ValueError("New rows must contain every class the model predicts")
+
+    # Oldest trees come first, so replacing drops from the front
+    kept = model.estimators_[n_trees:] if mode == 'replace' else model.estimators_
+    updated = copy.copy(model)
+    updated.estimators_ = list(kept) + list(fresh.estimators_)
+    updated.n_estimators = len(updated.estimators_)
+    if getattr(updated, '_sample_weight', None) is not None:
+        # Per-row weights of the original training set no longer match the trees
+        updated._sample_weight = None
+
+    accuracy_before = float(np.mean(model.predict(X_hold) == y_hold))
+    accuracy_after = float(np.mean(updated.predict(X_hold) == y_hold))
+    accepted = accuracy_after >= accuracy_before - tolerance
+    logger.info(f"Incremental update ({mode}): {len(model.estimators_)} -> {len(updated.estimators_)} trees, "
+                f"recent accuracy {accuracy_before:.4f} -> {accuracy_after:.4f}"
+                f"{'' if accepted else ' (rejected)'}")
+    return updated, {
+        'accepted': accepted,
+        'mode': mode,
+        'trees_added': n_trees,
+        'trees_removed': n_trees if mode == 'replace' else 0,
+        'total_trees': len(updated.estimators_),
+        'rows': int(len(y_new)),
+        'holdout_rows': int(len(y_hold)),
+        'recent_accuracy_before': round(accuracy_before, 6),
+        'recent_accuracy_after': round(accuracy_after, 6),
+        'update_seconds': round(time.time() - started, 3)
+    }
+
+
+def incremental_metrics(base_metrics, info, parent, feedback_offset):
+    """Metrics for a version produced by an update: the base training numbers plus running totals"""
+    previous = base_metrics.get('incremental', {})
+    feedback_trees = previous.get('feedback_trees', 0) + info['trees_added']
+    # Replaced trees are the stalest, i.e. base trees until every base tree is gone
+    feedback_trees = min(feedback_trees, info['total_trees'])
+    metrics = {key: base_metrics[key] for key in ('accuracy', 'rows_total', 'rows_used', 'n_train', 'n_test')
+               if key in base_metrics}
+    metrics['incremental'] = dict(info, **{
+        'parent': parent,
+        'base_version': previous.get('base_version', parent),
+        'updates': previous.get('updates', 0) + 1,
+        'feedback_trees': feedback_trees,
+        'feedback_rows': previous.get('feedback_rows', 0) + info['rows']
+    })
+    metrics['feedback_offset'] = feedback_offset
+    return metrics
@@ -0,0 +1,219 @@
+"""
+Prediction Result Cache
+Remembers class probabilities per (model version, feature vector) so repeat
+lookups of the same account skip the forest. In-process LRU with optional TTL,
+or an SQLite file shared by every worker process on the host.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Maximum cached predictions (0 disables the cache)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+
+# Seconds an entry stays valid (0 = until evicted or the model changes)
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', '0'))
+
+# 'memory' (per process) or 'sqlite' (shared through PREDICTION_CACHE_PATH)
+PREDICTION_CACHE_BACKEND = os.environ.get('PREDICTION_CACHE_BACKEND', 'memory')
+PREDICTION_CACHE_PATH = os.environ.get('PREDICTION_CACHE_PATH', 'prediction_cache.sqlite')
+
+
+def feature_key(values):
+    """
+    Canonical form of a feature vector
+
+    Every value becomes a float, so 1, 1.0 and True map to the same key, just
+    as they produce the same model input.
+    """
+    return tuple(float(value) + 0.0 for value in values)  # + 0.0 turns -0.0 into 0.0
+
+
+class PredictionCache:
+    """Thread-safe in-process LRU of probability rows with optional TTL"""
+
+    backend = 'memory'
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl_seconds=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # (version, key) -> (stored_at, probabilities)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, version, key):
+        """Return the cached probabilities, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[(version, key)]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, version, key, probabilities):
+        """Store probabilities, evicting the least recently used entries past the size limit"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[(version, key)] = (time.monotonic(), tuple(probabilities))
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, keep_version=None):
+        """Drop every entry not belonging to keep_version"""
+        with self._lock:
+            if keep_version is None:
+                self._entries.clear()
+            else:
+                for cache_key in [k for k in self._entries if k[0] != keep_version]:
+                    del self._entries[cache_key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters and configuration, for /health"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'enabled': self.enabled,
+            'size': len(self),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SQLitePredictionCache(PredictionCache):
+    """
+    The same cache kept in an SQLite file, so worker processes share hits
+
+    Recency is tracked per row; eviction trims the oldest rows in batches
+    once the table grows past max_entries. Counters are per process.
+    """
+
+    backend = 'sqlite'
+
+    # Extra rows tolerated before a trim, so eviction is not a query per put
+    EVICTION_SLACK = 0.1
+
+    def __init__(self, path=PREDICTION_CACHE_PATH, max_entries=PREDICTION_CACHE_SIZE,
+                 ttl_seconds=PREDICTION_CACHE_TTL):
+        super().__init__(max_entries, ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        self._puts = 0
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "version TEXT, key TEXT, probabilities TEXT, stored_at REAL, used_at REAL, "
+                "PRIMARY KEY (version, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used_at)")
+
+    def _connect(self):
+        """One connection per thread, never reused across fork()"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _key_text(key):
+        return ','.join(repr(value) for value in key)
+
+    def get(self, version, key):
+        now = time.time()
+        connection = self._connect()
+        key_text = self._key_text(key)
+        row = connection.execute(
+            "SELECT probabilities, stored_at FROM predictions WHERE version = ? AND key = ?",
+            (version, key_text)
+        ).fetchone()
+        with self._lock:
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM predictions WHERE version = ? AND key = ?", (version, key_text))
+                self.expirations += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        connection.execute("UPDATE predictions SET used_at = ? WHERE version = ? AND key = ?",
+                           (now, version, key_text))
+        return tuple(float(value) for value in row[0].split(','))
+
+    def put(self, version, key, probabilities):
+        if not self.enabled:
+            return
+        now = time.time()
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+            (version, self._key_text(key), ','.join(repr(float(p)) for p in probabilities), now, now)
+        )
+        with self._lock:
+            self._puts += 1
+            check = self._puts % max(int(self.max_entries * self.EVICTION_SLACK), 1) == 0
+        if check:
+            self._trim(connection)
+
+    def _trim(self, connection):
+        """Delete the least recently used rows beyond max_entries"""
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM predictions WHERE rowid IN "
+                "(SELECT rowid FROM predictions ORDER BY used_at LIMIT ?)", (excess,)
+            )
+            with self._lock:
+                self.evictions += excess
+
+    def invalidate(self, keep_version=None):
+        connection = self._connect()
+        if keep_version is None:
+            connection.execute("DELETE FROM predictions")
+        else:
+            connection.execute("DELETE FROM predictions WHERE version != ?", (keep_version,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+def create_cache():
+    """Build the cache configured through the environment"""
+    if PREDICTION_CACHE_BACKEND == 'sqlite' and PREDICTION_CACHE_SIZE > 0:
+        try:
+            return SQLitePredictionCache()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite prediction cache unavailable ({e}); using the in-process cache")
+    return PredictionCache()
@@ -0,0 +1,35 @@
+"""
+Request Stage Timing
+Per-request latency breakdown (parse, validate, predict, serialize, log, ...)
+reported through the standard Server-Timing response header
+"""
+
+import os
+import time
+
+# Set to 0 to stop adding Server-Timing headers
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+
+
+class StageTimer:
+    """Charges the wall time of one request to named stages, in order"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.stages = {}
+
+    def mark(self, stage):
+        """Close the current stage: everything since the previous mark counts as stage"""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self):
+        """Server-Timing header value, e.g. 'parse;dur=0.041, predict;dur=0.102, total;dur=0.3'"""
+        parts = [f"{stage};dur={ms:.3f}" for stage, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.3f}")
+        return ', '.join(parts)
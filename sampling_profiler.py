@@ -0,0 +1,79 @@
+"""
+Sampling Profiler
+Opt-in wall-clock profiler for a single thread: a helper thread snapshots the
+target thread's Python stack at a fixed interval, and the samples are written
+in the collapsed-stack format understood by flamegraph.pl, speedscope and
+inferno ("frame;frame;frame count" per line)
+"""
+
+import os
+import sys
+import time
+import uuid
+import threading
+from collections import Counter
+
+# 'off', 'request' (profile requests that ask with ?profile=true) or 'all'
+# (every request and training job)
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'off')
+
+# Where .folded stack files are written, and the sampling interval
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '1'))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack until stopped; use start()/stop() or as a context manager"""
+
+    def __init__(self, thread_id=None, interval_ms=PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = max(interval_ms, 0.1) / 1000
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._sampler = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def collapsed(self):
+        """Samples in collapsed-stack format, heaviest stacks first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def save(self, name, directory=PROFILE_DIR):
+        """Write the collapsed stacks to directory and return the file path"""
+        os.makedirs(directory, exist_ok=True)
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name).strip('_')
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{uuid.uuid4().hex[:6]}.folded")
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+        return path
@@ -0,0 +1,466 @@
+"""
+Vectorized Scoring Helpers
+Column-wise parsing, validation and result formatting for bulk account predictions,
+plus a chunked streaming engine shared by /predict/stream and the offline CLI:
+
+    python -m scoring score input.csv > out.ndjson
+"""
+
+import io
+import re
+import csv
+import sys
+import json
+import argparse
+import numpy as np
+import fast_json
+
+# Rows scored per chunk when streaming, and bytes read from the input per read() call
+STREAM_CHUNK_ROWS = 10000
+STREAM_READ_BYTES = 1 << 20
+
+# Validation rules applied column-wise: (feature, rule, error message)
+# Messages match the ones returned by the single-row /predict validator
+FEATURE_RULES = [
+    ('username_length', 'positive', "username_length must be a positive number"),
+    ('num_posts', 'non_negative', "num_posts must be a non-negative number"),
+    ('num_followers', 'non_negative', "num_followers must be a non-negative number"),
+    ('num_following', 'non_negative', "num_following must be a non-negative number"),
+    ('account_age_days', 'positive', "account_age_days must be a positive number"),
+    ('has_profile_picture', 'boolean', "has_profile_picture must be 0 or 1"),
+    ('has_bio', 'boolean', "has_bio must be 0 or 1"),
+    ('is_verified', 'boolean', "is_verified must be 0 or 1"),
+    # Only checked for versions that take it from the client (see feature_pipeline)
+    ('engagement_ratio', 'non_negative', "engagement_ratio must be a non-negative number"),
+]
+
+_NUMERIC_TYPES = {int, float, bool}
+
+# Characters that force a CSV field to be quoted
+_CSV_SPECIAL = re.compile('[,"\r\n]')
+
+
+def records_to_matrix(records, feature_columns):
+    """
+    Build a float64 feature matrix from a list of account dicts
+
+    Returns (X, errors) where errors maps row index -> message for rows that
+    could not be converted. Those rows are left as NaN in X.
+    """
+    n_rows = len(records)
+    X = np.full((n_rows, len(feature_columns)), np.nan)
+    errors = {}
+
+    for row, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[row] = "Each account must be a JSON object"
+
+    for col, feature in enumerate(feature_columns):
+        values = [r.get(feature) if isinstance(r, dict) else None for r in records]
+
+        # Fast path: every value is already a plain number
+        if set(map(type, values)) <= _NUMERIC_TYPES:
+            X[:, col] = values
+            continue
+
+        # Slow path: isolate the offending rows, convert the rest
+        for row, value in enumerate(values):
+            if type(value) in _NUMERIC_TYPES:
+                X[row, col] = value
+            elif row not in errors:
+                if value is None and not (isinstance(records[row], dict) and feature in records[row]):
+                    errors[row] = f"Missing required field: {feature}"
+                else:
+                    errors[row] = f"Invalid data type for {feature}"
+
+    return X, errors
+
+
+def _split_csv_line(line):
+    """Split one CSV line into fields; only lines holding a quote go through the csv module"""
+    if '"' not in line:
+        return line.split(',')
+    return next(csv.reader([line]), [])
+
+
+def parse_csv_matrix(text, feature_columns, header=None):
+    """
+    Parse CSV text into a float64 feature matrix
+
+    The first line is treated as the header unless one is passed in, so the
+    same function handles both whole files and headerless stream chunks.
+    Returns (X, errors, header) with the same error convention as
+    records_to_matrix.
+    """
+    lines = text.splitlines()
+    if header is None:
+        if not lines:
+            raise ValueError("CSV input is empty")
+        header = [h.strip() for h in _split_csv_line(lines[0])]
+        lines = lines[1:]
+
+    missing = [f for f in feature_columns if f not in header]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    usecols = [header.index(f) for f in feature_columns]
+
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return np.empty((0, len(feature_columns))), {}, header
+
+    # Fast path: numpy's C parser over the whole block (it honours quoted fields)
+    try:
+        X = np.loadtxt(io.StringIO('\n'.join(lines)), delimiter=',', quotechar='"',
+                       usecols=usecols, ndmin=2, dtype=np.float64)
+        return X, {}, header
+    except ValueError:
+        pass
+
+    # Slow path: parse line by line so one bad row does not sink the block
+    X = np.full((len(lines), len(feature_columns)), np.nan)
+    errors = {}
+    for row, line in enumerate(lines):
+        fields = _split_csv_line(line)
+        try:
+            X[row] = [float(fields[i]) for i in usecols]
+        except (IndexError, ValueError):
+            errors[row] = "Malformed CSV row"
+    return X, errors, header
+
+
+# Scalar (source expression over `v`) and column-wise forms of each rule;
+# NaN fails every comparison, so it is rejected like any out-of-range value
+_SCALAR_CHECKS = {
+    'positive': '0 < {v} < _inf',
+    'non_negative': '0 <= {v} < _inf',
+    'boolean': '({v} == 0 or {v} == 1)',
+}
+_COLUMN_CHECKS = {
+    'positive': lambda col: (col > 0) & np.isfinite(col),
+    'non_negative': lambda col: (col >= 0) & np.isfinite(col),
+    'boolean': lambda col: (col == 0) | (col == 1),
+}
+
+
+class FeatureValidator:
+    """
+    FEATURE_RULES compiled once for a fixed feature order
+
+    validate_record() checks one account dict with generated straight-line
+    code (no per-rule function calls) and returns its feature values;
+    validate_matrix() checks every row of a matrix with one vectorized
+    comparison per rule. Both report the same messages.
+    """
+
+    def __init__(self, feature_columns, rules=None):
+        self.feature_columns = list(feature_columns)
+        index = {f: i for i, f in enumerate(self.feature_columns)}
+        rules = [(index[feature], rule, message) for feature, rule, message in (rules or FEATURE_RULES)
+                 if feature in index]
+        self._column_checks = [(col, _COLUMN_CHECKS[rule], message) for col, rule, message in rules]
+        self.validate_record = self._compile_record_check(rules)
+
+    def _compile_record_check(self, rules):
+        """Generate validate_record(record) -> (values, None) or (None, message)"""
+        names = [f"v{i}" for i in range(len(self.feature_columns))]
+        lines = [
+            "def validate_record(record):",
+            "    try:",
+            f"        {', '.join(names)}, = {', '.join(f'record[{f!r}]' for f in self.feature_columns)},",
+            "    except KeyError as e:",
+            "        return None, f'Missing required field: {e.args[0]}'",
+            "    except TypeError:",
+            "        return None, 'Account must be a JSON object'",
+        ]
+        for n, (col, rule, _) in enumerate(rules):
+            v = names[col]
+            lines.append(f"    if type({v}) not in _numeric or not {_SCALAR_CHECKS[rule].format(v=v)}:")
+            lines.append(f"        return None, _messages[{n}]")
+        lines.append(f"    return [{', '.join(names)}], None")
+
+        namespace = {'_numeric': _NUMERIC_TYPES,
+                     '_inf': float('inf'), '_messages': [message for _, _, message in rules]}
+        exec('\n'.join(lines), namespace)
+        return namespace['validate_record']
+
+    def validate_matrix(self, X, errors=None):
+        """
+        Check every row of X at once
+
+        Adds row index -> message entries to errors (first failing rule wins)
+        and returns it. Rows already present in errors are left untouched.
+        """
+        errors = {} if errors is None else errors
+        for col, check, message in self._column_checks:
+            bad = ~check(X[:, col])
+            for row in np.flatnonzero(bad).tolist():
+                errors.setdefault(row, message)
+        return errors
+
+
+_validators = {}
+
+
+def get_validator(feature_columns):
+    """Return the compiled FeatureValidator for a feature order, building it once"""
+    key = tuple(feature_columns)
+    if key not in _validators:
+        _validators[key] = FeatureValidator(key)
+    return _validators[key]
+
+
+def find_invalid_rows(X, feature_columns, errors=None):
+    """
+    Apply FEATURE_RULES to every row of X at once
+
+    Adds row index -> message entries to errors (first failing rule wins)
+    and returns it. Rows already present in errors are left untouched.
+    """
+    return get_validator(feature_columns).validate_matrix(X, errors)
+
+
+def predictions_from_proba(proba, classes):
+    """Derive class predictions from predict_proba output (same tie-break as sklearn)"""
+    return np.asarray(classes).take(np.argmax(proba, axis=1))
+
+
+def format_predictions(proba, classes, compact=False):
+    """Turn a probability matrix into the per-account result dicts used by the API"""
+    predictions = predictions_from_proba(proba, classes).astype(int).tolist()
+    real = proba[:, 0].tolist()
+    fake = proba[:, 1].tolist()
+
+    if compact:
+        return [
+            {'prediction': p, 'is_fake': bool(p), 'probability_fake': f}
+            for p, f in zip(predictions, fake)
+        ]
+
+    return [
+        {
+            'prediction': p,
+            'is_fake': bool(p),
+            'confidence': {
+                'real_account': r,
+                'fake_account': f
+            },
+            'probability_fake': f
+        }
+        for p, r, f in zip(predictions, real, fake)
+    ]
+
+
+def format_explanations(bias, contributions, feature_columns):
+    """Turn a contribution matrix into per-account {'bias', 'contributions'} dicts"""
+    names = list(feature_columns)
+    return [
+        {'bias': bias, 'contributions': dict(zip(names, row))}
+        for row in contributions.tolist()
+    ]
+
+
+def first_error(errors):
+    """Return a 'Row N: message' string for the lowest failing row, or None"""
+    if not errors:
+        return None
+    row = min(errors)
+    return f"Row {row}: {errors[row]}"
+
+
+def load_json_records(body):
+    """Decode a JSON batch body: either a list of accounts or {'accounts': [...]}"""
+    data = fast_json.loads(body)
+    if isinstance(data, dict):
+        data = data.get('accounts')
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of accounts or an object with an 'accounts' array")
+    return data
+
+
+def iter_line_blocks(stream, chunk_rows=STREAM_CHUNK_ROWS, read_bytes=STREAM_READ_BYTES):
+    """
+    Read a binary stream in fixed-size pieces and yield lists of decoded lines
+
+    At most chunk_rows lines are held at a time, so memory stays flat no
+    matter how large the input is.
+    """
+    pending = []
+    remainder = b''
+    while True:
+        data = stream.read(read_bytes)
+        if not data:
+            break
+        data = remainder + data
+        pieces = data.split(b'\n')
+        remainder = pieces.pop()
+        pending.extend(pieces)
+        while len(pending) >= chunk_rows:
+            block, pending = pending[:chunk_rows], pending[chunk_rows:]
+            yield [line.decode('utf-8').rstrip('\r') for line in block]
+    if remainder:
+        pending.append(remainder)
+    if pending:
+        yield [line.decode('utf-8').rstrip('\r') for line in pending]
+
+
+def iter_feature_chunks(stream, feature_columns, input_format='ndjson', id_field='id',
+                        chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Yield (X, errors, ids) per chunk of a newline-delimited JSON or CSV stream
+
+    Row indices in errors are local to the chunk. ids holds the id_field
+    value of each row when the input carries one, otherwise None.
+    """
+    header = None
+    for lines in iter_line_blocks(stream, chunk_rows):
+        if input_format == 'csv':
+            if header is None:
+                if not lines:
+                    continue
+                header = [h.strip() for h in _split_csv_line(lines[0])]
+                lines = lines[1:]
+            lines = [line for line in lines if line.strip()]
+            X, errors, _ = parse_csv_matrix('\n'.join(lines), feature_columns, header=header)
+            ids = None
+            if id_field in header:
+                id_col = header.index(id_field)
+                ids = [_csv_field(line, id_col) for line in lines]
+        else:
+            records = []
+            decode_errors = {}
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(fast_json.loads(line))
+                except ValueError:
+                    decode_errors[len(records)] = "Malformed JSON line"
+                    records.append(None)
+            X, errors = records_to_matrix(records, feature_columns)
+            errors.update(decode_errors)
+            ids = None
+            if any(isinstance(r, dict) and id_field in r for r in records):
+                ids = [r.get(id_field) if isinstance(r, dict) else None for r in records]
+
+        yield X, find_invalid_rows(X, feature_columns, errors), ids
+
+
+def _csv_field(line, index):
+    """Return one field of a CSV line, or None if the line is too short"""
+    fields = _split_csv_line(line)
+    return fields[index].strip() if index < len(fields) else None
+
+
+def score_stream(stream, predict_proba, classes, feature_columns, input_format='ndjson',
+                 output_format='ndjson', id_field='id', chunk_rows=STREAM_CHUNK_ROWS, start_row=0):
+    """
+    Score a newline-delimited stream chunk by chunk and yield encoded output
+
+    predict_proba is called once per chunk on the valid rows only. Invalid
+    rows are reported inline as error records instead of aborting the stream.
+    """
+    chunks = iter_feature_chunks(stream, feature_columns, input_format, id_field, chunk_rows)
+    return score_chunks(chunks, predict_proba, classes, output_format, start_row)
+
+
+def score_chunks(chunks, predict_proba, classes, output_format='ndjson', start_row=0):
+    """
+    Score (X, errors, ids) chunks and yield encoded output
+
+    Rows are numbered from start_row, so separately scored pieces of one
+    input (e.g. bulk scoring shards) keep their global row numbers.
+    """
+    if output_format == 'csv':
+        yield 'row,id,prediction,probability_fake,error\n'
+
+    offset = start_row
+    for X, errors, ids in chunks:
+        n_rows = len(X)
+        if n_rows == 0:
+            continue
+
+        valid = np.ones(n_rows, dtype=bool)
+        if errors:
+            valid[list(errors)] = False
+
+        prob_fake = np.zeros(n_rows)
+        labels = np.zeros(n_rows, dtype=int)
+        if valid.any():
+            proba = predict_proba(X[valid])
+            prob_fake[valid] = proba[:, 1]
+            labels[valid] = predictions_from_proba(proba, classes)
+
+        yield _encode_chunk(offset, labels.tolist(), prob_fake.tolist(), errors, ids, output_format)
+        offset += n_rows
+
+
+def csv_field(value):
+    """Format one CSV field, quoting it when it holds a comma, quote or line break"""
+    text = '' if value is None else str(value)
+    if _CSV_SPECIAL.search(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _encode_chunk(offset, labels, prob_fake, errors, ids, output_format):
+    """Encode one scored chunk as NDJSON or CSV text"""
+    out = []
+    for i, (label, prob) in enumerate(zip(labels, prob_fake)):
+        row = offset + i
+        account_id = ids[i] if ids is not None else None
+        error = errors.get(i)
+        if output_format == 'csv':
+            out.append(f"{row},{csv_field(account_id)},"
+                       f"{'' if error else label},{'' if error else repr(prob)},{csv_field(error)}\n")
+        else:
+            id_part = '' if account_id is None else f',"id":{json.dumps(account_id)}'
+            if error:
+                out.append(f'{{"row":{row}{id_part},"error":{json.dumps(error)}}}\n')
+            else:
+                out.append(f'{{"row":{row}{id_part},"prediction":{label},"probability_fake":{prob!r}}}\n')
+    return ''.join(out)
+
+
+def main(argv=None):
+    """Command line entry point for offline scoring"""
+    parser = argparse.ArgumentParser(prog='python -m scoring',
+                                     description='Score account dumps offline with the trained model')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    score = subparsers.add_parser('score', help='Score a CSV or NDJSON file and write results to stdout')
+    score.add_argument('input', help="Input file path, or '-' for stdin")
+    score.add_argument('--input-format', choices=['csv', 'ndjson'],
+                       help='Input format (default: guessed from the file extension, else ndjson)')
+    score.add_argument('--output-format', choices=['ndjson', 'csv'], default='ndjson')
+    score.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_ROWS,
+                       help='Rows scored per chunk')
+    score.add_argument('--id-field', default='id', help='Column echoed back with each result')
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or ('csv' if args.input.endswith('.csv') else 'ndjson')
+
+    # Reuse the API's model loading so offline and online scoring match exactly
+    import api
+    if not api.load_model():
+        print("No trained model found. Start the API or call train_model() first.", file=sys.stderr)
+        return 1
+
+    stream = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    try:
+        current = api.bundle
+        for text in score_stream(stream, current.predict_proba, current.classes_,
+                                 current.input_columns, input_format, args.output_format,
+                                 args.id_field, args.chunk_size):
+            sys.stdout.write(text)
+    except ValueError as e:
+        print(f"Scoring failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -469,21 +469,27 @@ async function processBatchPredictions(rows) {
     hideResults();
     
     const results = [];
-    const batchSize = 10; // Process in batches to avoid overwhelming the API
+    const batchSize = 5000; // Accounts per /predict/batch request
     
     try {
         for (let i = 0; i < rows.length; i += batchSize) {
             const batch = rows.slice(i, i + batchSize);
-            const batchPromises = batch.map(row => 
-                fetch(`${API_BASE_URL}/predict`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(row)
-                }).then(response => response.json())
-            );
+            const response = await fetch(`${API_BASE_URL}/predict/batch`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(batch)
+            });
+            
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || `HTTP error! status: ${response.status}`);
+            }
             
-            const batchResults = await Promise.all(batchPromises);
-            results.push(...batchResults);
+            // The batch endpoint does not echo inputs, so pair results with their rows
+            results.push(...data.predictions.map((prediction, index) => ({
+                ...prediction,
+                input_data: batch[index]
+            })));
             
             // Show progress
             showNotification(`Processed ${Math.min(i + batchSize, rows.length)} of ${rows.length} accounts...`, 'info');
@@ -0,0 +1,101 @@
+"""
+Production Server for the Fake Account Detector API
+Runs the API under gunicorn with several worker processes. The model is loaded
+once in the master before forking, so workers share its memory-mapped engine
+pages copy-on-write instead of each loading their own copy.
+
+    python serve.py [--workers 4] [--threads 4] [--keep-alive 5] [--max-request-mb 64]
+
+Every option can also be set through the matching SERVER_* environment variable.
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Address to listen on
+SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:5000')
+
+# Worker processes (default: one per core) and request threads per worker
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', str(os.cpu_count() or 1)))
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', '4'))
+
+# Seconds an idle keep-alive connection is held open
+SERVER_KEEPALIVE = int(os.environ.get('SERVER_KEEPALIVE', '5'))
+
+# Seconds a worker may spend on one request before it is restarted (training
+# runs in a background thread, so requests themselves stay short)
+SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', '60'))
+
+# Largest accepted request body in megabytes
+SERVER_MAX_REQUEST_MB = float(os.environ.get('SERVER_MAX_REQUEST_MB', '64'))
+
+
+def parse_args(argv=None):
+    """Command-line options, defaulting to the SERVER_* settings"""
+    parser = argparse.ArgumentParser(description="Run the API with a multi-process production server")
+    parser.add_argument('--bind', default=SERVER_BIND, help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS, help='Worker processes')
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help='Request threads per worker')
+    parser.add_argument('--keep-alive', type=int, default=SERVER_KEEPALIVE, help='Keep-alive seconds')
+    parser.add_argument('--timeout', type=int, default=SERVER_TIMEOUT, help='Worker timeout seconds')
+    parser.add_argument('--max-request-mb', type=float, default=SERVER_MAX_REQUEST_MB,
+                        help='Largest request body in MB (0 = unlimited)')
+    return parser.parse_args(argv)
+
+
+def run_gunicorn(app, args):
+    """Serve app with gunicorn, preloaded in the master process"""
+    from gunicorn.app.base import BaseApplication
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': args.bind,
+                'workers': args.workers,
+                'threads': args.threads,
+                'keepalive': args.keep_alive,
+                'timeout': args.timeout,
+                'preload_app': True,
+                'accesslog': None,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    PreloadedApplication().run()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Must be set before api reads it at import time
+    os.environ['MAX_REQUEST_MB'] = str(args.max_request_mb)
+    import api
+
+    # Load (or train) once, before any worker is forked
+    api.initialize_app()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        gunicorn = None
+
+    if gunicorn is None or sys.platform == 'win32':
+        # gunicorn needs fork(); fall back to a single threaded process without the debugger
+        logger.warning("gunicorn is not available; serving with the threaded Werkzeug server")
+        host, _, port = args.bind.rpartition(':')
+        api.app.run(host=host or '0.0.0.0', port=int(port), debug=False, threaded=True)
+        return
+
+    logger.info(f"Serving on {args.bind} with {args.workers} workers x {args.threads} threads")
+    run_gunicorn(api.app, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Tests for admission control: rate limits, concurrency limits and load shedding
+"""
+
+import json
+import pytest
+import admission
+from admission import AdmissionClass, ConcurrencyLimiter, RateLimiter, Rejection
+
+
+@pytest.fixture
+def limits(api_module, monkeypatch):
+    """Turn admission on with tiny limits: 2 scoring requests per client, one /predict at a time, no queue"""
+    scoring_rate = RateLimiter(0.001, 2)
+    classes = {
+        'predict': AdmissionClass('predict', scoring_rate, ConcurrencyLimiter(1, 0, 0), token_bytes=16384),
+        'batch': AdmissionClass('batch', scoring_rate, ConcurrencyLimiter(1, 0, 0), token_bytes=16384),
+        'train': AdmissionClass('train', RateLimiter(0, 1), ConcurrencyLimiter(1, 0, 0)),
+    }
+    monkeypatch.setattr(admission, 'ADMISSION_ENABLED', True)
+    monkeypatch.setattr(api_module, 'admission_classes', classes)
+    return classes
+
+
+def address(ip):
+    """Test client options sending a request from ip"""
+    return {'environ_base': {'REMOTE_ADDR': ip}}
+
+
+def test_token_bucket():
+    limiter = RateLimiter(rate=2, burst=3)
+    assert [limiter.take('a')[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = limiter.take('a')
+    assert not allowed and 0 < retry_after <= 0.5
+    assert limiter.take('b')[0]
+    # A cost above the burst is capped so the request can pass eventually
+    assert RateLimiter(rate=1, burst=2).take('c', cost=10) == (True, 0.0)
+    assert RateLimiter(rate=0, burst=1).take('d', cost=100) == (True, 0.0)
+
+
+def test_concurrency_limiter_sheds():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=0, target_seconds=1)
+    assert limiter.acquire() == 0.0
+    with pytest.raises(Rejection) as rejection:
+        limiter.acquire()
+    assert rejection.value.status == 503 and rejection.value.reason == 'queue_full'
+    limiter.release(0.01)
+
+    waiting = ConcurrencyLimiter(limit=1, max_queue=5, target_seconds=0.05)
+    waiting.acquire()
+    with pytest.raises(Rejection) as rejection:
+        waiting.acquire()
+    assert rejection.value.reason == 'queue_latency'
+    assert waiting.snapshot()['waiting'] == 0
+
+
+def test_client_id(monkeypatch):
+    # Headers the client fills in are ignored by default
+    headers = {'X-API-Key': 'k1', 'X-Forwarded-For': '1.2.3.4'}
+    assert admission.client_id(headers, '10.0.0.1') == 'ip:10.0.0.1'
+
+    # Behind two proxies the outer one appended the client; anything left of it is spoofable
+    monkeypatch.setattr(admission, 'TRUST_PROXY', 2)
+    assert admission.client_id({'X-Forwarded-For': '6.6.6.6, 1.2.3.4, 10.0.0.9'}, '10.0.0.1') == 'ip:1.2.3.4'
+    assert admission.client_id({'X-Forwarded-For': '10.0.0.9'}, '10.0.0.1') == 'ip:10.0.0.1'
+    assert admission.client_id({}, '10.0.0.1') == 'ip:10.0.0.1'
+    monkeypatch.setattr(admission, 'TRUST_PROXY', 1)
+    assert admission.client_id({'X-Forwarded-For': '6.6.6.6, 1.2.3.4'}, '10.0.0.1') == 'ip:1.2.3.4'
+
+    # A gateway-verified identity header, when configured
+    monkeypatch.setattr(admission, 'CLIENT_ID_HEADER', 'X-Consumer-ID')
+    assert admission.client_id({'X-Consumer-ID': 'acme', 'X-API-Key': 'k1'}, '10.0.0.1') == 'key:acme'
+
+
+def test_rate_limit_is_429(client, limits, accounts):
+    for _ in range(2):
+        assert client.post('/predict', json=accounts[0], **address('10.1.0.1')).status_code == 200
+    response = client.post('/predict', json=accounts[0], **address('10.1.0.1'))
+    assert response.status_code == 429
+    assert response.get_json()['reason'] == 'rate_limit'
+    assert int(response.headers['Retry-After']) >= 1
+    # /predict/batch draws on the same budget; other clients have their own
+    assert client.post('/predict/batch', json=accounts[:2], **address('10.1.0.1')).status_code == 429
+    assert client.post('/predict', json=accounts[0], **address('10.1.0.2')).status_code == 200
+    assert 'fakeacct_requests_shed_total{class="predict",reason="rate_limit"}' in \
+        client.get('/metrics').get_data(as_text=True)
+
+
+def test_full_queue_is_503(client, limits, accounts):
+    limits['predict'].concurrency.acquire()  # Another request holds the only slot
+    try:
+        response = client.post('/predict', json=accounts[0])
+        assert response.status_code == 503
+        assert response.get_json()['reason'] == 'queue_full'
+        assert 'Retry-After' in response.headers
+    finally:
+        limits['predict'].release(0.01)
+    assert client.post('/predict', json=accounts[0]).status_code == 200
+    assert limits['predict'].concurrency.active == 0
+
+
+def test_train_backlog_is_503(client, api_module, limits, monkeypatch):
+    monkeypatch.setattr(api_module, 'pending_jobs', lambda: admission.TRAIN_MAX_PENDING_JOBS)
+    response = client.post('/train', json={})
+    assert response.status_code == 503
+    assert response.get_json()['reason'] == 'train_backlog'
+    assert response.headers['Retry-After'] == str(admission.TRAIN_BACKLOG_RETRY_SECONDS)
+
+
+def test_large_rejected_body_closes_the_connection(client, limits, accounts):
+    limits['batch'].rate_limiter.take('ip:10.1.0.4', cost=2)
+    small = client.post('/predict/batch', json=accounts[:2], **address('10.1.0.4'))
+    assert small.status_code == 429 and 'Connection' not in small.headers
+
+    body = json.dumps(accounts * 100)
+    assert len(body) > admission.REJECT_DRAIN_BYTES
+    large = client.post('/predict/batch', data=body, content_type='application/json', **address('10.1.0.4'))
+    assert large.status_code == 429 and large.headers['Connection'] == 'close'
+
+
+def test_rotating_api_keys_share_one_bucket(client, limits, accounts):
+    statuses = [client.post('/predict', json=accounts[0], headers={'X-API-Key': f"key-{i}"},
+                            **address('10.1.0.3')).status_code for i in range(3)]
+    assert statuses == [200, 200, 429]
+    # Nor does a made-up X-Forwarded-For when no proxy is trusted
+    response = client.post('/predict', json=accounts[0], headers={'X-Forwarded-For': '9.9.9.9'},
+                           **address('10.1.0.3'))
+    assert response.status_code == 429
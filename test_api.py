@@ -54,6 +54,10 @@ def test_api():
             print(f"   ✅ Prediction successful!")
             print(f"   📊 Result: {'FAKE' if data['is_fake'] else 'REAL'} account")
             print(f"   🎯 Confidence: {data['probability_fake']:.1%} fake, {1-data['probability_fake']:.1%} real")
+
+            # The same account again should come from the prediction cache
+            repeat = requests.post(f'{API_BASE_URL}/predict', json=TEST_ACCOUNT, timeout=10)
+            print(f"   ♻️  Repeat lookup: cache {repeat.headers.get('X-Cache', 'n/a')}")
         else:
             print(f"   ❌ Prediction failed: {response.status_code}")
             print(f"   📝 Response: {response.text}")
@@ -62,8 +66,29 @@ def test_api():
         print(f"   ❌ Prediction request failed: {e}")
         return False
     
+    # Test batch prediction endpoint
+    print("\n3. Testing batch prediction endpoint...")
+    try:
+        response = requests.post(
+            f'{API_BASE_URL}/predict/batch',
+            json=[TEST_ACCOUNT] * 3,
+            timeout=10
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            print(f"   ✅ Batch prediction successful!")
+            print(f"   📊 Scored {data['count']} accounts, {data['fake_count']} flagged as fake")
+        else:
+            print(f"   ❌ Batch prediction failed: {response.status_code}")
+            print(f"   📝 Response: {response.text}")
+            return False
+    except requests.exceptions.RequestException as e:
+        print(f"   ❌ Batch prediction request failed: {e}")
+        return False
+    
     # Test model info endpoint
-    print("\n3. Testing model info endpoint...")
+    print("\n4. Testing model info endpoint...")
     try:
         response = requests.get(f'{API_BASE_URL}/model-info', timeout=5)
         if response.status_code == 200:
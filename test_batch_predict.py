@@ -0,0 +1,51 @@
+"""
+Tests for POST /predict/batch
+"""
+
+import numpy as np
+
+
+def test_batch_matches_single_predictions(client, accounts):
+    response = client.post('/predict/batch', json=accounts[:10])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 10
+    assert data['fake_count'] == sum(p['is_fake'] for p in data['predictions'])
+    for account, prediction in zip(accounts[:10], data['predictions']):
+        single = client.post('/predict', json=account).get_json()
+        assert prediction['prediction'] == single['prediction']
+        assert np.isclose(prediction['probability_fake'], single['probability_fake'])
+
+
+def test_batch_accepts_accounts_object_and_csv(client, accounts, api_module):
+    wrapped = client.post('/predict/batch', json={'accounts': accounts[:5]}).get_json()
+
+    columns = api_module.input_columns
+    lines = [','.join(columns)] + [','.join(str(account[c]) for c in columns) for account in accounts[:5]]
+    response = client.post('/predict/batch', data='\n'.join(lines), content_type='text/csv')
+    assert response.status_code == 200
+    assert response.get_json()['predictions'] == wrapped['predictions']
+
+
+def test_batch_compact_response(client, accounts):
+    data = client.post('/predict/batch?compact=true', json=accounts[:3]).get_json()
+    assert set(data['predictions'][0]) == {'prediction', 'is_fake', 'probability_fake'}
+
+
+def test_batch_rejects_invalid_rows(client, accounts):
+    bad = [dict(accounts[0], num_posts=-1), accounts[1], dict(accounts[2], has_bio=7)]
+    response = client.post('/predict/batch', json=bad)
+    assert response.status_code == 400
+    assert response.get_json()['invalid_rows'] == 2
+
+
+def test_batch_rejects_bad_bodies(client):
+    assert client.post('/predict/batch', data='', content_type='application/json').status_code == 400
+    assert client.post('/predict/batch', json=[]).status_code == 400
+    assert client.post('/predict/batch', json={'rows': []}).status_code == 400
+    assert client.post('/predict/batch', data='[{', content_type='application/json').status_code == 400
+
+
+def test_batch_too_large(client, accounts, api_module, monkeypatch):
+    monkeypatch.setattr(api_module, 'MAX_BATCH_ROWS', 5)
+    assert client.post('/predict/batch', json=accounts[:6]).status_code == 413
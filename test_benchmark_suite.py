@@ -0,0 +1,50 @@
+"""
+Tests for the benchmark suite's baseline comparison
+"""
+
+import json
+import argparse
+import pytest
+from benchmarks import suite
+
+
+def write_results(path, metrics, cpu_count=4):
+    with open(path, 'w') as f:
+        json.dump({'meta': {'platform': 'test', 'cpu_count': cpu_count},
+                   'metrics': {name: {'value': value, 'unit': 'ms', 'better': better}
+                               for name, (value, better) in metrics.items()}}, f)
+    return str(path)
+
+
+def run_compare(tmp_path, baseline, current, threshold=0.25):
+    args = argparse.Namespace(baseline=write_results(tmp_path / 'baseline.json', baseline),
+                              results=write_results(tmp_path / 'results.json', current),
+                              threshold=threshold)
+    suite.compare(args)
+
+
+def test_within_threshold_passes(tmp_path, capsys):
+    run_compare(tmp_path, {'latency': (10.0, 'lower'), 'throughput': (100.0, 'higher')},
+                {'latency': (12.0, 'lower'), 'throughput': (90.0, 'higher'), 'new_metric': (1.0, 'lower')})
+    assert 'No regressions beyond 25%' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('current', [
+    {'latency': (13.0, 'lower'), 'throughput': (100.0, 'higher')},
+    {'latency': (10.0, 'lower'), 'throughput': (70.0, 'higher')},
+], ids=['slower', 'less-throughput'])
+def test_regression_exits_non_zero(tmp_path, capsys, current):
+    with pytest.raises(SystemExit) as exit_info:
+        run_compare(tmp_path, {'latency': (10.0, 'lower'), 'throughput': (100.0, 'higher')}, current)
+    assert exit_info.value.code == 1
+    assert '1 metric(s) regressed' in capsys.readouterr().out
+
+
+def test_missing_metric_exits_non_zero(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        run_compare(tmp_path, {'latency': (10.0, 'lower'), 'throughput': (100.0, 'higher')},
+                    {'latency': (10.0, 'lower')})
+    assert exit_info.value.code == 1
+    out = capsys.readouterr().out
+    assert '1 baseline metric(s) missing from the results: throughput' in out
+    assert 'No regressions' not in out
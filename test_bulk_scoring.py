@@ -0,0 +1,117 @@
+"""
+Tests for offline bulk scoring jobs: shard planning, checkpoints and resuming
+"""
+
+import io
+import os
+import json
+import pytest
+import bulk_scoring
+from scoring import score_stream
+
+
+@pytest.fixture
+def accounts_csv(dataset, api_module, tmp_path):
+    """230 accounts with ids, one invalid row and blank lines scattered through the file"""
+    df = dataset[0][api_module.input_columns].head(230).copy()
+    df.insert(0, 'id', [f"acct-{i}" for i in range(len(df))])
+    df.loc[17, 'num_posts'] = -1
+    lines = df.to_csv(index=False).splitlines()
+    for position, blank in ((40, ''), (41, '  \r'), (120, '\t'), (200, '')):
+        lines.insert(position, blank)
+    path = str(tmp_path / 'accounts.csv')
+    with open(path, 'w', newline='') as f:
+        f.write('\n'.join(lines) + '\n\n')
+    return path
+
+
+def scored_text(output_dir, job):
+    """All part files of a job joined in shard order, without their CSV headers"""
+    text = ''
+    for index in range(len(job['shards'])):
+        with open(os.path.join(output_dir, bulk_scoring.part_name(index, job['output_format']))) as f:
+            text += ''.join(f.readlines()[1:])
+    return text
+
+
+def expected_text(path, bundle):
+    """The same file scored as one stream (as python -m scoring score does)"""
+    with open(path, 'rb') as f:
+        body = f.read()
+    output = score_stream(io.BytesIO(body), bundle.predict_proba, bundle.classes_, bundle.input_columns,
+                          input_format='csv', output_format='csv')
+    return ''.join(output).split('\n', 1)[1]
+
+
+@pytest.mark.parametrize('shard_rows', [1, 7, 50, 230, 1000])
+def test_plan_counts_only_non_blank_lines(accounts_csv, shard_rows):
+    header, shards = bulk_scoring.plan_text_shards(accounts_csv, shard_rows)
+    assert header.startswith(b'id,')
+    assert sum(shard['rows'] for shard in shards) == 230
+    with open(accounts_csv, 'rb') as f:
+        data = f.read()
+    for shard in shards:
+        lines = data[shard['start']:shard['end']].decode().split('\n')
+        assert sum(1 for line in lines if line.strip()) == shard['rows']
+    # Block boundaries (here every few bytes) do not move any shard
+    assert bulk_scoring.plan_text_shards(accounts_csv, shard_rows, block_bytes=13) == (header, shards)
+
+
+def test_job_matches_single_stream_scoring(accounts_csv, api_module, tmp_path):
+    output_dir = str(tmp_path / 'scores')
+    version = api_module.bundle.version
+    job = bulk_scoring.plan_job(accounts_csv, output_dir, version, shard_rows=50, chunk_rows=20)
+    job = bulk_scoring.run_job(job, workers=1)
+    assert job['status'] == 'complete' and len(job['completed']) == len(job['shards']) == 5
+    assert job['totals']['rows'] == 230 and job['totals']['errors'] == 1
+    text = scored_text(output_dir, job)
+    assert text == expected_text(accounts_csv, api_module.bundle)
+    assert text.splitlines()[17].startswith('17,acct-17,,,')
+
+
+def test_resume_scores_only_missing_shards(accounts_csv, api_module, tmp_path):
+    output_dir = str(tmp_path / 'scores')
+    job = bulk_scoring.plan_job(accounts_csv, output_dir, api_module.bundle.version, shard_rows=50)
+    job = bulk_scoring.run_job(job, workers=1)
+    complete = scored_text(output_dir, job)
+
+    # Simulate a crash: shard 3 was never checkpointed and left a half-written part file
+    job = bulk_scoring.load_job(output_dir)
+    del job['completed']['3']
+    job['status'] = 'running'
+    os.remove(os.path.join(output_dir, bulk_scoring.part_name(3, 'csv')))
+    with open(os.path.join(output_dir, 'part-00003.csv.abc.tmp'), 'w') as f:
+        f.write('partial')
+    parts_before = {name: os.stat(os.path.join(output_dir, name)).st_mtime_ns
+                    for name in os.listdir(output_dir) if name.endswith('.csv')}
+
+    lines = []
+    job = bulk_scoring.run_job(job, workers=1, report=lines.append)
+    assert lines[0].startswith('Resuming: 4/5 shards')
+    assert scored_text(output_dir, job) == complete
+    assert not [name for name in os.listdir(output_dir) if name.endswith('.tmp')]
+    for name, mtime in parts_before.items():
+        assert os.stat(os.path.join(output_dir, name)).st_mtime_ns == mtime
+    assert bulk_scoring.load_job(output_dir)['status'] == 'complete'
+
+
+def test_changed_input_is_not_resumed(accounts_csv, api_module, tmp_path, capsys):
+    output_dir = str(tmp_path / 'scores')
+    version = api_module.bundle.version
+    job = bulk_scoring.plan_job(accounts_csv, output_dir, version, shard_rows=100)
+    job['status'] = 'running'
+    os.makedirs(output_dir)
+    bulk_scoring._write_json_atomic(os.path.join(output_dir, bulk_scoring.JOB_FILE), job)
+
+    assert bulk_scoring._check_resumable(job, accounts_csv, None, 'ndjson', 'id', None) == \
+        "it was made with different options (output_format)"
+    with open(accounts_csv, 'a') as f:
+        f.write('999,12,1,1,1,1,1,1,0\n')
+    assert bulk_scoring.main([accounts_csv, output_dir, '--model-version', version, '--workers', '1']) == 1
+    assert 'the input has changed since it was written' in capsys.readouterr().err
+
+    # --restart discards the checkpoint and scores the new file
+    assert bulk_scoring.main([accounts_csv, output_dir, '--model-version', version, '--workers', '1',
+                              '--restart']) == 0
+    with open(os.path.join(output_dir, bulk_scoring.JOB_FILE)) as f:
+        assert json.load(f)['totals']['rows'] == 231
@@ -0,0 +1,46 @@
+"""
+Tests for the synthetic dataset generator
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import dataset_generator
+
+
+def test_generation_is_reproducible():
+    first = dataset_generator.generate_fake_account_dataset(2000, seed=11)
+    again = dataset_generator.generate_fake_account_dataset(2000, seed=11)
+    other = dataset_generator.generate_fake_account_dataset(2000, seed=12)
+    assert list(first.columns) == dataset_generator.COLUMNS
+    assert first.equals(again) and not first.equals(other)
+    assert 0.2 < first['is_fake'].mean() < 0.8
+
+
+def test_file_output_does_not_depend_on_workers(tmp_path):
+    serial, parallel = str(tmp_path / 'serial.csv'), str(tmp_path / 'parallel.csv')
+    assert dataset_generator.generate_dataset_to_file(serial, 2500, chunk_rows=600, seed=3) == 2500
+    dataset_generator.generate_dataset_to_file(parallel, 2500, chunk_rows=600, seed=3, n_workers=2)
+    with open(serial, 'rb') as a, open(parallel, 'rb') as b:
+        assert a.read() == b.read()
+    assert len(pd.read_csv(serial)) == 2500
+    assert not os.path.exists(f"{serial}.partial")
+
+
+def test_map_in_window_bounds_work_in_flight():
+    class CountingExecutor(ThreadPoolExecutor):
+        in_flight = peak = 0
+
+        def submit(self, fn, *args):
+            CountingExecutor.in_flight += 1
+            CountingExecutor.peak = max(CountingExecutor.peak, CountingExecutor.in_flight)
+            return super().submit(fn, *args)
+
+    with CountingExecutor(4) as executor:
+        results = []
+        for value in dataset_generator._map_in_window(executor, lambda x: x * x, range(20), window=3):
+            CountingExecutor.in_flight -= 1
+            results.append(value)
+    assert results == [x * x for x in range(20)]
+    # The window, plus the result being handed to the caller
+    assert CountingExecutor.peak <= 3 + 1
@@ -0,0 +1,90 @@
+"""
+Tests for the columnar dataset cache
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import dataset_store
+from feature_pipeline import FeaturePipeline, FEATURE_COLUMNS
+
+
+@pytest.fixture
+def csv_path(dataset, tmp_path):
+    """A private copy of the dataset CSV, free to be rewritten"""
+    path = str(tmp_path / 'accounts.csv')
+    dataset[0].head(500).to_csv(path, index=False)
+    return path
+
+
+def test_columns_match_csv(csv_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    columns = dataset_store.load_columns(csv_path, cache_dir=cache_dir)
+    df = pd.read_csv(csv_path)
+    assert list(columns) == list(df.columns)
+    for column, values in columns.items():
+        assert not values.flags.writeable
+        assert np.allclose(values, df[column].to_numpy())
+    assert columns['num_posts'].dtype == np.int32 and columns['is_fake'].dtype == np.uint8
+
+    subset = dataset_store.open_cache(cache_dir, ['num_posts'])
+    assert list(subset) == ['num_posts']
+    with pytest.raises(KeyError):
+        dataset_store.open_cache(cache_dir, ['not_a_column'])
+
+
+def test_rebuilds_when_csv_changes(csv_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    dataset_store.load_columns(csv_path, cache_dir=cache_dir)
+    assert dataset_store.is_fresh(csv_path, cache_dir)
+
+    # A trailing blank line is counted by the row scan but is not a row
+    df = pd.read_csv(csv_path).head(200)
+    df.to_csv(csv_path, index=False)
+    with open(csv_path, 'a') as f:
+        f.write('\n')
+    assert not dataset_store.is_fresh(csv_path, cache_dir)
+    columns = dataset_store.load_columns(csv_path, cache_dir=cache_dir)
+    assert len(columns['num_posts']) == 200
+    assert np.array_equal(columns['num_posts'], df['num_posts'].to_numpy())
+
+
+def test_refuses_values_the_dtype_cannot_hold(csv_path, tmp_path):
+    df = pd.read_csv(csv_path)
+    df.loc[0, 'has_bio'] = 300
+    df.to_csv(csv_path, index=False)
+    with pytest.raises(ValueError, match='has_bio'):
+        dataset_store.build_cache(csv_path, str(tmp_path / 'cache'))
+    assert not os.path.exists(tmp_path / 'cache')
+
+
+def test_derived_features_are_cached(csv_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    pipeline = FeaturePipeline(FEATURE_COLUMNS)
+    derived = dataset_store.load_derived(csv_path, pipeline, cache_dir=cache_dir, block_rows=128)
+    df = pd.read_csv(csv_path)
+    expected = pipeline.derive({c: df[c].to_numpy() for c in df.columns}, dtype=np.float32)
+    assert list(derived) == pipeline.derived_columns
+    for name, values in derived.items():
+        assert np.array_equal(values, expected[name])
+    assert len(os.listdir(os.path.join(cache_dir, dataset_store.DERIVED_DIR))) == len(derived)
+
+
+def test_same_named_csvs_get_their_own_cache(dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'DATASET_CACHE_DIR', str(tmp_path / 'cache'))
+    paths = []
+    for directory, rows in (('a', 100), ('b', 300)):
+        os.makedirs(tmp_path / directory)
+        paths.append(str(tmp_path / directory / 'data.csv'))
+        dataset[0].head(rows).to_csv(paths[-1], index=False)
+    assert dataset_store.cache_dir_for(paths[0]) != dataset_store.cache_dir_for(paths[1])
+    assert [len(dataset_store.load_columns(path)['num_posts']) for path in paths] == [100, 300]
+
+    # A rewritten CSV gets a new cache, and the old one is removed
+    old_dir = dataset_store.cache_dir_for(paths[0])
+    dataset[0].head(50).to_csv(paths[0], index=False)
+    assert dataset_store.cache_dir_for(paths[0]) != old_dir
+    assert len(dataset_store.load_columns(paths[0])['num_posts']) == 50
+    assert sorted(os.listdir(tmp_path / 'cache')) == sorted(
+        os.path.basename(dataset_store.cache_dir_for(path)) for path in paths)
@@ -0,0 +1,82 @@
+"""
+Tests for live traffic drift monitoring and GET /drift
+"""
+
+import threading
+import numpy as np
+import pytest
+import drift_monitor
+from drift_monitor import DriftMonitor, psi, status_for
+
+
+@pytest.fixture
+def traffic(dataset, api_module):
+    """Raw input rows and served P(fake) for 1500 dataset accounts"""
+    bundle = api_module.bundle
+    X = dataset[0][bundle.input_columns].to_numpy(np.float64)[:1500]
+    return bundle, X, bundle.predict_proba(X)[:, 1]
+
+
+def test_psi_and_status():
+    assert psi([0.25] * 4, [0.25] * 4) == 0
+    assert psi([0.25] * 4, [0.7, 0.1, 0.1, 0.1]) > drift_monitor.DRIFT_PSI_ALERT
+    assert [status_for(v) for v in (0.01, 0.15, 0.5)] == ['ok', 'warning', 'drift']
+
+
+def test_training_like_traffic_does_not_drift(traffic):
+    bundle, X, probability = traffic
+    monitor = DriftMonitor()
+    monitor.reset(bundle)
+    monitor.observe_batch(X, probability)
+    report = monitor.report()
+    assert report['version'] == bundle.version and report['rows'] == len(X)
+    assert report['status'] in ('ok', 'warning') and report['drifted_features'] == []
+
+
+def test_shifted_traffic_drifts(traffic):
+    bundle, X, probability = traffic
+    shifted = X.copy()
+    shifted[:, bundle.input_columns.index('num_followers')] *= 100
+    monitor = DriftMonitor()
+    monitor.reset(bundle)
+    for row, p in zip(shifted.tolist(), probability.tolist()):
+        monitor.observe(row, p)
+    report = monitor.report()
+    assert report['status'] == 'drift'
+    assert 'num_followers' in report['drifted_features']
+    assert report['features']['num_posts']['status'] != 'drift'
+
+
+def test_full_buffer_is_binned_in_the_background(traffic):
+    bundle, X, probability = traffic
+    flushed = threading.Event()
+    monitor = DriftMonitor(flush_rows=10, on_flush=lambda report: flushed.set())
+    monitor.reset(bundle)
+    for row, p in zip(X[:10].tolist(), probability[:10].tolist()):
+        monitor.observe(row, p)
+    assert flushed.wait(10)
+    assert monitor.report(flush=False)['rows'] == 10
+
+
+def test_drift_endpoint(client, api_module):
+    response = client.get('/drift?windows=2')
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report['version'] == api_module.bundle.version and report['windows'] == 2
+    assert report['retrain']['enabled'] == drift_monitor.DRIFT_RETRAIN
+
+    response = client.get('/drift?windows=0')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'windows must be a positive integer'
+
+
+def test_drift_triggers_one_retrain(api_module, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(drift_monitor, 'DRIFT_RETRAIN', True)
+    monkeypatch.setattr(api_module, 'submit_job', lambda fn, kind: submitted.append(kind) or 'job1')
+    monkeypatch.setattr(api_module, '_drift_retrained_at', None)
+    monkeypatch.setattr(api_module, '_drift_retrain_job', None)
+    report = {'status': 'drift', 'drifted_features': ['num_posts'], 'features': {'num_posts': {'psi': 0.9}}}
+    api_module.on_drift_flush(report)
+    api_module.on_drift_flush(report)  # Still cooling down
+    assert submitted == ['drift_retrain'] and api_module._drift_retrain_job == 'job1'
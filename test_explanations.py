@@ -0,0 +1,42 @@
+"""
+Tests for per-feature prediction explanations (?explain=true)
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from forest_engine import CompiledForest
+
+
+def test_contributions_add_up_to_the_probability():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(400, 4)) * [1, 5, 20, 0.5]
+    X[:, 3] = 1.0  # A constant feature no tree can split on
+    y = (X[:, 0] + X[:, 1] / 5 > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(scaler.transform(X), y)
+    engine = CompiledForest.from_sklearn(model, scaler)
+
+    proba, bias, contributions = engine.explain(X, class_index=1)
+    assert np.array_equal(proba, engine.predict_proba(X))
+    assert contributions.shape == X.shape
+    assert np.allclose(bias + contributions.sum(axis=1), proba[:, 1])
+    assert not contributions[:, 3].any()
+
+
+def test_predict_explain(client, api_module, accounts):
+    result = client.post('/predict?explain=true', json=accounts[7]).get_json()
+    explanation = result['explanation']
+    assert list(explanation['contributions']) == api_module.bundle.feature_columns
+    total = explanation['bias'] + sum(explanation['contributions'].values())
+    assert total == pytest.approx(result['probability_fake'], abs=1e-6)
+    assert 'explanation' not in client.post('/predict', json=accounts[7]).get_json()
+
+
+def test_batch_explain_matches_single(client, accounts):
+    batch = client.post('/predict/batch?explain=true', json=accounts[:5]).get_json()['predictions']
+    for account, prediction in zip(accounts[:5], batch):
+        single = client.post('/predict?explain=true', json=account).get_json()
+        assert prediction['explanation']['contributions'] == pytest.approx(single['explanation']['contributions'])
+        assert prediction['probability_fake'] == pytest.approx(single['probability_fake'])
@@ -0,0 +1,108 @@
+"""
+Tests for server-side derived features
+"""
+
+import os
+import json
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+import model_registry
+from feature_pipeline import FeaturePipeline, FEATURE_COLUMNS, INPUT_COLUMNS
+from training import load_training_data, load_cached_training_data
+
+LEGACY_COLUMNS = FEATURE_COLUMNS[:9]
+
+
+def test_ratios_keep_the_numerator_for_zero_denominators():
+    pipeline = FeaturePipeline(FEATURE_COLUMNS)
+    assert pipeline.input_columns == INPUT_COLUMNS
+    X = np.array([[10, 40, 200, 0, 20, 1, 1, 0],
+                  [10, 40, 0, 50, 0, 1, 1, 0]], dtype=np.float64)
+    out = dict(zip(FEATURE_COLUMNS, pipeline.transform(X).T))
+    assert out['engagement_ratio'].tolist() == [0.2, 40.0]
+    assert out['follower_following_ratio'].tolist() == [200.0, 0.0]
+    assert out['posts_per_day'].tolist() == [2.0, 40.0]
+    assert out['num_posts'].tolist() == [40.0, 40.0]
+
+
+def test_legacy_feature_order():
+    pipeline = FeaturePipeline(LEGACY_COLUMNS)
+    assert pipeline.derived_columns == ['engagement_ratio']
+    assert 'engagement_ratio' not in pipeline.input_columns
+    row = np.array([[12, 45, 234, 156, 120, 1, 1, 0]], dtype=np.float64)
+    assert pipeline.transform(row)[0].tolist() == [12, 45, 234, 156, 120, 1, 1, 45 / 234, 0]
+    assert pipeline.describe() == [['engagement_ratio', 'ratio', ['num_posts', 'num_followers']]]
+
+
+def test_unknown_operation_is_refused():
+    with pytest.raises(ValueError, match='Unknown operation'):
+        FeaturePipeline(['a', 'b'], derived=[('b', 'log', ('a',))])
+
+
+def test_cache_and_csv_training_matrices_match(dataset):
+    from_csv = load_training_data(dataset[1], FEATURE_COLUMNS, chunk_rows=700)
+    from_cache = load_cached_training_data(dataset[1], FEATURE_COLUMNS)
+    assert from_csv[2] == from_cache[2] == len(dataset[0])
+    assert np.array_equal(from_csv[0], from_cache[0]) and np.array_equal(from_csv[1], from_cache[1])
+
+
+def test_client_supplied_ratios_are_ignored(client, accounts):
+    account = accounts[8]
+    expected = client.post('/predict?explain=true', json=account).get_json()
+    tampered = dict(account, engagement_ratio=999.0, posts_per_day=-1)
+    result = client.post('/predict?explain=true', json=tampered).get_json()
+    assert result['probability_fake'] == expected['probability_fake']
+    assert result['explanation'] == expected['explanation']
+
+
+@pytest.fixture
+def legacy_model(dataset):
+    """A forest trained on the original nine columns, engagement_ratio taken from the CSV"""
+    df = dataset[0].head(1000)
+    scaler = StandardScaler().fit(df[LEGACY_COLUMNS].to_numpy(np.float64))
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0)
+    model.fit(scaler.transform(df[LEGACY_COLUMNS].to_numpy(np.float64)), df['is_fake'])
+    return model, scaler, df
+
+
+def expected_proba(model, scaler, rows):
+    return model.predict_proba(scaler.transform(rows[LEGACY_COLUMNS].to_numpy(np.float64)))
+
+
+def test_manifest_without_declarations_takes_features_as_sent(legacy_model, monkeypatch, tmp_path):
+    monkeypatch.setattr(model_registry, 'REGISTRY_DIR', str(tmp_path))
+    model, scaler, df = legacy_model
+    version = model_registry.save_version(model, scaler, LEGACY_COLUMNS)
+    # A manifest as written before derived features were declared
+    manifest_path = os.path.join(tmp_path, version, model_registry.MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    del manifest['derived_features']
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    bundle = model_registry.load_bundle(version)
+    assert bundle.pipeline.derived_columns == [] and 'engagement_ratio' in bundle.input_columns
+    rows = df.head(200).copy()
+    rows['engagement_ratio'] = rows['engagement_ratio'] * 3 + 0.5  # Not what the counts would give
+    proba = bundle.predict_proba(rows[bundle.input_columns].to_numpy(np.float64))
+    assert np.allclose(proba, expected_proba(model, scaler, rows))
+
+
+def test_legacy_import_takes_features_as_sent(legacy_model, monkeypatch, tmp_path):
+    monkeypatch.setattr(model_registry, 'REGISTRY_DIR', str(tmp_path / 'models'))
+    model, scaler, df = legacy_model
+    monkeypatch.setattr(model_registry, 'LEGACY_MODEL_PATH', str(tmp_path / 'model.pkl'))
+    monkeypatch.setattr(model_registry, 'LEGACY_SCALER_PATH', str(tmp_path / 'scaler.pkl'))
+    joblib.dump(model, model_registry.LEGACY_MODEL_PATH)
+    joblib.dump(scaler, model_registry.LEGACY_SCALER_PATH)
+
+    version = model_registry.import_legacy_model(FEATURE_COLUMNS)
+    assert model_registry.read_manifest(version)['derived_features'] == []
+    bundle = model_registry.load_bundle(version)
+    rows = df.head(200)
+    proba = bundle.predict_proba(rows[bundle.input_columns].to_numpy(np.float64))
+    assert np.allclose(proba, expected_proba(model, scaler, rows))
@@ -0,0 +1,138 @@
+"""
+Tests for labeled feedback and incremental model updates
+"""
+
+import os
+import numpy as np
+import pytest
+import feedback_store
+import online_updates
+
+
+@pytest.fixture
+def fresh_model(api_module):
+    """Serve a freshly trained forest that has learned every stored feedback row"""
+    return api_module.train_model(n_jobs=1)['version']
+
+
+@pytest.fixture
+def labeled(dataset, api_module):
+    """200 labeled accounts (input fields plus is_fake) as feedback bodies"""
+    return dataset[0][api_module.input_columns + ['is_fake']].iloc[100:300].to_dict('records')
+
+
+def test_feedback_is_stored_and_pending(client, fresh_model, labeled):
+    response = client.post('/feedback', json=labeled[:3])
+    assert response.status_code == 201
+    assert response.get_json() == {'accepted': 3, 'pending_rows': 3}
+    assert client.post('/feedback', json={'accounts': labeled[3:5]}).get_json()['pending_rows'] == 5
+
+    status = client.get('/feedback').get_json()
+    assert status['pending_rows'] == 5 and status['total_rows'] >= 5
+    assert status['model_version'] == fresh_model
+
+
+@pytest.mark.parametrize('body, message', [
+    ('', 'No data provided'),
+    ('{not json', 'Invalid feedback body'),
+    ('[]', 'No accounts provided'),
+    ('"account"', 'Expected an account object or an array of accounts'),
+])
+def test_feedback_rejects_bad_bodies(client, body, message):
+    response = client.post('/feedback', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+def test_feedback_validates_labels_and_features(client, labeled):
+    response = client.post('/feedback', json=[labeled[0], dict(labeled[1], is_fake=2)])
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Row 1: is_fake must be 0 or 1', 'invalid_rows': 1}
+    response = client.post('/feedback', json=[dict(labeled[0], num_posts=-5)])
+    assert 'num_posts must be a non-negative number' in response.get_json()['error']
+
+
+def test_update_is_rejected_then_applied(client, api_module, fresh_model, labeled, monkeypatch):
+    client.post('/feedback', json=labeled)
+
+    # No update can gain a full point of accuracy, so this one is refused
+    monkeypatch.setattr(online_updates, 'UPDATE_ACCURACY_TOLERANCE', -1.0)
+    result = client.post('/feedback/update?wait=true', json={'trees': 5}).get_json()
+    assert result['action'] == 'rejected' and result['version'] == fresh_model
+    assert api_module.bundle.version == fresh_model
+    assert client.get('/feedback').get_json()['pending_rows'] == len(labeled)
+
+    monkeypatch.setattr(online_updates, 'UPDATE_ACCURACY_TOLERANCE', 1.0)
+    result = client.post('/feedback/update?wait=true', json={'trees': 5, 'mode': 'grow'}).get_json()
+    assert result['action'] == 'update' and result['version'] != fresh_model
+    assert len(api_module.bundle.model.estimators_) == 100 + 5
+    status = client.get('/feedback').get_json()
+    assert status['pending_rows'] == 0 and status['incremental']['feedback_rows'] == len(labeled)
+
+    # Nothing left to learn
+    assert client.post('/feedback/update?wait=true', json={}).get_json()['action'] == 'none'
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'mode': 'shrink'}, 'mode must be one of'),
+    ({'trees': 0}, 'trees must be a positive integer'),
+    ({'trees': '5'}, 'trees must be a positive integer'),
+    ({'rebuild': 'yes'}, 'rebuild must be true or false'),
+])
+def test_update_rejects_bad_options(client, body, message):
+    response = client.post('/feedback/update', json=body)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+def test_read_since_matches_columns_by_name(tmp_path):
+    path = str(tmp_path / 'feedback.csv')
+    with open(path, 'w') as f:
+        f.write('b,is_fake,a,received_at\n2.0,1,1.0,10.0\n4.0,0,3.0,11.0\n5.0,1,')
+    X, y, received_at, offset, skipped = feedback_store.read_since(0, path=path, columns=['a', 'b'])
+    assert X.tolist() == [[1.0, 2.0], [3.0, 4.0]] and skipped == 0
+    assert y.tolist() == [1, 0] and received_at.tolist() == [10.0, 11.0]
+    # The unfinished last row is left for the next read
+    assert feedback_store.read_since(offset, path=path, columns=['a', 'b'])[0].shape == (0, 2)
+    with pytest.raises(ValueError, match=r'no column\(s\): c'):
+        feedback_store.read_since(0, path=path, columns=['a', 'c'])
+
+
+def test_append_writes_header_once(tmp_path):
+    path = str(tmp_path / 'feedback.csv')
+    feedback_store.append(np.array([[1.0, 2.0]]), [1], ['a', 'b'], path=path)
+    feedback_store.append(np.array([[3.0, 4.0]]), [0], ['a', 'b'], path=path)
+    assert feedback_store.count_since(0, path=path) == 2
+    X, y, _, _, _ = feedback_store.read_since(0, path=path)
+    assert X.tolist() == [[1.0, 2.0], [3.0, 4.0]] and y.tolist() == [1, 0]
+
+
+def test_read_since_skips_malformed_rows(tmp_path):
+    path = str(tmp_path / 'feedback.csv')
+    with open(path, 'w') as f:
+        f.write('num_posts,a,is_fake,received_at\n'
+                '1,2.0,1,10.0\n'
+                '2,abc,0,11.0\n'       # not a number
+                '3,4.0\n'              # cut short
+                '4,5.0,1,12.0,extra\n'  # too many fields
+                '-5,6.0,0,13.0\n'      # fails the num_posts rule
+                '6,7.0,2,14.0\n'       # not a label
+                '\n'
+                '7,8.0,0,15.0\n')
+    X, y, received_at, offset, skipped = feedback_store.read_since(0, path=path, columns=['num_posts', 'a'])
+    assert X.tolist() == [[1.0, 2.0], [7.0, 8.0]] and y.tolist() == [1, 0]
+    assert received_at.tolist() == [10.0, 15.0] and skipped == 5
+    assert offset == os.path.getsize(path)
+
+
+def test_feedback_rejects_missing_and_mistyped_features(client, labeled):
+    total_rows = client.get('/feedback').get_json()['total_rows']
+    account = dict(labeled[0])
+    del account['num_followers']
+    response = client.post('/feedback', json=[account])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Row 0: Missing required field: num_followers'
+    response = client.post('/feedback', json=[labeled[0], dict(labeled[1], num_posts='12')])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Row 1: Invalid data type for num_posts'
+    assert client.get('/feedback').get_json()['total_rows'] == total_rows
@@ -0,0 +1,52 @@
+"""
+Tests for the compiled forest engine
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from forest_engine import CompiledForest
+
+
+@pytest.fixture(scope='module')
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 5)) * [1, 10, 100, 0.1, 5] + [0, 50, 0, 1, -3]
+    y = (X[:, 0] + X[:, 1] / 10 + rng.normal(scale=0.5, size=len(X)) > 5).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler, X
+
+
+def test_matches_sklearn_exactly(forest):
+    model, scaler, X = forest
+    engine = CompiledForest.from_sklearn(model, scaler)
+    expected = model.predict_proba(scaler.transform(X))
+    assert np.array_equal(engine.predict_proba(X), expected)
+    assert np.array_equal(engine.predict(X), model.predict(scaler.transform(X)))
+
+
+def test_save_and_memory_mapped_load(forest, tmp_path):
+    model, scaler, X = forest
+    engine = CompiledForest.from_sklearn(model, scaler)
+    engine.save(str(tmp_path))
+    loaded = CompiledForest.load(str(tmp_path))
+    # Read-only views of the files, not copies
+    assert not loaded.threshold.flags.writeable
+    assert np.array_equal(loaded.predict_proba(X), engine.predict_proba(X))
+
+
+def test_quantized_engine_stays_close(forest):
+    model, scaler, X = forest
+    engine = CompiledForest.from_sklearn(model, scaler)
+    exact = engine.predict_proba(X)
+
+    narrow = engine.quantize('float32', 'float16')
+    assert narrow.quantized and not engine.quantized
+    assert np.abs(narrow.predict_proba(X) - exact).max() < 0.01
+
+    # float16 thresholds move rows sitting right on a split; labels barely change
+    smallest = engine.quantize('float16', 'uint8')
+    assert smallest.nbytes < narrow.nbytes < engine.nbytes
+    assert np.mean(smallest.predict(X) == engine.predict(X)) > 0.95
@@ -0,0 +1,40 @@
+"""
+Tests for the successive-halving hyperparameter search
+"""
+
+import pytest
+from hyperparameter_search import SEARCH_SPACE, sample_candidates, run_search
+from training import RF_PARAMS
+
+
+def test_candidates_are_distinct_and_start_from_defaults():
+    candidates = sample_candidates(10, RF_PARAMS, seed=1)
+    assert candidates[0] == {name: RF_PARAMS[name] for name in SEARCH_SPACE}
+    assert len({tuple(sorted(c.items(), key=str)) for c in candidates}) == 10
+    assert sample_candidates(10, RF_PARAMS, seed=1) == candidates
+
+
+def test_search_in_worker_processes(dataset, api_module):
+    report = run_search(dataset[1], api_module.feature_columns, n_candidates=4, n_folds=2, eta=2,
+                        n_workers=2, max_rows=1500)
+    assert report['rows_searched'] == 1500 and report['workers'] == 2
+    assert report['best'] == report['final_round'][0]
+    assert set(report['best_params']) == set(SEARCH_SPACE)
+    assert report['rounds'][0]['candidates'] == 4
+
+
+def test_train_with_search(client):
+    response = client.post('/train?wait=true', json={'n_jobs': 1, 'search': {'candidates': 2, 'folds': 2,
+                                                                           'workers': 1, 'max_rows': 1000}})
+    assert response.status_code == 200
+    search = response.get_json()['metrics']['search']
+    assert search['candidates'] == 2 and search['workers'] == 1
+
+
+@pytest.mark.parametrize('search', [
+    'fast', {'trials': 3}, {'folds': 1}, {'candidates': 2.5}, {'latency_weight': -1}, {'workers': True},
+])
+def test_train_rejects_bad_search(client, search):
+    response = client.post('/train', json={'search': search})
+    assert response.status_code == 400
+    assert 'search' in response.get_json()['error']
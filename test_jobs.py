@@ -0,0 +1,67 @@
+"""
+Tests for the shared background job runner
+"""
+
+import os
+import sys
+import time
+import subprocess
+import pytest
+import jobs
+
+fcntl = pytest.importorskip('fcntl')
+
+
+def double(progress, value):
+    """A job that any process can run by name"""
+    progress(0.5, 'halfway')
+    return {'value': value * 2, 'pid': os.getpid()}
+
+
+def explode(progress):
+    raise RuntimeError('job blew up')
+
+
+@pytest.fixture(scope='module')
+def runner():
+    """Make this process the elected runner and wait until it holds the lock"""
+    os.makedirs(os.path.dirname(jobs.RUNNER_LOCK_FILE), exist_ok=True)
+    jobs._ensure_runner()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        with open(jobs.RUNNER_LOCK_FILE, 'a') as probe:
+            try:
+                fcntl.flock(probe, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(probe, fcntl.LOCK_UN)
+            except BlockingIOError:
+                return os.getpid()
+        time.sleep(0.05)
+    pytest.fail('This process never became the job runner')
+
+
+def test_job_result_and_failure(runner):
+    job = jobs.wait_for_job(jobs.submit_job(double, kind='test', value=21), timeout=30)
+    assert job['status'] == 'succeeded' and job['kind'] == 'test'
+    assert job['result'] == {'value': 42, 'pid': runner}
+    assert job['progress'] == 1.0 and job['stage'] == 'done'
+
+    job = jobs.wait_for_job(jobs.submit_job(explode, kind='test'), timeout=30)
+    assert job['status'] == 'failed' and job['error'] == 'job blew up'
+    assert jobs.pending_jobs(kind='test') == 0
+
+
+def test_job_from_another_process_runs_in_the_runner(runner):
+    # The other process only queues the job; its own runner thread waits for the lock
+    script = "import test_jobs, jobs; print(jobs.submit_job(test_jobs.double, kind='test', value=5))"
+    output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, timeout=60, check=True)
+    job_id = output.stdout.strip().splitlines()[-1]
+    job = jobs.wait_for_job(job_id, timeout=30)
+    assert job['status'] == 'succeeded'
+    assert job['result'] == {'value': 10, 'pid': runner}
+    assert job_id in [job['job_id'] for job in jobs.list_jobs()]
+
+
+def test_unknown_job():
+    assert jobs.get_job('not-a-job') is None
+    assert jobs.wait_for_job('not-a-job', timeout=1) is None
@@ -0,0 +1,23 @@
+"""
+Tests for memory-mapped, lazily loaded model artifacts
+"""
+
+import numpy as np
+import model_registry
+
+
+def test_bundle_serves_without_unpickling(api_module, accounts):
+    version = model_registry.get_active_version()
+    bundle = model_registry.load_bundle(version)
+    assert bundle.engine is not None
+    # Engine arrays are read-only views of the version's files
+    assert not bundle.engine.threshold.flags.writeable
+
+    X = np.array([[account[c] for c in bundle.input_columns] for account in accounts[:5]], dtype=np.float64)
+    proba = bundle.predict_proba(X)
+    assert bundle.model_type and bundle.feature_importances is not None
+    assert bundle._model is None
+
+    # The pickles load on first real use and agree with the engine
+    scaled = bundle.scaler.transform(bundle.pipeline.transform(X))
+    assert np.allclose(bundle.model.predict_proba(scaled), proba)
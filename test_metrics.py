@@ -0,0 +1,50 @@
+"""
+Tests for /metrics, Server-Timing and the sampling profiler
+"""
+
+import os
+import re
+from metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram('demo_seconds', 'Demo latency', ('endpoint',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, endpoint='/x')
+    text = registry.render()
+    assert 'demo_seconds_bucket{endpoint="/x",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{endpoint="/x",le="1"} 2' in text
+    assert 'demo_seconds_bucket{endpoint="/x",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{endpoint="/x"} 3' in text
+
+
+def test_server_timing_header(client, accounts):
+    response = client.post('/predict', json=accounts[4])
+    stages = dict(part.split(';dur=') for part in response.headers['Server-Timing'].split(', '))
+    assert {'parse', 'validate', 'cache', 'predict', 'serialize', 'total'} <= set(stages)
+    assert all(float(ms) >= 0 for ms in stages.values())
+
+
+def test_metrics_report_requests_and_stages(client, api_module, accounts):
+    client.post('/predict', json=accounts[5])
+    client.get('/train/not-a-job')
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert re.search(r'fakeacct_http_requests_total\{endpoint="/predict",method="POST",status="200"\} \d+', text)
+    # Endpoints are labelled by URL rule, not by the raw path
+    assert 'endpoint="/train/<job_id>",method="GET",status="404"' in text
+    assert 'fakeacct_request_stage_duration_seconds_count{endpoint="/predict",stage="predict"}' in text
+    assert f'fakeacct_model_info{{version="{api_module.bundle.version}"' in text
+
+
+def test_profile_on_request(client, api_module, accounts, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    assert 'X-Profile' not in client.post('/predict', json=accounts[6]).headers
+
+    monkeypatch.setattr(api_module, 'PROFILE_MODE', 'request')
+    response = client.post('/predict?profile=true', json=accounts[6])
+    path = response.headers['X-Profile']
+    assert path.endswith('.folded') and os.path.exists(path)
+    assert 'X-Profile' not in client.post('/predict', json=accounts[6]).headers
@@ -0,0 +1,49 @@
+"""
+Tests for the micro-batching scheduler
+"""
+
+import numpy as np
+import pytest
+from micro_batcher import MicroBatcher
+
+
+@pytest.fixture
+def rows(api_module, accounts):
+    columns = api_module.bundle.input_columns
+    return [[float(account[c]) for c in columns] for account in accounts[:20]]
+
+
+def test_batched_rows_match_direct_predictions(api_module, rows):
+    bundle = api_module.bundle
+    batcher = MicroBatcher(max_batch_size=8, max_wait_ms=200)
+    futures = [batcher.submit(bundle, row) for row in rows]
+    batched = np.array([future.result(timeout=10) for future in futures])
+    assert np.array_equal(batched, bundle.predict_proba(np.array(rows)))
+
+    stats = batcher.stats()
+    assert stats['rows'] == len(rows) and stats['largest_batch'] <= 8
+    assert stats['batches'] < len(rows)
+
+
+def test_failed_batch_fails_its_callers(rows):
+    class BrokenBundle:
+        def predict_proba(self, X):
+            raise RuntimeError('model exploded')
+
+    batcher = MicroBatcher(max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(BrokenBundle(), row) for row in rows[:3]]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model exploded'):
+            future.result(timeout=10)
+
+
+def test_predict_through_micro_batcher(client, api_module, accounts, monkeypatch):
+    monkeypatch.setattr(api_module, 'micro_batcher', MicroBatcher(max_batch_size=4, max_wait_ms=1))
+    account = dict(accounts[1], num_following=accounts[1]['num_following'] + 6151)
+    batched = client.post('/predict', json=account).get_json()
+    assert api_module.micro_batcher.stats()['rows'] == 1
+
+    monkeypatch.setattr(api_module, 'micro_batcher', None)
+    direct = client.post('/predict?explain=true', json=account).get_json()
+    assert batched['probability_fake'] == pytest.approx(direct['probability_fake'])
+    assert client.get('/health').get_json()['micro_batching'] == {'enabled': False}
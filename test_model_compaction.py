@@ -0,0 +1,43 @@
+"""
+Tests for forest compaction (pruning, quantization, distillation)
+"""
+
+import numpy as np
+import pytest
+from model_compaction import prune_trees
+
+
+def test_prune_drops_useless_trees():
+    y = np.array([0, 1, 0, 1, 1, 0])
+    classes = np.array([0, 1])
+    correct = np.stack([1 - y, y], axis=1).astype(float)
+    wrong = correct[:, ::-1]
+    tree_proba = np.stack([correct, correct, correct, wrong, wrong])
+    # Any one of the identical good trees is enough
+    keep = prune_trees(tree_proba, y, classes, tolerance=0.0, min_trees=1)
+    assert len(keep) == 1 and keep[0] in (0, 1, 2)
+    assert len(prune_trees(tree_proba, y, classes, tolerance=0.0, min_trees=4)) == 4
+
+
+def test_train_with_compaction(client, api_module):
+    response = client.post('/train?wait=true', json={'n_jobs': 1, 'compaction': {'min_trees': 5, 'tolerance': 0.01}})
+    assert response.status_code == 200
+    metrics = response.get_json()['metrics']
+    report = metrics['compaction']
+    assert [variant['variant'] for variant in report['variants']][:2] == ['full', 'pruned']
+    assert report['deployed'] in ('pruned', 'quantized')
+    # Both accuracies are measured on the holdout rows, which compaction did not decide on
+    deployed = next(variant for variant in report['variants'] if variant['variant'] == report['deployed'])
+    assert metrics['accuracy'] == deployed['holdout_accuracy']
+    assert metrics['full_forest_accuracy'] == report['variants'][0]['holdout_accuracy']
+    assert metrics['accuracy'] >= metrics['full_forest_accuracy'] - 0.02
+    assert len(api_module.bundle.model.estimators_) == report['variants'][1]['n_trees']
+
+
+@pytest.mark.parametrize('compaction', [
+    'yes', {'prune': True}, {'tolerance': 1.5}, {'min_trees': 0}, {'distill': 'svm'},
+])
+def test_train_rejects_bad_compaction(client, compaction):
+    response = client.post('/train', json={'compaction': compaction})
+    assert response.status_code == 400
+    assert 'compaction' in response.get_json()['error']
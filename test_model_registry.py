@@ -0,0 +1,64 @@
+"""
+Tests for the versioned model registry and its endpoints
+"""
+
+import pytest
+import model_registry
+
+
+@pytest.fixture
+def two_versions(client, api_module):
+    """Train a second version on top of the served one; returns (older, newer)"""
+    older = client.get('/model-info').get_json()['version']
+    newer = api_module.train_model(n_jobs=1)['version']
+    yield older, newer
+    api_module.activate_version(model_registry.list_versions()[-1]['version'])
+
+
+def test_models_lists_versions_and_active(client, two_versions):
+    older, newer = two_versions
+    data = client.get('/models').get_json()
+    assert data['active_version'] == newer
+    versions = {manifest['version']: manifest for manifest in data['versions']}
+    assert versions[newer]['active'] and not versions[older]['active']
+    assert versions[newer]['parent'] == older
+
+
+def test_activate_and_rollback(client, two_versions):
+    older, newer = two_versions
+    response = client.post(f'/models/{older}/activate')
+    assert response.status_code == 200
+    assert client.get('/model-info').get_json()['version'] == older
+    assert model_registry.get_active_version() == older
+
+    response = client.post('/models/rollback')
+    assert response.status_code == 200
+    assert client.get('/model-info').get_json()['version'] == newer
+
+
+def test_activate_unknown_version_is_404(client):
+    assert client.post('/models/v9999/activate').status_code == 404
+
+
+def test_rollback_without_previous_version(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(model_registry, 'REGISTRY_DIR', str(tmp_path))
+    response = client.post('/models/rollback')
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'No previous version to roll back to'
+    with pytest.raises(ValueError):
+        model_registry.rollback()
+
+
+def test_versions_are_immutable_and_numbered(api_module):
+    before = [manifest['version'] for manifest in model_registry.list_versions()]
+    version = api_module.train_model(n_jobs=1, activate=False)['version']
+    assert int(version[1:]) == max(int(v[1:]) for v in before) + 1
+    assert model_registry.get_active_version() != version
+    assert model_registry.load_bundle(version).version == version
+
+
+def test_reports_resolved_backend(client, api_module):
+    backend = client.get('/model-info').get_json()['inference_backend']
+    assert backend == api_module.bundle.backend
+    assert backend in ('compiled', 'sklearn', 'compiled+sklearn')
+    assert f'backend="{backend}"' in client.get('/metrics').get_data(as_text=True)
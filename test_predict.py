@@ -0,0 +1,74 @@
+"""
+Tests for /predict validation and response formats
+"""
+
+import io
+import math
+import numpy as np
+import pytest
+from scoring import get_validator, find_invalid_rows, parse_csv_matrix, iter_feature_chunks
+
+
+@pytest.mark.parametrize('field, value, message', [
+    ('num_posts', -1, 'num_posts must be a non-negative number'),
+    ('username_length', 0, 'username_length must be a positive number'),
+    ('has_bio', 2, 'has_bio must be 0 or 1'),
+    ('num_followers', '100', 'num_followers must be a non-negative number'),
+    ('num_following', None, 'num_following must be a non-negative number'),
+])
+def test_invalid_field_is_400(client, accounts, field, value, message):
+    response = client.post('/predict', json=dict(accounts[0], **{field: value}))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == message
+
+
+def test_missing_field_and_empty_body(client, accounts):
+    account = dict(accounts[0])
+    del account['num_posts']
+    response = client.post('/predict', json=account)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Missing required field: num_posts'
+    assert client.post('/predict', json={}).status_code == 400
+
+
+def test_full_and_compact_responses(client, accounts):
+    full = client.post('/predict', json=accounts[2]).get_json()
+    assert full['input_data'] == accounts[2]
+    assert math.isclose(full['confidence']['real_account'] + full['confidence']['fake_account'], 1.0)
+
+    compact = client.post('/predict?compact=true', json=accounts[2]).get_json()
+    assert compact == {key: full[key] for key in ('prediction', 'is_fake', 'probability_fake')}
+
+
+def test_record_and_matrix_validation_agree(api_module, accounts):
+    columns = api_module.bundle.input_columns
+    validator = get_validator(columns)
+    assert get_validator(list(columns)) is validator
+
+    bad = [dict(accounts[0], has_bio=3), dict(accounts[1], account_age_days=0),
+           dict(accounts[2], num_posts=float('nan')), accounts[3]]
+    X = np.array([[float(record[c]) for c in columns] for record in bad])
+    errors = find_invalid_rows(X, columns)
+    assert sorted(errors) == [0, 1, 2]
+    for row in errors:
+        values, message = validator.validate_record(bad[row])
+        assert values is None and message == errors[row]
+    assert validator.validate_record(accounts[3]) == ([accounts[3][c] for c in columns], None)
+
+    # Rows already reported are left alone
+    assert find_invalid_rows(X, columns, {0: 'unparseable'})[0] == 'unparseable'
+
+
+@pytest.mark.parametrize('bad_row', [False, True])
+def test_csv_fields_may_be_quoted(bad_row):
+    text = ('"id","name, full",a,b\n'
+            'x1,"Smith, J",1,2\n'
+            '"x,2","say ""hi"", then",3,4\n'
+            f"x3,plain,{'oops' if bad_row else 5},6\n")
+    X, errors, header = parse_csv_matrix(text, ['a', 'b'])
+    assert header == ['id', 'name, full', 'a', 'b']
+    assert X[:2].tolist() == [[1, 2], [3, 4]]
+    assert errors == ({2: 'Malformed CSV row'} if bad_row else {})
+
+    chunks = list(iter_feature_chunks(io.BytesIO(text.encode()), ['a', 'b'], input_format='csv'))
+    assert chunks[0][2] == ['x1', 'x,2', 'x3']
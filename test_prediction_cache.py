@@ -0,0 +1,59 @@
+"""
+Tests for the prediction result cache
+"""
+
+import pytest
+import prediction_cache
+from prediction_cache import PredictionCache, SQLitePredictionCache, feature_key
+
+
+def test_feature_key_is_canonical():
+    assert feature_key([1, True, -0.0]) == feature_key([1.0, 1, 0]) == (1.0, 1.0, 0.0)
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_entries=2, ttl_seconds=0)
+    cache.put('v1', (1.0,), (0.9, 0.1))
+    cache.put('v1', (2.0,), (0.8, 0.2))
+    assert cache.get('v1', (1.0,)) == (0.9, 0.1)  # Now the most recently used
+    cache.put('v1', (3.0,), (0.7, 0.3))
+    assert cache.get('v1', (2.0,)) is None
+    assert cache.get('v1', (1.0,)) == (0.9, 0.1)
+    assert cache.stats()['evictions'] == 1 and len(cache) == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', lambda: clock[0])
+    cache = PredictionCache(max_entries=10, ttl_seconds=5)
+    cache.put('v1', (1.0,), (0.5, 0.5))
+    clock[0] += 4
+    assert cache.get('v1', (1.0,)) == (0.5, 0.5)
+    clock[0] += 2
+    assert cache.get('v1', (1.0,)) is None
+    assert cache.stats()['expirations'] == 1
+
+
+@pytest.mark.parametrize('make_cache', [
+    lambda tmp_path: PredictionCache(max_entries=10, ttl_seconds=0),
+    lambda tmp_path: SQLitePredictionCache(str(tmp_path / 'cache.sqlite'), max_entries=10, ttl_seconds=0),
+], ids=['memory', 'sqlite'])
+def test_invalidate_keeps_only_one_version(make_cache, tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put('v1', (1.0,), (0.9, 0.1))
+    cache.put('v2', (1.0,), (0.6, 0.4))
+    assert cache.get('v1', (1.0,)) == (0.9, 0.1)
+    cache.invalidate(keep_version='v2')
+    assert cache.get('v1', (1.0,)) is None
+    assert cache.get('v2', (1.0,)) == (0.6, 0.4)
+    assert len(cache) == 1
+
+
+def test_repeat_predict_is_a_cache_hit(client, accounts):
+    account = dict(accounts[0], num_posts=accounts[0]['num_posts'] + 7919)
+    first = client.post('/predict', json=account)
+    second = client.post('/predict', json=account)
+    assert first.headers['X-Cache'] == 'MISS' and second.headers['X-Cache'] == 'HIT'
+    assert first.get_json()['probability_fake'] == second.get_json()['probability_fake']
+    # Explanations are always computed, never served from the cache
+    assert client.post('/predict?explain=true', json=account).headers['X-Cache'] == 'MISS'
@@ -0,0 +1,59 @@
+"""
+Tests for POST /predict/stream
+"""
+
+import csv
+import io
+import json
+import numpy as np
+
+
+def ndjson(records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+def test_stream_ndjson_matches_batch(client, accounts):
+    records = [dict(account, id=f"acct-{i}") for i, account in enumerate(accounts[:20])]
+    response = client.post('/predict/stream?chunk_size=7', data=ndjson(records),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    batch = client.post('/predict/batch', json=accounts[:20]).get_json()['predictions']
+    assert [row['row'] for row in rows] == list(range(20))
+    assert [row['id'] for row in rows] == [record['id'] for record in records]
+    assert np.allclose([row['probability_fake'] for row in rows], [p['probability_fake'] for p in batch])
+
+
+def test_stream_csv_reports_invalid_and_skips_blank_rows(client, accounts, api_module):
+    columns = api_module.input_columns
+    lines = [','.join(columns)]
+    for i, account in enumerate(accounts[:5]):
+        account = dict(account, num_posts=-3) if i == 2 else account
+        lines.append(','.join(str(account[c]) for c in columns))
+        lines.append('')
+    response = client.post('/predict/stream?output=csv', data='\n'.join(lines) + '\n', content_type='text/csv')
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['row'] for row in rows] == ['0', '1', '2', '3', '4']
+    assert rows[2]['error'] and not rows[2]['prediction']
+    assert all(not row['error'] for i, row in enumerate(rows) if i != 2)
+
+
+def test_stream_inline_error_row_is_valid_csv(client, accounts, api_module, monkeypatch):
+    def fail(X, timer=None):
+        raise ValueError('bad value, "quoted"\nnext line')
+    monkeypatch.setattr(api_module.bundle, 'predict_proba', fail)
+    response = client.post('/predict/stream?output=csv', data=ndjson(accounts[:3]),
+                           content_type='application/x-ndjson')
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['row', 'id', 'prediction', 'probability_fake', 'error']
+    assert len(rows[-1]) == 5
+    assert rows[-1][4] == 'Streaming prediction failed: bad value, "quoted"\nnext line'
+
+
+def test_stream_rejects_bad_options(client, accounts):
+    body = ndjson(accounts[:1])
+    assert client.post('/predict/stream?output=xml', data=body).status_code == 400
+    assert client.post('/predict/stream?chunk_size=0', data=body).status_code == 400
@@ -0,0 +1,49 @@
+"""
+Tests for background training: POST /train, GET /train/<job_id> and /train/jobs
+"""
+
+from jobs import wait_for_job
+
+
+def test_train_runs_in_background(client):
+    response = client.post('/train', json={'n_jobs': 1})
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data['status_url'] == f"/train/{data['job_id']}"
+
+    job = wait_for_job(data['job_id'], timeout=120)
+    assert job['status'] == 'succeeded'
+
+    status = client.get(data['status_url']).get_json()
+    assert status['progress'] == 1.0 and status['stage'] == 'done'
+    assert status['result']['version'] == client.get('/model-info').get_json()['version']
+    assert data['job_id'] in [job['job_id'] for job in client.get('/train/jobs').get_json()['jobs']]
+
+
+def test_train_wait_returns_metrics(client):
+    response = client.post('/train?wait=true', json={'n_jobs': 1})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert 0.5 < data['accuracy'] <= 1.0
+    assert data['metrics']['n_train'] > data['metrics']['n_test'] > 0
+
+
+def test_unknown_job_is_404(client):
+    response = client.get('/train/not-a-job')
+    assert response.status_code == 404
+    assert 'Unknown training job' in response.get_json()['error']
+
+
+def test_train_rejects_bad_n_jobs(client):
+    for n_jobs in (0, 'four', True, 1.5):
+        assert client.post('/train', json={'n_jobs': n_jobs}).status_code == 400
+
+
+def test_failed_job_is_reported(client, api_module, monkeypatch):
+    def missing_dataset():
+        raise FileNotFoundError('dataset is gone')
+    monkeypatch.setattr(api_module, 'ensure_dataset', missing_dataset)
+    response = client.post('/train?wait=true', json={})
+    assert response.status_code == 500
+    job = response.get_json()['job']
+    assert job['status'] == 'failed' and 'dataset is gone' in job['error']
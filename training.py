@@ -0,0 +1,337 @@
+"""
+Training Pipeline for Fake Account Detection
+Dataset loading (memory-mapped columnar cache, or chunked CSV) under a memory
+budget and multi-core Random Forest fitting.
+Imported lazily by the API so serving processes never pay for pandas/sklearn.
+"""
+
+import os
+import time
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.preprocessing import StandardScaler
+import dataset_store
+from feature_pipeline import FeaturePipeline
+from drift_monitor import build_profile, probability_profile
+from request_timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Worker processes/threads used to fit trees (-1 = all cores)
+TRAINING_N_JOBS = int(os.environ.get('TRAINING_N_JOBS', '-1'))
+
+# Upper bound on memory used by the training matrices, in megabytes
+TRAINING_MEMORY_BUDGET_MB = int(os.environ.get('TRAINING_MEMORY_BUDGET_MB', '2048'))
+
+# Rows parsed per CSV chunk while loading
+TRAINING_CHUNK_ROWS = int(os.environ.get('TRAINING_CHUNK_ROWS', '250000'))
+
+# Copies of the loaded matrix alive at peak (raw + train/test split + fitting buffers)
+MEMORY_OVERHEAD_FACTOR = 3
+
+# Default Random Forest hyperparameters
+RF_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+    'class_weight': 'balanced'  # Handle class imbalance
+}
+
+
+def _no_progress(fraction, stage):
+    """Default progress callback"""
+
+
+def estimate_rows(path, sample_bytes=1 << 16):
+    """Estimate the number of data rows in a CSV from its size and the first few lines"""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    lines = sample.count(b'\n')
+    if lines <= 1 or len(sample) >= file_size:
+        return max(lines - 1, 1)
+    return max(int(file_size / (len(sample) / lines)) - 1, 1)
+
+
+def load_training_data(path, feature_columns, target='is_fake', memory_budget_mb=None,
+                       chunk_rows=None, progress=_no_progress, seed=42):
+    """
+    Load features and labels from a CSV in chunks into compact arrays
+
+    Features are stored as float32 and labels as uint8; derived features
+    are computed from each chunk's raw columns by the feature pipeline. If
+    the file holds more rows than fit in the memory budget, a uniform
+    reservoir sample of the rows is kept instead, so memory never exceeds
+    the budget. Returns (X, y, total_rows).
+    """
+    memory_budget_mb = memory_budget_mb or TRAINING_MEMORY_BUDGET_MB
+    chunk_rows = chunk_rows or TRAINING_CHUNK_ROWS
+
+    n_features = len(feature_columns)
+    bytes_per_row = n_features * np.dtype(np.float32).itemsize + np.dtype(np.uint8).itemsize
+    capacity = max(int(memory_budget_mb * 1024 * 1024 // (bytes_per_row * MEMORY_OVERHEAD_FACTOR)), 1)
+    expected_rows = estimate_rows(path)
+
+    # np.empty only reserves address space; pages are touched as rows arrive
+    X = np.empty((min(capacity, expected_rows * 2 + chunk_rows), n_features), dtype=np.float32)
+    y = np.empty(len(X), dtype=np.uint8)
+    rng = np.random.default_rng(seed)
+    filled = 0
+    total = 0
+
+    pipeline = FeaturePipeline(feature_columns)
+    dtypes = {column: np.float32 for column in pipeline.input_columns}
+    dtypes[target] = np.uint8
+    reader = pd.read_csv(path, usecols=pipeline.input_columns + [target], dtype=dtypes, chunksize=chunk_rows)
+
+    for chunk in reader:
+        X_chunk = pipeline.transform(chunk[pipeline.input_columns].to_numpy(), dtype=np.float32)
+        y_chunk = chunk[target].to_numpy(dtype=np.uint8)
+        n_chunk = len(chunk)
+
+        # Grow the buffer (up to capacity) if the row estimate was low
+        if filled + n_chunk > len(X) and len(X) < capacity:
+            new_size = min(capacity, max(len(X) * 2, filled + n_chunk))
+            X = np.resize(X, (new_size, n_features)) if filled else np.empty((new_size, n_features), np.float32)
+            y = np.resize(y, new_size) if filled else np.empty(new_size, np.uint8)
+
+        # Fill free slots first
+        take = min(len(X) - filled, n_chunk)
+        X[filled:filled + take] = X_chunk[:take]
+        y[filled:filled + take] = y_chunk[:take]
+        filled += take
+
+        # Reservoir sampling (Algorithm R) for the overflow: row t replaces a
+        # random slot with probability capacity / (t + 1)
+        if take < n_chunk:
+            positions = np.arange(total + take, total + n_chunk)
+            slots = (rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+            keep = slots < filled
+            X[slots[keep]] = X_chunk[take:][keep]
+            y[slots[keep]] = y_chunk[take:][keep]
+
+        total += n_chunk
+        progress(0.3 * min(total / expected_rows, 1.0), f"loading data ({total:,} rows)")
+
+    if total > filled:
+        logger.warning(f"Dataset has {total:,} rows but the {memory_budget_mb} MB budget holds "
+                       f"{filled:,}; training on a uniform sample")
+
+    return X[:filled], y[:filled], total
+
+
+def load_cached_training_data(path, feature_columns, target='is_fake', memory_budget_mb=None,
+                              progress=_no_progress, seed=42):
+    """
+    Load features and labels from the memory-mapped columnar cache of a CSV
+
+    Builds the cache on first use (or after the CSV changed), and the
+    derived feature columns the first time each is needed. Columns are
+    copied into the same float32/uint8 arrays as load_training_data; past the
+    memory budget a uniform sample of rows is gathered instead.
+    Returns (X, y, total_rows).
+    """
+    memory_budget_mb = memory_budget_mb or TRAINING_MEMORY_BUDGET_MB
+    pipeline = FeaturePipeline(feature_columns)
+
+    if not dataset_store.is_fresh(path):
+        progress(0.0, "building dataset cache")
+    raw_columns = [column for column in feature_columns if column not in pipeline.derived_columns]
+    columns = dataset_store.load_columns(path, raw_columns + [target])
+    columns.update(dataset_store.load_derived(path, pipeline))
+    total = len(columns[target])
+
+    n_features = len(feature_columns)
+    bytes_per_row = n_features * np.dtype(np.float32).itemsize + np.dtype(np.uint8).itemsize
+    capacity = max(int(memory_budget_mb * 1024 * 1024 // (bytes_per_row * MEMORY_OVERHEAD_FACTOR)), 1)
+
+    rows = slice(None)
+    if total > capacity:
+        logger.warning(f"Dataset has {total:,} rows but the {memory_budget_mb} MB budget holds "
+                       f"{capacity:,}; training on a uniform sample")
+        rows = np.sort(np.random.default_rng(seed).choice(total, size=capacity, replace=False))
+
+    # Fill column by column so only one mapped column is paged in at a time
+    n_rows = min(total, capacity)
+    X = np.empty((n_rows, n_features), dtype=np.float32)
+    for j, column in enumerate(feature_columns):
+        X[:, j] = columns[column][rows]
+        progress(0.3 * (j + 1) / (n_features + 1), f"loading data ({column})")
+    y = np.asarray(columns[target][rows], dtype=np.uint8)
+
+    return X, y, total
+
+
+def load_dataset(path, feature_columns, target='is_fake', memory_budget_mb=None, progress=_no_progress):
+    """Load (X, y, total_rows) from the dataset cache when enabled, else by parsing the CSV"""
+    if dataset_store.DATASET_CACHE_ENABLED:
+        try:
+            return load_cached_training_data(path, feature_columns, target,
+                                             memory_budget_mb=memory_budget_mb, progress=progress)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Dataset cache unavailable ({e}); parsing the CSV")
+    return load_training_data(path, feature_columns, target, memory_budget_mb=memory_budget_mb, progress=progress)
+
+
+def scale_in_place(X, scaler, block_rows=1 << 16):
+    """
+    Apply a fitted StandardScaler to a float32 matrix block by block
+
+    Each block is transformed in float64 and rounded back to float32, the
+    same arithmetic as scaler.transform followed by the forest's float32 cast.
+    """
+    for start in range(0, len(X), block_rows):
+        block = X[start:start + block_rows]
+        block[:] = scaler.transform(block.astype(np.float64))
+    return X
+
+
+def fit_model(dataset_path, feature_columns, target='is_fake', n_jobs=None, memory_budget_mb=None,
+              rf_params=None, progress=_no_progress, compaction=None, extra_data=None):
+    """
+    Load the dataset and fit a StandardScaler + RandomForestClassifier
+
+    Trees are grown in parallel on n_jobs cores, in warm-started rounds so
+    progress can be reported while fitting. With compaction (a dict of
+    model_compaction.compact_model options, {} for the defaults) the forest
+    is then compacted on the test rows and the compact model is returned,
+    with the report in metrics['compaction']; metrics['accuracy'] and
+    metrics['full_forest_accuracy'] are then the compact model's and the
+    forest's accuracy on the holdout half of the test rows, the half
+    compaction did not decide on. metrics['reference_profile'] holds the
+    drift monitoring profile (callers pass it to save_version separately).
+    extra_data is an optional (X, y) pair of raw input columns (e.g. labeled
+    feedback) appended to the dataset. Returns (model, scaler, metrics).
+    """
+    n_jobs = TRAINING_N_JOBS if n_jobs is None else n_jobs
+    params = dict(RF_PARAMS, **(rf_params or {}))
+    started = time.time()
+    timer = StageTimer()
+
+    # Load dataset
+    progress(0.0, "loading data")
+    X, y, total_rows = load_dataset(dataset_path, feature_columns, target,
+                                    memory_budget_mb=memory_budget_mb, progress=progress)
+    if extra_data is not None and len(extra_data[1]):
+        extra_X = FeaturePipeline(feature_columns).transform(extra_data[0], dtype=np.float32)
+        X = np.concatenate([X, extra_X])
+        y = np.concatenate([y, np.asarray(extra_data[1], dtype=np.uint8)])
+        total_rows += len(extra_data[1])
+    logger.info(f"Loaded {len(X):,} of {total_rows:,} rows from {dataset_path}")
+    timer.mark('load')
+
+    # Split the data (on indices, so only the two halves are copied)
+    progress(0.3, "splitting data")
+    train_idx, test_idx = train_test_split(
+        np.arange(len(X)), test_size=0.2, random_state=42, stratify=y
+    )
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_test, y_test = X[test_idx], y[test_idx]
+    del X, y
+    timer.mark('split')
+
+    # Compaction decides on raw rows (the compiled engine folds the scaler in)
+    X_test_raw = X_test.copy() if compaction is not None else None
+
+    # Reference distribution of every feature for drift monitoring
+    profile = build_profile(X_train, feature_columns)
+
+    # Scale the features
+    progress(0.32, "scaling features")
+    scaler = StandardScaler()
+    scaler.fit(X_train)
+    scale_in_place(X_train, scaler)
+    scale_in_place(X_test, scaler)
+    timer.mark('scale')
+
+    # Train Random Forest model in rounds of trees across all workers
+    n_estimators = params.pop('n_estimators')
+    model = RandomForestClassifier(n_estimators=0, n_jobs=n_jobs, warm_start=True, **params)
+    effective_jobs = os.cpu_count() if n_jobs < 0 else max(n_jobs, 1)
+    step = max(10, 2 * effective_jobs)
+    built = 0
+    while built < n_estimators:
+        built = min(built + step, n_estimators)
+        model.set_params(n_estimators=built)
+        with warnings.catch_warnings():
+            # Every round sees the full training set, so 'balanced' weights are stable
+            warnings.filterwarnings('ignore', message='class_weight presets')
+            model.fit(X_train, y_train)
+        progress(0.35 + 0.55 * built / n_estimators, f"fitting trees ({built}/{n_estimators})")
+
+    # Predict single-threaded afterwards: serving calls are small, and a fixed
+    # tree order keeps sklearn and the compiled engine bit-identical
+    model.set_params(n_jobs=None, warm_start=False)
+    timer.mark('fit')
+
+    # Evaluate model
+    progress(0.9, "evaluating")
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    timer.mark('evaluate')
+
+    logger.info(f"Model trained successfully!")
+    logger.info(f"Accuracy: {accuracy:.4f}")
+    logger.info(f"Classification Report:\n{classification_report(y_test, y_pred)}")
+
+    # Feature importance
+    feature_importance = pd.DataFrame({
+        'feature': feature_columns,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+
+    logger.info("Feature Importance:")
+    logger.info(feature_importance)
+
+    # Compact the forest: prune trees, quantize the engine, optionally distill
+    compaction_report = None
+    if compaction is not None:
+        from model_compaction import compact_model
+        progress(0.92, "compacting model")
+        model, compaction_report = compact_model(
+            model, scaler, X_test_raw, y_test, X_train=X_train,
+            progress=lambda stage: progress(0.92, stage), **compaction
+        )
+        timer.mark('compact')
+
+        # The validation half of the test rows chose the compact model, so only the
+        # holdout half gives an unbiased accuracy for it (and a comparable one for the forest)
+        variants = {variant['variant']: variant for variant in compaction_report['variants']}
+        full_accuracy = variants['full']['holdout_accuracy']
+        accuracy = variants[compaction_report['deployed']]['holdout_accuracy']
+        logger.info(f"Compacted model holdout accuracy: {accuracy:.4f} (full forest {full_accuracy:.4f})")
+
+    metrics = {
+        'accuracy': float(accuracy),
+        'rows_total': int(total_rows),
+        'rows_used': int(len(train_idx) + len(test_idx)),
+        'n_train': int(len(train_idx)),
+        'n_test': int(len(test_idx)),
+        'n_jobs': int(effective_jobs),
+        'training_seconds': round(time.time() - started, 3),
+        'stage_seconds': {stage: round(ms / 1000, 4) for stage, ms in timer.stages.items()}
+    }
+    if compaction_report is not None:
+        metrics['full_forest_accuracy'] = float(full_accuracy)
+        metrics['compaction'] = compaction_report
+
+    # Scores of the deployed model on held-out rows complete the reference profile;
+    # a quantized engine is what serves, so its scores are the ones to compare against
+    quantization = compaction_report['quantization'] if compaction_report is not None else None
+    if quantization:
+        from forest_engine import CompiledForest
+        engine = CompiledForest.from_sklearn(model, scaler).quantize(quantization['threshold'],
+                                                                     quantization['value'])
+        probability = engine.predict_proba(X_test_raw)[:, 1]
+    else:
+        probability = model.predict_proba(X_test)[:, 1]
+    profile['probability_fake'] = probability_profile(probability)
+    metrics['reference_profile'] = profile
+    return model, scaler, metrics
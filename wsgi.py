@@ -0,0 +1,14 @@
+"""
+WSGI Entry Point
+Loads (or trains) the model at import time, so a pre-forking server that
+imports this module once in its master process hands every worker the same
+already-loaded model pages
+
+    gunicorn --preload --workers 4 --threads 4 wsgi:app
+"""
+
+from api import app, initialize_app
+
+initialize_app()
+
+application = app